@@ -0,0 +1,137 @@
+"""Versioned JSON catalog API.
+
+The endpoints under ``/api/v1`` wrap ``AsyncProductService``, so they
+share the catalog cache with the store UI. Responses are Pydantic models
+serialized with orjson. Each one carries a strong ETag computed from the
+products' ids, ``version`` (bumped by every edit) and stock, plus the
+selected fields and cursor, read from the same cached rows the body is
+built from. A matching ``If-None-Match`` gets a 304 before anything is
+serialized.
+"""
+
+import hashlib
+from typing import Any, Callable, FrozenSet, Iterable, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse, Response
+
+from app.api.schemas import PRODUCT_FIELDS, CategoriesOut, ProductOut, ProductPageOut
+from app.core import server_timing
+from app.core.config import settings
+from app.core.exceptions import NotFoundError
+from app.services.product_service import AsyncProductService
+
+catalog_router = APIRouter(prefix="/v1", tags=["catalog"])
+
+product_service = AsyncProductService()
+
+# Clients may keep responses but must revalidate them with If-None-Match
+CACHE_CONTROL = "no-cache"
+
+NOT_MODIFIED = {304: {"description": "Unchanged since the ETag in If-None-Match"}}
+
+PageLimit = Query(default=settings.CATALOG_PAGE_SIZE, ge=1, le=settings.CATALOG_MAX_PAGE_SIZE)
+Cursor = Query(default=None, description="next_cursor of the previous page")
+Fields = Query(default=None, description="Comma-separated product fields to return, e.g. id,name,price")
+
+
+def _selected_fields(fields: Optional[str]) -> Optional[FrozenSet[str]]:
+    if not fields:
+        return None
+    selected = frozenset(name.strip() for name in fields.split(",") if name.strip())
+    unknown = selected - PRODUCT_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Available: {', '.join(sorted(PRODUCT_FIELDS))}"
+        )
+    return selected
+
+
+def _etag(*parts: Any) -> str:
+    """Strong validator over the parts' reprs, stable across processes"""
+    return '"' + hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest() + '"'
+
+
+def _versions(products: Iterable[Any]) -> tuple:
+    # Stock moves with checkouts, which do not bump the row version
+    return tuple((product.id, product.version, product.stock) for product in products)
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    return etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def _respond(request: Request, etag: str, body: Callable[[], Any]) -> Response:
+    """304 if the client's copy is current, otherwise ``body()`` as orjson"""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    with server_timing.phase(server_timing.SERIALIZATION):
+        return ORJSONResponse(body(), headers=headers)
+
+
+def _dump(products: Iterable[Any], fields: Optional[FrozenSet[str]]) -> list:
+    return [ProductOut.model_validate(product).model_dump(include=fields) for product in products]
+
+
+def _page_response(request: Request, kind: str, page, limit: int, fields: Optional[FrozenSet[str]]) -> Response:
+    etag = _etag(kind, limit, page.next_cursor, sorted(fields or ()), _versions(page))
+    return _respond(request, etag, lambda: {
+        "items": _dump(page, fields), "next_cursor": page.next_cursor, "limit": limit
+    })
+
+
+@catalog_router.get("/products", response_model=ProductPageOut, responses=NOT_MODIFIED)
+async def list_products(
+    request: Request,
+    category: Optional[str] = Query(default=None, description="Only products in this category"),
+    limit: int = PageLimit,
+    cursor: Optional[str] = Cursor,
+    fields: Optional[str] = Fields,
+):
+    """Products ordered by name, one keyset page at a time"""
+    selected = _selected_fields(fields)
+    if category:
+        page = await product_service.get_products_by_category(category, limit=limit, cursor=cursor)
+    else:
+        page = await product_service.get_all_products(limit=limit, cursor=cursor)
+    return _page_response(request, f"products:{category or ''}", page, limit, selected)
+
+
+@catalog_router.get("/products/{product_id}", response_model=ProductOut, responses=NOT_MODIFIED)
+async def get_product(request: Request, product_id: int, fields: Optional[str] = Fields):
+    """A single product"""
+    selected = _selected_fields(fields)
+    product = await product_service.get_product(product_id)
+    if product is None:
+        raise NotFoundError(f"Product {product_id} not found").to_http_exception()
+    etag = _etag("product", sorted(selected or ()), _versions([product]))
+    return _respond(request, etag, lambda: _dump([product], selected)[0])
+
+
+@catalog_router.get("/categories", response_model=CategoriesOut, responses=NOT_MODIFIED)
+async def list_categories(request: Request):
+    """Every product category"""
+    categories = await product_service.get_categories()
+    return _respond(request, _etag("categories", tuple(categories)), lambda: {"items": categories})
+
+
+@catalog_router.get("/search", response_model=ProductPageOut, responses=NOT_MODIFIED)
+async def search_products(
+    request: Request,
+    q: str = Query(min_length=1, max_length=200, description="Search terms"),
+    limit: int = PageLimit,
+    cursor: Optional[str] = Cursor,
+    fields: Optional[str] = Fields,
+):
+    """Products matching ``q``, best match first"""
+    selected = _selected_fields(fields)
+    page = await product_service.search_products(q, limit=limit, cursor=cursor)
+    return _page_response(request, f"search:{q}", page, limit, selected)
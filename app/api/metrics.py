@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse, Response
+
+from app.core.config import settings
+from app.core.logging import app_logger
+from app.core.metrics import registry
+
+metrics_router = APIRouter()
+
+# Version 0.0.4 of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@metrics_router.get("/metrics", tags=["metrics"], include_in_schema=False)
+async def get_metrics():
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    try:
+        return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+    except Exception as e:
+        app_logger.error(f"Error rendering metrics: {e}")
+        return PlainTextResponse("# metrics unavailable\n", status_code=500)
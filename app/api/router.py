@@ -3,6 +3,8 @@ from fastapi.responses import JSONResponse
 import time
 
 
+from app.api.catalog import catalog_router
+from app.api.metrics import metrics_router
 from app.core.health import HealthCheck
 from app.core.logging import app_logger
 
@@ -24,4 +26,6 @@ async def get_health_status():
             content={"status": "error", "message": f"Health check failed: {str(e)}", "timestamp": time.time()}
         )
 
-api_router.include_router(health_router)
\ No newline at end of file
+api_router.include_router(health_router)
+api_router.include_router(metrics_router)
+api_router.include_router(catalog_router)
\ No newline at end of file
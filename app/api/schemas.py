@@ -0,0 +1,43 @@
+"""Response models for the versioned catalog API"""
+
+from datetime import datetime
+from typing import FrozenSet, List, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class ProductOut(BaseModel):
+    """A product as returned by ``/api/v1``"""
+
+    # Validated straight from ProductView tuples or ORM instances
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    brand: str
+    price: float
+    description: Optional[str] = None
+    category: str
+    sizes: List[str]
+    colors: List[str]
+    stock: int
+    image_url: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class ProductPageOut(BaseModel):
+    """One page of products; pass ``next_cursor`` back as ``cursor`` for the next"""
+
+    items: List[ProductOut]
+    next_cursor: Optional[str] = None
+    limit: int
+
+
+class CategoriesOut(BaseModel):
+    """Every product category, alphabetically"""
+
+    items: List[str]
+
+
+PRODUCT_FIELDS: FrozenSet[str] = frozenset(ProductOut.model_fields)
@@ -6,6 +6,7 @@ import logging
 import os
 import sys
 import importlib
+import time
 from pathlib import Path
 
 # Configure basic logging immediately
@@ -133,6 +134,31 @@ def setup_middleware(app):
         app_logger.info("CORS middleware configured")
     except Exception as e:
         app_logger.error(f"Error setting up middleware: {e}")
+    
+    try:
+        from app.core.middleware import RequestTimingMiddleware
+        
+        app.add_middleware(RequestTimingMiddleware, server_timing=getattr(settings, "SERVER_TIMING_ENABLED", False))
+        
+        app_logger.info("Request timing middleware configured")
+    except Exception as e:
+        app_logger.error(f"Error setting up request timing middleware: {e}")
+    
+    if getattr(settings, "RATE_LIMIT_ENABLED", False):
+        try:
+            from app.core.middleware import add_rate_limiting
+            from app.core.rate_limit import parse_rules
+            
+            add_rate_limiting(
+                app,
+                limit=settings.RATE_LIMIT_REQUESTS,
+                window=settings.RATE_LIMIT_WINDOW_SECONDS,
+                # NiceGUI's own assets and socket.io polling would use up the page's budget
+                exempt_paths=["/static", "/_nicegui", "/docs", "/redoc", "/openapi.json"],
+                routes=parse_rules(settings.RATE_LIMIT_ROUTES),
+            )
+        except Exception as e:
+            app_logger.error(f"Error setting up rate limiting: {e}")
 
 def setup_routers(app, api_prefix: str = ""):
     """Setup FastAPI routers"""
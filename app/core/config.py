@@ -28,6 +28,86 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = Field(default="sqlite:///./data/adidas_store.db")
+    SQLITE_PRAGMA_PROFILE: str = Field(default="production")  # default, safe, production or bulk
+    SQLITE_PRAGMAS: str = Field(default="")  # Extra overrides, e.g. "cache_size=-128000,mmap_size=0"
+    SQLITE_BUSY_TIMEOUT_MS: int = Field(default=5000)  # How long a writer waits for a lock
+    
+    # Read replicas
+    DATABASE_REPLICA_URLS: str = Field(default="")  # Comma-separated; empty reads from the primary
+    DATABASE_REPLICA_MAX_LAG_SECONDS: float = Field(default=5.0)  # Skip replicas further behind
+    DATABASE_REPLICA_CHECK_INTERVAL_SECONDS: float = Field(default=10.0)
+    DATABASE_REPLICA_RETRY_BACKOFF_SECONDS: float = Field(default=30.0)  # Keep a failed replica out this long, doubling per failure
+    
+    # Catalog pagination
+    CATALOG_PAGE_SIZE: int = Field(default=24)
+    CATALOG_MAX_PAGE_SIZE: int = Field(default=100)
+    
+    # Catalog import
+    CATALOG_IMPORT_CHUNK_SIZE: int = Field(default=1000)
+    
+    # Stock reservations
+    STOCK_HOLD_TTL_SECONDS: float = Field(default=900.0)  # How long a cart holds stock
+    STOCK_HOLD_SWEEP_INTERVAL_SECONDS: float = Field(default=30.0)
+    
+    # Cart storage
+    CART_STORE_BACKEND: str = Field(default="sql")  # sql (cart_items table) or redis
+    CART_STORE_REDIS_URL: str = Field(default="redis://localhost:6379/0")  # Any Redis-protocol server
+    CART_STORE_REDIS_TTL_SECONDS: float = Field(default=604800.0)  # Idle carts expire from Redis after this
+    CART_CACHE_MAX_CARTS: int = Field(default=10000)  # Carts held in memory; 0 disables the cache
+    CART_CACHE_TTL_SECONDS: float = Field(default=300.0)
+    CART_WRITE_BEHIND_ENABLED: bool = Field(default=False)  # Buffer cart changes in memory and write them in batches
+    CART_WRITE_BEHIND_INTERVAL_SECONDS: float = Field(default=0.5)
+    CART_WRITE_BEHIND_MAX_BATCH: int = Field(default=500)  # Carts per flush transaction
+    CART_IDLE_TTL_SECONDS: float = Field(default=604800.0)  # Carts untouched this long are deleted; 0 keeps them
+    CART_SWEEP_INTERVAL_SECONDS: float = Field(default=300.0)
+    CART_SWEEP_BATCH_SIZE: int = Field(default=200)  # Cart lines examined per sweep transaction
+    
+    # Background jobs
+    JOB_WORKERS: int = Field(default=2)  # Workers in this process; 0 leaves the queue to other processes
+    JOB_WORKER_MODE: str = Field(default="thread")  # thread or process
+    JOB_POLL_INTERVAL_SECONDS: float = Field(default=0.5)
+    JOB_VISIBILITY_TIMEOUT_SECONDS: float = Field(default=60.0)  # A claimed job unfinished by then is run again
+    JOB_MAX_ATTEMPTS: int = Field(default=5)  # Failing jobs are kept as dead after this many runs
+    JOB_RETRY_BACKOFF_SECONDS: float = Field(default=1.0)
+    JOB_RETRY_BACKOFF_MAX_SECONDS: float = Field(default=300.0)
+    
+    # Order emails
+    SMTP_HOST: str = Field(default="")  # Empty logs order emails instead of sending them
+    SMTP_PORT: int = Field(default=25)
+    ORDER_EMAIL_SENDER: str = Field(default="orders@adidas-store.local")
+    
+    # Search
+    SEARCH_MAX_RESULTS: int = Field(default=200)  # Upper bound on ranked hits per query
+    
+    # Catalog cache
+    CATALOG_CACHE_ENABLED: bool = Field(default=True)
+    CATALOG_CACHE_MAX_ENTRIES: int = Field(default=1024)
+    CATALOG_CACHE_TTL_SECONDS: float = Field(default=300.0)
+    
+    # Catalog change feed (cross-worker cache invalidation)
+    CATALOG_CHANGES_ENABLED: bool = Field(default=True)
+    CATALOG_CHANGES_POLL_INTERVAL_SECONDS: float = Field(default=1.0)  # Other workers see edits this late, cart stock changes twice this
+    CATALOG_CHANGES_RETENTION_SECONDS: float = Field(default=3600.0)  # Log rows older than this are pruned
+    
+    # SQL instrumentation
+    SQL_INSTRUMENTATION_ENABLED: bool = Field(default=True)
+    SQL_SLOW_QUERY_MS: float = Field(default=200.0)  # Log statements slower than this, with parameters
+    SQL_N_PLUS_ONE_THRESHOLD: int = Field(default=5)  # Same statement this often in one request/event
+    
+    # Rate limiting
+    RATE_LIMIT_ENABLED: bool = Field(default=False)
+    RATE_LIMIT_REQUESTS: int = Field(default=100)  # Per client IP and window, unless a route rule says otherwise
+    RATE_LIMIT_WINDOW_SECONDS: float = Field(default=60.0)
+    RATE_LIMIT_ROUTES: str = Field(default="")  # e.g. /api/v1/products=300/60,/api/metrics=0 (0 exempts)
+    RATE_LIMIT_ALGORITHM: str = Field(default="sliding_window")  # sliding_window or token_bucket (memory backend)
+    RATE_LIMIT_BACKEND: str = Field(default="memory")  # memory (per process), sqlite or redis (shared)
+    RATE_LIMIT_SQLITE_PATH: str = Field(default="./rate_limits.db")
+    RATE_LIMIT_REDIS_URL: str = Field(default="redis://localhost:6379/1")  # Any Redis-protocol server
+    RATE_LIMIT_EVICT_INTERVAL_SECONDS: float = Field(default=60.0)
+    
+    # Metrics
+    METRICS_ENABLED: bool = Field(default=True)  # Serve /api/metrics and record request metrics
+    SERVER_TIMING_ENABLED: bool = Field(default=False)  # Send per-phase timings in a Server-Timing header
     
     # Security
     SECRET_KEY: str = Field(default="adidas-store-secret-key-change-in-production")
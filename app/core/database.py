@@ -1,35 +1,489 @@
 ```python
 """Database configuration and session management"""
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
-from contextlib import contextmanager
-from typing import Generator
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncGenerator, Dict, Generator, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import itertools
+import threading
+import time
 from app.core.config import settings
 from app.core.logging import get_logger
+from app.core.metrics import MetricFamily, registry
+from app.core.query_stats import install_query_hooks
 
 logger = get_logger(__name__)
 
+# SQLite pragma profiles, applied to every new connection.
+#   default:    SQLite's built-in behaviour (rollback journal, synchronous=FULL)
+#   safe:       WAL so readers never wait for writers, still fsync on every commit
+#   production: WAL with synchronous=NORMAL (durable across app crashes, a power
+#               loss may drop the last commits), bigger page cache, mmap reads
+#               and in-memory temp tables
+#   bulk:       no fsync at all; only for throwaway databases and bulk loads
+SQLITE_PRAGMA_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+    },
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,  # KiB when negative, i.e. 64 MB
+        "mmap_size": 268435456,  # 256 MB
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,
+    },
+    "bulk": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -64000,
+        "temp_store": "MEMORY",
+    },
+}
+
+def sqlite_pragmas(profile: Optional[str] = None, overrides: Optional[str] = None,
+                   busy_timeout_ms: Optional[int] = None) -> Dict[str, Any]:
+    """Resolve the pragmas for a profile plus ``name=value`` overrides.
+    
+    Defaults come from ``SQLITE_PRAGMA_PROFILE``, ``SQLITE_PRAGMAS`` and
+    ``SQLITE_BUSY_TIMEOUT_MS``. Raises ValueError for an unknown profile.
+    """
+    profile = profile or settings.SQLITE_PRAGMA_PROFILE
+    if profile not in SQLITE_PRAGMA_PROFILES:
+        raise ValueError(f"Unknown SQLite pragma profile: {profile}; use one of {sorted(SQLITE_PRAGMA_PROFILES)}")
+    # busy_timeout goes first so the journal_mode switch can wait for a lock too
+    timeout = settings.SQLITE_BUSY_TIMEOUT_MS if busy_timeout_ms is None else busy_timeout_ms
+    pragmas: Dict[str, Any] = {"busy_timeout": timeout}
+    pragmas.update(SQLITE_PRAGMA_PROFILES[profile])
+    overrides = settings.SQLITE_PRAGMAS if overrides is None else overrides
+    for item in (overrides or "").split(","):
+        if item.strip():
+            name, _, value = item.partition("=")
+            pragmas[name.strip()] = value.strip()
+    return pragmas
+
+def apply_sqlite_pragmas(engine: Engine, pragmas: Dict[str, Any]) -> None:
+    """Run ``PRAGMA name=value`` on every new connection of a SQLite engine.
+    
+    For an async engine pass ``async_engine.sync_engine``.
+    """
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+    
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def create_database_engine(url: str) -> Engine:
+    """Create a sync engine with the store's pool settings and SQLite pragmas"""
+    bind = create_engine(
+        url,
+        echo=settings.DEBUG,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        connect_args={"check_same_thread": False} if "sqlite" in url else {}
+    )
+    apply_sqlite_pragmas(bind, sqlite_pragmas())
+    install_query_hooks(bind)
+    return bind
+
 # Create engine with proper configuration
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+engine = create_database_engine(settings.DATABASE_URL)
+if engine.dialect.name == "sqlite":
+    logger.info(f"SQLite pragma profile: {settings.SQLITE_PRAGMA_PROFILE}")
+
+class FailoverSession(Session):
+    """Session that leaves a failing read replica for the primary.
+    
+    ``get_db_session(readonly=True)`` records the replica's index and the
+    primary bind in ``info``. A statement that fails on the replica with a
+    DBAPIError marks the replica failed and runs again on the primary, as
+    does the rest of the session. Read-only sessions never write, so the
+    retry is safe.
+    """
+    
+    def _failover(self, method, *args, **kwargs):
+        replica = self.info.get("replica")
+        if replica is None:
+            return method(*args, **kwargs)
+        try:
+            return method(*args, **kwargs)
+        except DBAPIError as e:
+            replica_router.mark_failed(replica, e)
+            self.rollback()
+            self.bind = self.info.pop("primary")
+            del self.info["replica"]
+            return method(*args, **kwargs)
+    
+    def execute(self, *args, **kwargs):
+        return self._failover(super().execute, *args, **kwargs)
+    
+    def scalar(self, *args, **kwargs):
+        return self._failover(super().scalar, *args, **kwargs)
+    
+    def scalars(self, *args, **kwargs):
+        return self._failover(super().scalars, *args, **kwargs)
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=FailoverSession)
+
+# Async drivers for the dialects the store runs on
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+def async_database_url(url: str) -> str:
+    """Rewrite a database URL to use the dialect's asyncio driver"""
+    parsed = make_url(url)
+    backend = "postgresql" if parsed.get_backend_name() in ("postgres", "postgresql") else parsed.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"No async driver configured for database backend: {backend}")
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+def create_async_database_engine(url: str) -> AsyncEngine:
+    """Create an async engine for a sync database URL"""
+    bind = create_async_engine(
+        async_database_url(url),
+        echo=settings.DEBUG,
+        pool_pre_ping=True,
+        pool_recycle=300
+    )
+    apply_sqlite_pragmas(bind.sync_engine, sqlite_pragmas())
+    install_query_hooks(bind.sync_engine)
+    return bind
+
+# Objects stay readable after commit, as the UI uses them once the session is gone.
+# Sessions are bound to the async engines when opened, see get_async_db_session
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, sync_session_class=FailoverSession)
+
+class ThreadedSession:
+    """Awaitable stand-in for ``AsyncSession`` over a sync session.
+    
+    Used when the database has no asyncio driver installed (MySQL, or
+    Postgres without asyncpg): each call runs the sync session in a worker
+    thread, so the event loop still never blocks on I/O. Rows are buffered
+    before they are handed back, as ``AsyncSession.execute`` does.
+    """
+    
+    def __init__(self, session: Session):
+        self.sync_session = session
+        self.info = session.info
+    
+    async def execute(self, *args, **kwargs):
+        def run():
+            result = self.sync_session.execute(*args, **kwargs)
+            # DML results carry only a rowcount; ORM results have no returns_rows
+            return result.freeze()() if getattr(result, "returns_rows", True) else result
+        return await asyncio.to_thread(run)
+    
+    async def scalar(self, *args, **kwargs):
+        return await asyncio.to_thread(self.sync_session.scalar, *args, **kwargs)
+    
+    async def scalars(self, *args, **kwargs):
+        return (await self.execute(*args, **kwargs)).scalars()
+    
+    async def get(self, *args, **kwargs):
+        return await asyncio.to_thread(self.sync_session.get, *args, **kwargs)
+    
+    async def run_sync(self, fn, *args, **kwargs):
+        return await asyncio.to_thread(fn, self.sync_session, *args, **kwargs)
+    
+    def add(self, instance: Any) -> None:
+        self.sync_session.add(instance)
+    
+    async def delete(self, instance: Any) -> None:
+        await asyncio.to_thread(self.sync_session.delete, instance)
+    
+    async def flush(self) -> None:
+        await asyncio.to_thread(self.sync_session.flush)
+    
+    async def refresh(self, instance: Any, *args, **kwargs) -> None:
+        await asyncio.to_thread(self.sync_session.refresh, instance, *args, **kwargs)
+    
+    async def commit(self) -> None:
+        await asyncio.to_thread(self.sync_session.commit)
+    
+    async def rollback(self) -> None:
+        await asyncio.to_thread(self.sync_session.rollback)
+    
+    async def close(self) -> None:
+        await asyncio.to_thread(self.sync_session.close)
+
+# Replication lag probes per dialect, returning seconds behind the primary.
+# A Postgres standby that has replayed everything it received is in sync even
+# if the primary has been idle. SQLite copies (kept by LiteFS or Litestream)
+# are compared with the primary through the catalog change log instead; see
+# ``ReplicaRouter.probe_catalog_lag``.
+REPLICA_LAG_PROBES: Dict[str, str] = {
+    "postgresql": (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() "
+        "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    ),
+}
+
+class ReplicaRouter:
+    """Pick the engine for read-only sessions.
+    
+    Replicas are probed for lag at most every ``check_interval`` seconds
+    (by whichever caller finds the status stale) and used round-robin while
+    they are reachable and no more than ``max_lag`` seconds behind. A
+    replica that fails a query or a probe is left out for ``retry_backoff``
+    seconds, doubling with each further failure up to ``max_retry_backoff``,
+    and comes back once a probe after that succeeds. With no usable
+    replica, or while reads are pinned after a write, reads go to the
+    primary.
+    """
+    
+    def __init__(
+        self,
+        replicas: List[Engine],
+        max_lag: float = 5.0,
+        check_interval: float = 10.0,
+        primary: Optional[Engine] = None,
+        retry_backoff: float = 30.0,
+        max_retry_backoff: float = 300.0
+    ):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.primary = primary
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self._lag: List[Optional[float]] = [None] * len(replicas)
+        self._errors: List[Optional[str]] = [None] * len(replicas)
+        self._failures: List[int] = [0] * len(replicas)
+        self._retry_at: List[float] = [float("-inf")] * len(replicas)
+        self._checked_at = float("-inf")
+        self._pinned_until = 0.0
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+    
+    def probe_lag(self, bind: Engine) -> float:
+        """Return how many seconds a replica is behind its primary"""
+        probe = REPLICA_LAG_PROBES.get(bind.dialect.name)
+        if probe is None:
+            return self.probe_catalog_lag(bind)
+        with bind.connect() as conn:
+            return float(conn.execute(text(probe)).scalar() or 0.0)
+    
+    def probe_catalog_lag(self, bind: Engine) -> float:
+        """Lag from the catalog change log: the age of the oldest change the replica lacks.
+        
+        Only catalog writes are logged, so this is a reachability check
+        while the catalog is unchanged or ``CATALOG_CHANGES_ENABLED`` is off.
+        A replica behind the retained log counts as infinitely behind.
+        """
+        with bind.connect() as conn:
+            replica_version = conn.execute(text("SELECT version FROM catalog_version WHERE id = 1")).scalar() or 0
+        if self.primary is None:
+            return 0.0
+        with self.primary.connect() as conn:
+            primary_version = conn.execute(text("SELECT version FROM catalog_version WHERE id = 1")).scalar() or 0
+            if primary_version <= replica_version:
+                return 0.0
+            oldest = conn.execute(
+                text("SELECT MIN(created_at) FROM catalog_changes WHERE version > :version"),
+                {"version": replica_version}
+            ).scalar()
+        if oldest is None:
+            return float("inf")
+        if isinstance(oldest, str):
+            oldest = datetime.fromisoformat(oldest)
+        # created_at is the database's CURRENT_TIMESTAMP, in UTC
+        return max((datetime.utcnow() - oldest).total_seconds(), 0.0)
+    
+    def refresh_due(self) -> bool:
+        return bool(self.replicas) and time.monotonic() - self._checked_at >= self.check_interval
+    
+    def refresh(self, force: bool = False) -> None:
+        """Re-probe every replica if the last check is older than the interval"""
+        if not (force or self.refresh_due()) or not self._lock.acquire(blocking=False):
+            return
+        try:
+            for index, replica in enumerate(self.replicas):
+                if time.monotonic() < self._retry_at[index]:
+                    continue
+                try:
+                    self._lag[index] = self.probe_lag(replica)
+                    self._errors[index] = None
+                    self._failures[index] = 0
+                except Exception as e:
+                    self._fail(index, e)
+                    logger.warning(f"Read replica {replica.url!r} unavailable: {e}")
+            self._checked_at = time.monotonic()
+        finally:
+            self._lock.release()
+    
+    def _fail(self, index: int, error: Exception) -> None:
+        self._lag[index] = None
+        self._errors[index] = str(error)
+        self._failures[index] += 1
+        backoff = min(self.retry_backoff * 2 ** (self._failures[index] - 1), self.max_retry_backoff)
+        self._retry_at[index] = time.monotonic() + backoff
+    
+    def mark_failed(self, index: int, error: Exception) -> None:
+        """Stop using a replica until a probe succeeds after the retry backoff"""
+        self._fail(index, error)
+        logger.warning(f"Read replica {self.replicas[index].url!r} failed a query, reading from primary: {error}")
+    
+    def pin_primary(self, seconds: Optional[float] = None) -> None:
+        """Send reads to the primary for ``seconds`` (default: the lag tolerance).
+        
+        Called after catalog writes so a lagging replica cannot refill the
+        caches with the old rows.
+        """
+        seconds = self.max_lag if seconds is None else seconds
+        self._pinned_until = max(self._pinned_until, time.monotonic() + seconds)
+    
+    def choose(self, refresh: bool = True) -> Optional[int]:
+        """Index of the replica to read from, or None for the primary"""
+        if not self.replicas or time.monotonic() < self._pinned_until:
+            return None
+        if refresh:
+            self.refresh()
+        now = time.monotonic()
+        healthy = [
+            index for index, lag in enumerate(self._lag)
+            if lag is not None and lag <= self.max_lag and now >= self._retry_at[index]
+        ]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+    
+    def status(self) -> List[Dict[str, Any]]:
+        """Last probe result per replica"""
+        return [
+            {
+                "url": replica.url.render_as_string(hide_password=True),
+                "lag_seconds": self._lag[index],
+                "healthy": (
+                    self._lag[index] is not None and self._lag[index] <= self.max_lag
+                    and time.monotonic() >= self._retry_at[index]
+                ),
+                "error": self._errors[index],
+            }
+            for index, replica in enumerate(self.replicas)
+        ]
+
+def _replica_urls() -> List[str]:
+    return [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+# Read replicas, in the same order for the sync and async paths
+replica_engines: List[Engine] = [create_database_engine(url) for url in _replica_urls()]
+replica_router = ReplicaRouter(
+    replica_engines,
+    max_lag=settings.DATABASE_REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.DATABASE_REPLICA_CHECK_INTERVAL_SECONDS,
+    primary=engine,
+    retry_backoff=settings.DATABASE_REPLICA_RETRY_BACKOFF_SECONDS
+)
+if replica_engines:
+    logger.info(f"Routing read-only sessions across {len(replica_engines)} read replica(s)")
+
+# Async engines for code running on the NiceGUI event loop, created on first
+# use so importing this module never needs an asyncio driver
+_async_lock = threading.Lock()
+_async_engine: Optional[AsyncEngine] = None
+async_replica_engines: List[AsyncEngine] = []
+_async_unavailable = False
+
+def get_async_engine() -> Optional[AsyncEngine]:
+    """The primary async engine, or None if the database has no asyncio driver installed"""
+    global _async_engine, _async_unavailable
+    if _async_engine is None and not _async_unavailable:
+        with _async_lock:
+            if _async_engine is None and not _async_unavailable:
+                try:
+                    replicas = [create_async_database_engine(url) for url in _replica_urls()]
+                    _async_engine = create_async_database_engine(settings.DATABASE_URL)
+                    async_replica_engines[:] = replicas
+                except (ValueError, ImportError) as e:
+                    _async_unavailable = True
+                    logger.warning(f"No asyncio database driver ({e}); async sessions run in worker threads")
+    return _async_engine
+
+# (metric, pool method, help); only queue pools report these, SQLite :memory: pools do not
+_POOL_STATS = (
+    ("db_pool_size", "size", "Configured connection pool size"),
+    ("db_pool_connections_in_use", "checkedout", "Connections checked out of the pool"),
+    ("db_pool_connections_idle", "checkedin", "Connections idle in the pool"),
+    ("db_pool_overflow", "overflow", "Connections opened beyond the pool size"),
+)
+
+def _pool_metrics() -> List[MetricFamily]:
+    """Connection pool usage per engine, read at scrape time"""
+    engines = [("primary", engine)]
+    if _async_engine is not None:
+        engines.append(("primary-async", _async_engine.sync_engine))
+    engines += [(f"replica-{index}", replica) for index, replica in enumerate(replica_engines)]
+    engines += [(f"replica-{index}-async", replica.sync_engine) for index, replica in enumerate(async_replica_engines)]
+    return [
+        (metric, "gauge", documentation, [
+            # QueuePool.overflow() counts up from -size; clamp to connections actually opened
+            ({"engine": name}, max(0.0, float(getattr(bind.pool, method)())))
+            for name, bind in engines if hasattr(bind.pool, method)
+        ])
+        for metric, method, documentation in _POOL_STATS
+    ]
+
+registry.register_collector(_pool_metrics)
 
 class Base(DeclarativeBase):
     """Base class for all SQLAlchemy models"""
     pass
 
+# Columns added to tables that already existed: create_all never alters a
+# table, so create_tables adds these where they are missing, then creates any
+# model index an existing table lacks. (table, column, DDL after the column
+# type, backfill SQL)
+ADDED_COLUMNS: List[Tuple[str, str, str, Optional[str]]] = [
+    ("orders", "session_id", "", None),
+    ("orders", "idempotency_key", "", None),
+    ("orders", "total_quantity", "NOT NULL DEFAULT 0", None),
+    ("products", "version", "NOT NULL DEFAULT 1", None),
+    # Existing lines count as last written when they were created
+    ("cart_items", "updated_at", "", "UPDATE cart_items SET updated_at = created_at WHERE updated_at IS NULL"),
+]
+
+def upgrade_tables(bind: Engine) -> None:
+    """Add ``ADDED_COLUMNS`` and model indexes missing from existing tables; safe to run repeatedly"""
+    tables = {table for table, _, _, _ in ADDED_COLUMNS}
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        existing = set(inspector.get_table_names())
+        columns = {table: {column["name"] for column in inspector.get_columns(table)} for table in tables & existing}
+        for table, column, extra, backfill in ADDED_COLUMNS:
+            if table not in columns or column in columns[table]:
+                continue
+            column_type = Base.metadata.tables[table].c[column].type.compile(dialect=bind.dialect)
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type} {extra}".rstrip()))
+            if backfill:
+                conn.execute(text(backfill))
+            logger.info(f"Added column {table}.{column}")
+        # Indexes added to any model since its table was created
+        for table in Base.metadata.tables.values():
+            if table.name in existing:
+                for index in table.indexes:
+                    index.create(bind=conn, checkfirst=True)
+
 def create_tables():
-    """Create all database tables"""
+    """Create all database tables, adding columns introduced since they were created"""
     try:
         Base.metadata.create_all(bind=engine)
+        upgrade_tables(engine)
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
@@ -45,14 +499,26 @@ def drop_tables():
         raise
 
 @contextmanager
-def get_db_session() -> Generator[Session, None, None]:
-    """Get database session with automatic cleanup"""
-    session = SessionLocal()
+def get_db_session(readonly: bool = False) -> Generator[Session, None, None]:
+    """Get database session with automatic cleanup.
+    
+    ``readonly=True`` binds the session to a read replica within the lag
+    tolerance, falling back to the primary; never write through it. A query
+    that fails on the replica is retried on the primary (see
+    ``FailoverSession``) and the replica skipped until it recovers.
+    """
+    replica = replica_router.choose() if readonly else None
+    if replica is None:
+        session = SessionLocal()
+    else:
+        session = SessionLocal(bind=replica_engines[replica], info={"replica": replica, "primary": engine})
     try:
         yield session
     except Exception as e:
         session.rollback()
         logger.error(f"Database session error: {e}")
+        if session.info.get("replica") is not None and isinstance(e, DBAPIError):
+            replica_router.mark_failed(replica, e)
         raise
     finally:
         session.close()
@@ -61,4 +527,53 @@ def get_db() -> Generator[Session, None, None]:
     """Database session dependency for FastAPI"""
     with get_db_session() as session:
         yield session
+
+@asynccontextmanager
+async def get_async_db_session(readonly: bool = False) -> AsyncGenerator[AsyncSession, None]:
+    """Get async database session with automatic cleanup.
+    
+    ``readonly=True`` routes to a read replica like ``get_db_session``.
+    The async engines are created on the first call; without an asyncio
+    driver for the database the session is a ``ThreadedSession``.
+    """
+    async_bind = get_async_engine()
+    if readonly and replica_router.refresh_due():
+        # Lag probes use the sync engines; keep them off the event loop
+        await asyncio.to_thread(replica_router.refresh)
+    replica = replica_router.choose(refresh=False) if readonly else None
+    if async_bind is None:
+        if replica is None:
+            session = ThreadedSession(SessionLocal(expire_on_commit=False))
+        else:
+            session = ThreadedSession(SessionLocal(
+                bind=replica_engines[replica], info={"replica": replica, "primary": engine}, expire_on_commit=False
+            ))
+    elif replica is None:
+        session = AsyncSessionLocal(bind=async_bind)
+    else:
+        session = AsyncSessionLocal(
+            bind=async_replica_engines[replica], info={"replica": replica, "primary": async_bind.sync_engine}
+        )
+    try:
+        yield session
+    except Exception as e:
+        await session.rollback()
+        logger.error(f"Database session error: {e}")
+        if session.info.get("replica") is not None and isinstance(e, DBAPIError):
+            replica_router.mark_failed(replica, e)
+        raise
+    finally:
+        await session.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Async database session dependency for FastAPI"""
+    async with get_async_db_session() as session:
+        yield session
+
+async def dispose_async_engine() -> None:
+    """Close pooled async connections, e.g. on application shutdown"""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    for replica in async_replica_engines:
+        await replica.dispose()
 ```
\ No newline at end of file
@@ -1,13 +1,18 @@
+import asyncio
+import math
 import time
-from typing import Dict, List, Optional, Set
+from typing import List, Optional
 
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
+from app.core import metrics, server_timing
 from app.core.config import settings
 from app.core.logging import app_logger
+from app.core.query_stats import query_scope
+from app.core.rate_limit import Decision, RateLimiter, RateLimitRule, create_rate_limiter
 
 def setup_middleware(app: FastAPI) -> None:
     """Set up global middleware for the FastAPI application."""
@@ -39,24 +44,77 @@ def setup_middleware(app: FastAPI) -> None:
         app_logger.info("Session middleware disabled as authentication is not enabled.")
 
     # Request Timing Middleware
-    @app.middleware("http")
-    async def add_process_time_header(request: Request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-        app_logger.debug(f"Request processed in {process_time:.4f} seconds.",
-                         extra={"path": request.url.path, "method": request.method, "process_time": process_time})
-        return response
+    app.add_middleware(RequestTimingMiddleware)
     app_logger.info("Request timing middleware enabled.")
 
 # Custom middleware classes
 
+class RequestTimingMiddleware:
+    """Request timing as a pure ASGI middleware.
+    
+    Adds ``X-Process-Time``, ``X-DB-Query-Count`` and ``X-DB-Time`` headers
+    and records the request metrics. With ``server_timing`` on, it also
+    collects the phases the services report (see ``app.core.server_timing``)
+    and sends them in a ``Server-Timing`` header. Headers are added to the
+    ``http.response.start`` message, so response bodies stream through
+    untouched.
+    """
+    def __init__(self, app, server_timing: Optional[bool] = None):
+        self.app = app
+        self.server_timing = settings.SERVER_TIMING_ENABLED if server_timing is None else server_timing
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        started = time.perf_counter()
+        method = scope["method"]
+        status = 500
+        timing = server_timing.ServerTiming() if self.server_timing else None
+        token = server_timing.start_timing(timing) if timing is not None else None
+        
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - started
+                headers = list(message.get("headers", ()))
+                headers.append((b"x-process-time", str(elapsed).encode()))
+                headers.append((b"x-db-query-count", str(queries.count).encode()))
+                headers.append((b"x-db-time", f"{queries.seconds:.6f}".encode()))
+                if timing is not None:
+                    headers.append((b"server-timing", timing.header(elapsed, queries.seconds, queries.count)))
+                message = {**message, "headers": headers}
+            await send(message)
+        
+        metrics.http_requests_in_flight.inc(method=method)
+        queries = None
+        try:
+            with query_scope(f"{method} {scope['path']}") as queries:
+                await self.app(scope, receive, send_with_timing)
+        finally:
+            if token is not None:
+                server_timing.end_timing(token)
+            metrics.http_requests_in_flight.dec(method=method)
+            elapsed = time.perf_counter() - started
+            if settings.METRICS_ENABLED:
+                # Label by route template, not raw path, to keep cardinality bounded
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                metrics.http_request_duration_seconds.observe(elapsed, method=method, route=route)
+                metrics.http_responses_total.inc(method=method, route=route, status=str(status))
+                if queries is not None:
+                    metrics.http_request_db_queries.observe(queries.count, method=method, route=route)
+
 class RateLimitMiddleware:
-    """Simple rate limiting middleware.
+    """Rate limiting middleware, per client IP and per route.
     
-    This is a basic implementation. For production, consider using a more
-    robust solution with Redis or another distributed cache.
+    Each request is counted against the rule with the longest matching path
+    prefix in ``routes``, or the default ``limit`` per ``window``, under a
+    key of rule prefix and client IP. Counting is O(1) with constant memory
+    per key (see ``app.core.rate_limit``), and keys whose counts have
+    decayed are evicted every ``evict_interval`` seconds. Pass a shared
+    ``limiter`` (SQLite or Redis) so limits hold across worker processes;
+    their calls run in a worker thread so they never block the event loop.
     """
     def __init__(
         self,
@@ -64,59 +122,76 @@ class RateLimitMiddleware:
         limit: int = 100,
         window: int = 60,
         exempt_paths: List[str] = None,
+        routes: Optional[List[RateLimitRule]] = None,
+        limiter: Optional[RateLimiter] = None,
+        evict_interval: float = 60.0,
     ):
         self.app = app
-        self.limit = limit  # requests per window
-        self.window = window  # window in seconds
-        self.exempt_paths = exempt_paths or []
-        self.requests = {}
+        self.default_rule = RateLimitRule("", limit, window)
+        # Longest prefix first, so the most specific rule wins
+        self.routes = sorted(routes or [], key=lambda rule: len(rule.prefix), reverse=True)
+        self.exempt_paths = tuple(exempt_paths or [])
+        self.limiter = limiter if limiter is not None else create_rate_limiter()
+        self.evict_interval = evict_interval
+        self._next_eviction = time.time() + evict_interval
     
     async def __call__(self, scope, receive, send):
         if scope["type"] != "http":
             return await self.app(scope, receive, send)
         
-        # Get client IP
-        client_ip = self._get_client_ip(scope)
         path = scope["path"]
-        
         # Skip rate limiting for exempt paths
-        if any(path.startswith(exempt) for exempt in self.exempt_paths):
+        if path.startswith(self.exempt_paths):
+            return await self.app(scope, receive, send)
+        rule = self._rule(path)
+        if rule.limit <= 0:
             return await self.app(scope, receive, send)
         
-        # Check rate limit
-        current_time = time.time()
-        if client_ip in self.requests:
-            requests_info = self.requests[client_ip]
-            # Clean up old requests
-            requests_info = [r for r in requests_info if current_time - r < self.window]
-            
-            if len(requests_info) >= self.limit:
-                # Rate limit exceeded
-                return await self._rate_limit_response(scope, receive, send)
-            
-            requests_info.append(current_time)
-            self.requests[client_ip] = requests_info
-        else:
-            self.requests[client_ip] = [current_time]
+        now = time.time()
+        if now >= self._next_eviction:
+            self._next_eviction = now + self.evict_interval
+            evicted = await self._call(self.limiter.evict_idle, now)
+            if evicted:
+                app_logger.debug(f"Evicted {evicted} idle rate limit keys")
         
+        decision = await self._call(
+            self.limiter.hit, f"{rule.prefix}|{self._get_client_ip(scope)}", rule.limit, rule.window, now
+        )
+        if not decision.allowed:
+            return await self._rate_limit_response(scope, receive, send, decision)
         return await self.app(scope, receive, send)
     
+    async def _call(self, method, *args):
+        """Run a limiter call, in a worker thread if it blocks on a shared store"""
+        if self.limiter.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+    
+    def _rule(self, path: str) -> RateLimitRule:
+        for rule in self.routes:
+            if path.startswith(rule.prefix):
+                return rule
+        return self.default_rule
+    
     def _get_client_ip(self, scope):
         """Extract client IP from scope."""
-        headers = dict(scope.get("headers", []))
-        forwarded = headers.get(b"x-forwarded-for", b"").decode("utf8").split(",")[0].strip()
-        if forwarded:
-            return forwarded
-        return scope.get("client", ("", 0))[0] or "unknown"
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                forwarded = value.decode("latin-1").split(",")[0].strip()
+                if forwarded:
+                    return forwarded
+                break
+        client = scope.get("client")
+        return (client[0] if client else "") or "unknown"
     
-    async def _rate_limit_response(self, scope, receive, send):
+    async def _rate_limit_response(self, scope, receive, send, decision: Decision):
         """Send rate limit exceeded response."""
         await send({
             "type": "http.response.start",
             "status": 429,
             "headers": [
                 [b"content-type", b"application/json"],
-                [b"retry-after", str(self.window).encode()],
+                [b"retry-after", str(max(math.ceil(decision.retry_after), 1)).encode()],
             ],
         })
         await send({
@@ -125,7 +200,14 @@ class RateLimitMiddleware:
         })
 
 # Helper function to add rate limiting
-def add_rate_limiting(app: FastAPI, limit: int = 100, window: int = 60, exempt_paths: List[str] = None) -> None:
+def add_rate_limiting(
+    app: FastAPI,
+    limit: int = 100,
+    window: int = 60,
+    exempt_paths: List[str] = None,
+    routes: Optional[List[RateLimitRule]] = None,
+    limiter: Optional[RateLimiter] = None,
+) -> None:
     """Add rate limiting middleware to the application.
     
     Args:
@@ -133,11 +215,17 @@ def add_rate_limiting(app: FastAPI, limit: int = 100, window: int = 60, exempt_p
         limit: Maximum number of requests per window
         window: Time window in seconds
         exempt_paths: List of path prefixes to exempt from rate limiting
+        routes: Per-route rules overriding the default limit; limit 0 exempts a prefix
+        limiter: Where counts live; defaults to ``RATE_LIMIT_BACKEND``
     """
     app.add_middleware(
         RateLimitMiddleware,
         limit=limit,
         window=window,
         exempt_paths=exempt_paths or ["/static", "/docs", "/redoc", "/openapi.json"],
+        routes=routes,
+        limiter=limiter if limiter is not None else create_rate_limiter(),
+        evict_interval=settings.RATE_LIMIT_EVICT_INTERVAL_SECONDS,
     )
-    app_logger.info(f"Rate limiting configured: {limit} requests per {window} seconds")
\ No newline at end of file
+    app_logger.info(f"Rate limiting configured: {limit} requests per {window} seconds "
+                    f"({settings.RATE_LIMIT_BACKEND} backend, {len(routes or [])} route rules)")
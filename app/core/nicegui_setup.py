@@ -11,8 +11,10 @@ def setup_nicegui(fastapi_app) -> None:
     try:
         from nicegui import app as nicegui_app
         
-        # Mount FastAPI app with NiceGUI
-        nicegui_app.include_router(fastapi_app)
+        # Serve the API routes, and run the API middleware (CORS, timing,
+        # metrics) on the app NiceGUI actually serves
+        nicegui_app.include_router(fastapi_app.router)
+        nicegui_app.user_middleware.extend(fastapi_app.user_middleware)
         
         logger.info("NiceGUI integration with FastAPI configured successfully")
         
@@ -0,0 +1,156 @@
+"""Per-request and per-UI-event SQL instrumentation.
+
+``install_query_hooks`` attaches cursor-execute listeners to an engine.
+Every statement is timed and recorded in the current ``QueryScope``, which
+is held in a context variable. Scopes are opened by the HTTP timing
+middleware for each request and by ``instrumented`` for NiceGUI event
+handlers. A scope counts queries and DB time. On exit it flags statement
+shapes repeated ``SQL_N_PLUS_ONE_THRESHOLD`` times or more as likely N+1
+patterns. Statements slower than ``SQL_SLOW_QUERY_MS`` are logged with
+their parameters whether or not a scope is open.
+"""
+
+import functools
+import inspect
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+slow_query_logger = get_logger("app.sql.slow")
+
+# Expanded IN lists differ only in their number of placeholders
+_IN_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+|\$\d+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+|\$\d+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_MAX_LOGGED_PARAMS = 1000
+
+
+def statement_shape(statement: str) -> str:
+    """Normalise a SQL statement so repeated executions compare equal"""
+    return _IN_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryScope:
+    """Queries issued while handling one request or UI event"""
+
+    __slots__ = ("name", "parent", "count", "seconds", "shapes", "slow")
+
+    def __init__(self, name: str, parent: Optional["QueryScope"] = None):
+        self.name = name
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+        self.slow = 0
+
+    def record(self, statement: str, seconds: float, slow: bool) -> None:
+        shape = statement_shape(statement)
+        scope = self
+        while scope is not None:
+            scope.count += 1
+            scope.seconds += seconds
+            scope.shapes[shape] += 1
+            scope.slow += slow
+            scope = scope.parent
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statement shapes executed at least ``threshold`` times, most frequent first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+_current_scope: ContextVar[Optional[QueryScope]] = ContextVar("query_scope", default=None)
+
+
+def current_scope() -> Optional[QueryScope]:
+    """The innermost open scope, if any"""
+    return _current_scope.get()
+
+
+@contextmanager
+def query_scope(name: str) -> Iterator[QueryScope]:
+    """Collect the queries run inside the block.
+
+    Nested scopes also count towards their parents; N+1 warnings are
+    reported once, by the outermost scope.
+    """
+    scope = QueryScope(name, _current_scope.get())
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+        if scope.parent is None:
+            _report(scope)
+
+
+def _report(scope: QueryScope) -> None:
+    if not scope.count:
+        return
+    logger.debug(f"{scope.name}: {scope.count} queries in {scope.seconds * 1000:.1f} ms")
+    for shape, count in scope.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD):
+        logger.warning(f"Possible N+1 in {scope.name}: {count} x {shape[:300]}")
+
+
+def instrumented(name: Optional[str] = None) -> Callable:
+    """Decorator opening a query scope around a (sync or async) UI event handler"""
+
+    def decorate(func: Callable) -> Callable:
+        scope_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with query_scope(scope_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with query_scope(scope_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+
+def install_query_hooks(engine: Engine) -> None:
+    """Time every statement on an engine; pass ``async_engine.sync_engine`` for async engines"""
+    if not settings.SQL_INSTRUMENTATION_ENABLED:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        seconds = time.perf_counter() - started
+        slow = seconds * 1000 >= settings.SQL_SLOW_QUERY_MS
+        if slow:
+            params = repr(parameters)
+            if len(params) > _MAX_LOGGED_PARAMS:
+                params = params[:_MAX_LOGGED_PARAMS] + "..."
+            slow_query_logger.warning(
+                f"Slow query ({seconds * 1000:.1f} ms) on {engine.url.database}: "
+                f"{_WHITESPACE.sub(' ', statement).strip()} params={params}"
+            )
+        scope = _current_scope.get()
+        if scope is not None:
+            scope.record(statement, seconds, slow)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # A failed statement never reaches after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
@@ -0,0 +1,266 @@
+"""Rate limiters with constant memory per client key.
+
+``SlidingWindowLimiter`` keeps a sliding-window counter per key: the
+counts of the current and the previous fixed window. A request is
+allowed while ``previous * (1 - elapsed / window) + current`` stays within
+the limit, which approximates a true sliding log at O(1) cost.
+``TokenBucketLimiter`` refills ``limit`` tokens per window up to ``limit``
+and spends one per request. Both keep a short list per key and drop keys
+whose state has fully decayed in ``evict_idle``.
+
+``SQLiteRateLimiter`` and ``RedisRateLimiter`` keep the same sliding-window
+counters in a shared SQLite file or a Redis-protocol server, so every
+worker process counts against one limit. Each hit is one statement (one
+pipeline for Redis). They count every request, rejected ones included,
+so a client that keeps retrying while limited stays limited; the
+in-memory sliding window does the same for consistency. If the shared
+store is unavailable, requests are allowed rather than failed. Their calls
+block on I/O, so they set ``blocking`` and ``RateLimitMiddleware`` runs
+them in a worker thread instead of on the event loop.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class RateLimitRule(NamedTuple):
+    """``limit`` requests per ``window`` seconds for paths under ``prefix``; limit 0 exempts them"""
+
+    prefix: str
+    limit: int
+    window: float
+
+
+class Decision(NamedTuple):
+    """Outcome of one request against a limit"""
+
+    allowed: bool
+    remaining: int
+    retry_after: float  # Seconds until a request would be allowed again; 0 if allowed
+
+
+def parse_rules(spec: str) -> List[RateLimitRule]:
+    """Parse ``"/api/v1/products=300/60,/api/metrics=0"`` into rules.
+
+    Each entry is ``prefix=limit/window``; the window defaults to
+    ``RATE_LIMIT_WINDOW_SECONDS``.
+    """
+    rules = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, value = entry.partition("=")
+        limit, _, window = value.partition("/")
+        try:
+            rules.append(RateLimitRule(
+                prefix.strip(), int(limit), float(window) if window else settings.RATE_LIMIT_WINDOW_SECONDS
+            ))
+        except ValueError:
+            raise ValueError(f"Invalid rate limit rule {entry!r}; expected prefix=limit/window") from None
+    return rules
+
+
+def _sliding_decision(previous: int, current: int, limit: int, window: float, elapsed: float) -> Decision:
+    """Decide a request already counted in ``current``"""
+    estimate = previous * (1.0 - elapsed / window) + current
+    if estimate <= limit:
+        return Decision(True, int(limit - estimate), 0.0)
+    room = limit - current - 1
+    if room >= 0 and previous:
+        # Later in this window, once the previous window's share has decayed
+        return Decision(False, 0, max(window * (1.0 - room / previous) - elapsed, 0.0))
+    # In the next window, once this window's count has decayed in turn
+    return Decision(False, 0, window - elapsed + max(window * (1.0 - (limit - 1) / current), 0.0))
+
+
+class RateLimiter(ABC):
+    """Interface: count one request for ``key`` and decide it"""
+
+    blocking = False  # True when calls do I/O and must stay off the event loop
+
+    @abstractmethod
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> Decision:
+        """Count a request for ``key`` against ``limit`` per ``window`` seconds"""
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop state that no longer affects any decision; returns keys dropped"""
+        return 0
+
+    def __len__(self) -> int:
+        return 0
+
+
+class SlidingWindowLimiter(RateLimiter):
+    """In-process sliding-window counters: ``[window index, previous, current, window]`` per key"""
+
+    def __init__(self):
+        self._state: Dict[str, List] = {}
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> Decision:
+        now = time.time() if now is None else now
+        index = int(now // window)
+        state = self._state.get(key)
+        if state is None:
+            state = self._state[key] = [index, 0, 1, window]
+        else:
+            if state[0] != index:
+                state[1] = state[2] if state[0] == index - 1 else 0
+                state[2] = 0
+                state[0] = index
+            state[2] += 1
+        return _sliding_decision(state[1], state[2], limit, window, now - index * window)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        # Both counts are out of the window once two windows have started since
+        idle = [key for key, (index, _, _, window) in self._state.items() if (index + 2) * window <= now]
+        for key in idle:
+            del self._state[key]
+        return len(idle)
+
+
+class TokenBucketLimiter(RateLimiter):
+    """In-process token buckets: ``[tokens, last refill, window]`` per key"""
+
+    def __init__(self):
+        self._state: Dict[str, List] = {}
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> Decision:
+        now = time.time() if now is None else now
+        state = self._state.get(key)
+        if state is None:
+            state = self._state[key] = [float(limit), now, window]
+        else:
+            state[0] = min(float(limit), state[0] + (now - state[1]) * limit / window)
+            state[1] = now
+        if state[0] >= 1.0:
+            state[0] -= 1.0
+            return Decision(True, int(state[0]), 0.0)
+        return Decision(False, 0, (1.0 - state[0]) * window / limit)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        # A bucket untouched for a whole window has refilled and is the same as a new one
+        idle = [key for key, (_, last, window) in self._state.items() if now - last >= window]
+        for key in idle:
+            del self._state[key]
+        return len(idle)
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """Sliding-window counters in a SQLite file shared by every worker on the host"""
+
+    blocking = True
+
+    def __init__(self, path: Optional[str] = None, busy_timeout: float = 0.05):
+        self.path = path or settings.RATE_LIMIT_SQLITE_PATH
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, window_index INTEGER NOT NULL, previous INTEGER NOT NULL, "
+                "current INTEGER NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limits_expires_at ON rate_limits (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    # SET expressions all read the row as it was, so previous/current roll over together
+    HIT_SQL = (
+        "INSERT INTO rate_limits (key, window_index, previous, current, expires_at) VALUES (?1, ?2, 0, 1, ?3) "
+        "ON CONFLICT (key) DO UPDATE SET "
+        "previous = CASE WHEN window_index = ?2 THEN previous WHEN window_index = ?2 - 1 THEN current ELSE 0 END, "
+        "current = CASE WHEN window_index = ?2 THEN current + 1 ELSE 1 END, "
+        "window_index = ?2, expires_at = ?3 "
+        "RETURNING previous, current"
+    )
+
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> Decision:
+        now = time.time() if now is None else now
+        index = int(now // window)
+        try:
+            previous, current = self._connect().execute(self.HIT_SQL, (key, index, (index + 2) * window)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Rate limit store unavailable, allowing request: {e}")
+            return Decision(True, limit, 0.0)
+        return _sliding_decision(previous, current, limit, window, now - index * window)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        try:
+            return self._connect().execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,)).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Error evicting idle rate limit keys: {e}")
+            return 0
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT count(*) FROM rate_limits").fetchone()[0]
+
+
+class RedisRateLimiter(RateLimiter):
+    """Sliding-window counters on a Redis-protocol server; keys expire on their own.
+
+    Needs the optional ``redis`` package.
+    """
+
+    blocking = True
+
+    def __init__(self, url: Optional[str] = None):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the redis package: pip install redis") from e
+        self.client = redis.Redis.from_url(url or settings.RATE_LIMIT_REDIS_URL)
+
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> Decision:
+        now = time.time() if now is None else now
+        index = int(now // window)
+        current_key = f"ratelimit:{key}:{index}"
+        try:
+            pipe = self.client.pipeline()
+            pipe.incr(current_key)
+            pipe.expire(current_key, math.ceil(2 * window))
+            pipe.get(f"ratelimit:{key}:{index - 1}")
+            current, _, previous = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Rate limit store unavailable, allowing request: {e}")
+            return Decision(True, limit, 0.0)
+        return _sliding_decision(int(previous or 0), int(current), limit, window, now - index * window)
+
+
+def create_rate_limiter() -> RateLimiter:
+    """Build the limiter configured in settings"""
+    backend = settings.RATE_LIMIT_BACKEND.lower()
+    if backend == "sqlite":
+        return SQLiteRateLimiter()
+    if backend == "redis":
+        return RedisRateLimiter()
+    if backend != "memory":
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND!r}")
+    algorithm = settings.RATE_LIMIT_ALGORITHM.lower()
+    if algorithm == "sliding_window":
+        return SlidingWindowLimiter()
+    if algorithm == "token_bucket":
+        return TokenBucketLimiter()
+    raise ValueError(f"Unknown RATE_LIMIT_ALGORITHM: {settings.RATE_LIMIT_ALGORITHM!r}")
@@ -0,0 +1,116 @@
+"""Per-request phase timings for the W3C ``Server-Timing`` header.
+
+``RequestTimingMiddleware`` opens a ``ServerTiming`` for each request when
+``SERVER_TIMING_ENABLED`` is set and holds it in a context variable.
+Services contribute to it with ``phase("cache")`` blocks or the ``timed``
+decorator; DB time comes from the request's query scope. With no timing
+open, ``phase`` returns a shared no-op, so instrumented code pays one
+context variable lookup.
+
+Phases may overlap: ``render`` covers building a page, including the
+queries and cache lookups it makes.
+"""
+
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+DB = "db"
+CACHE = "cache"
+RENDER = "render"
+SERIALIZATION = "serialization"
+
+
+class ServerTiming:
+    """Time spent per phase while handling one request"""
+
+    __slots__ = ("phases",)
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def header(self, total: float, db_seconds: float = 0.0, db_queries: int = 0) -> bytes:
+        """Render as a ``Server-Timing`` value, durations in milliseconds"""
+        metrics = []
+        if db_queries:
+            metrics.append(f'{DB};dur={db_seconds * 1000:.2f};desc="{db_queries} queries"')
+        for name, seconds in self.phases.items():
+            metrics.append(f"{name};dur={seconds * 1000:.2f}")
+        metrics.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(metrics).encode("latin-1")
+
+
+class _Phase:
+    __slots__ = ("timing", "name", "started")
+
+    def __init__(self, timing: ServerTiming, name: str):
+        self.timing = timing
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.timing.add(self.name, time.perf_counter() - self.started)
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NO_PHASE = _NoPhase()
+
+_current_timing: ContextVar[Optional[ServerTiming]] = ContextVar("server_timing", default=None)
+
+
+def current_timing() -> Optional[ServerTiming]:
+    """The timing of the request being handled, if Server-Timing is on"""
+    return _current_timing.get()
+
+
+def start_timing(timing: ServerTiming) -> Any:
+    """Make ``timing`` the current request's; returns the token for ``end_timing``"""
+    return _current_timing.set(timing)
+
+
+def end_timing(token: Any) -> None:
+    _current_timing.reset(token)
+
+
+def phase(name: str):
+    """Context manager adding the block's duration to ``name`` in the current request's timing"""
+    timing = _current_timing.get()
+    if timing is None:
+        return _NO_PHASE
+    return _Phase(timing, name)
+
+
+def timed(name: str) -> Callable:
+    """Decorator timing a (sync or async) function as phase ``name``"""
+
+    def decorate(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with phase(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorate
@@ -4,20 +4,31 @@
 from nicegui import ui, app
 from typing import List, Optional, Dict, Any
 import asyncio
+import uuid
 from pathlib import Path
 
+from app.core.config import settings
 from app.core.logging import app_logger, get_logger
-from app.services.product_service import ProductService
-from app.services.cart_service import CartService
+from app.services.product_service import AsyncProductService, change_feed
+from app.services.cart_buffer import get_cart_buffer
+from app.services.cart_service import AsyncCartService, CartService
+from app.services.cart_sweeper import cart_sweeper
+from app.services.checkout_service import AsyncCheckoutService
+from app.services.jobs import job_workers
+from app.services.inventory_service import InventoryService
 from app.models.product import Product, Category
-from app.core.database import create_tables
+from app.models.views import ProductView
+from app.core.database import create_tables, dispose_async_engine
+from app.core.query_stats import instrumented
+from app.core.server_timing import RENDER, timed
 
 # Initialize logger
 logger = get_logger(__name__)
 
-# Global services
-product_service = ProductService()
-cart_service = CartService()
+# Shared catalog service; the UI awaits the async variants so a slow query
+# never blocks the event loop shared by every connected client. Carts are
+# per visitor and created with each page.
+product_service = AsyncProductService()
 
 # Adidas brand colors
 ADIDAS_COLORS = {
@@ -32,27 +43,42 @@ ADIDAS_COLORS = {
 }
 
 class AdidasStore:
-    """Main Adidas Store application class"""
+    """One visitor's store page: filters, product grid and cart"""
     
-    def __init__(self):
+    def __init__(self, cart_service: AsyncCartService):
+        self.cart_service = cart_service
+        self.checkout_service = AsyncCheckoutService(cart_service)
         self.current_category: Optional[str] = None
         self.search_query: str = ""
-        self.selected_product: Optional[Product] = None
+        self.selected_product: Optional[ProductView] = None
         self.cart_items_container = None
         self.products_container = None
+        self.load_more_button = None
+        self.next_cursor: Optional[str] = None
         self.cart_badge = None
-        
-        # Initialize database and sample data
+    
+    @classmethod
+    def initialize_database(cls):
+        """Create tables and sample data; runs once per process, not per page"""
         create_tables()
-        self._initialize_sample_data()
+        cls._initialize_sample_data()
+        cls._migrate_variants()
+    
+    @staticmethod
+    def _migrate_variants():
+        """Move JSON sizes/colors stock into per-variant rows"""
+        try:
+            InventoryService().migrate_variants_from_json()
+        except Exception as e:
+            logger.error(f"Error migrating product variants: {e}")
     
-    def _initialize_sample_data(self):
+    @staticmethod
+    def _initialize_sample_data():
         """Initialize sample Adidas shoe data"""
         try:
             # Check if products already exist
-            existing_products = product_service.get_all_products()
-            if existing_products:
-                logger.info(f"Found {len(existing_products)} existing products")
+            if product_service.products.get_all_products(limit=1):
+                logger.info("Found existing products, skipping sample data")
                 return
             
             # Sample Adidas shoes data
@@ -147,16 +173,15 @@ class AdidasStore:
                 }
             ]
             
-            # Create products
-            for shoe_data in sample_shoes:
-                product_service.create_product(**shoe_data)
+            # Create products in one batch
+            stats = product_service.products.bulk_create_products(sample_shoes)
             
-            logger.info(f"Created {len(sample_shoes)} sample products")
+            logger.info(f"Created {stats['rows']} sample products")
             
         except Exception as e:
             logger.error(f"Error initializing sample data: {e}")
     
-    def create_header(self):
+    async def create_header(self):
         """Create the main header with navigation"""
         with ui.header().classes('bg-black text-white shadow-lg'):
             with ui.row().classes('w-full items-center justify-between px-4 py-2'):
@@ -174,7 +199,7 @@ class AdidasStore:
                 # Cart button
                 with ui.row().classes('items-center gap-2'):
                     cart_button = ui.button(icon='shopping_cart', on_click=self.toggle_cart).classes('bg-orange-500 hover:bg-orange-600 relative')
-                    self.cart_badge = ui.badge(str(cart_service.get_item_count())).classes('absolute -top-2 -right-2 bg-red-500 text-white text-xs')
+                    self.cart_badge = ui.badge(str(await self.cart_service.get_item_count())).classes('absolute -top-2 -right-2 bg-red-500 text-white text-xs')
     
     def create_category_nav(self):
         """Create category navigation"""
@@ -194,7 +219,7 @@ class AdidasStore:
                     on_click=lambda cat=category_value: self.filter_by_category(cat)
                 ).classes(button_classes)
     
-    def create_product_card(self, product: Product):
+    def create_product_card(self, product: ProductView):
         """Create a product card"""
         with ui.card().classes('w-72 h-96 cursor-pointer hover:shadow-xl transition-shadow'):
             # Product image
@@ -213,7 +238,7 @@ class AdidasStore:
                     on_click=lambda p=product: self.show_product_details(p)
                 ).classes('w-full bg-black text-white hover:bg-gray-800')
     
-    def show_product_details(self, product: Product):
+    def show_product_details(self, product: ProductView):
         """Show product details in a dialog"""
         with ui.dialog() as dialog, ui.card().classes('w-full max-w-4xl'):
             with ui.row().classes('w-full gap-8'):
@@ -230,14 +255,14 @@ class AdidasStore:
                     # Size selection
                     ui.label('Size:').classes('font-semibold mt-4')
                     size_select = ui.select(
-                        options=product.sizes,
+                        options=list(product.sizes),
                         value=product.sizes[0] if product.sizes else None
                     ).classes('w-full')
                     
                     # Color selection
                     ui.label('Color:').classes('font-semibold mt-4')
                     color_select = ui.select(
-                        options=product.colors,
+                        options=list(product.colors),
                         value=product.colors[0] if product.colors else None
                     ).classes('w-full')
                     
@@ -265,99 +290,106 @@ class AdidasStore:
         
         dialog.open()
     
-    def add_to_cart(self, product: Product, size: str, color: str, quantity: int, dialog):
+    @instrumented()
+    async def add_to_cart(self, product: ProductView, size: str, color: str, quantity: int, dialog):
         """Add product to cart"""
         try:
-            cart_service.add_item(product.id, quantity, size, color)
-            self.update_cart_badge()
+            await self.cart_service.add_item(product.id, quantity, size, color)
+            await self.update_cart_badge()
             ui.notify(f'Added {product.name} to cart!', type='positive')
             dialog.close()
         except Exception as e:
             ui.notify(f'Error adding to cart: {str(e)}', type='negative')
             logger.error(f"Error adding to cart: {e}")
     
-    def update_cart_badge(self):
+    async def update_cart_badge(self):
         """Update cart badge count"""
         if self.cart_badge:
-            count = cart_service.get_item_count()
+            count = await self.cart_service.get_item_count()
             self.cart_badge.text = str(count)
             self.cart_badge.visible = count > 0
     
-    def toggle_cart(self):
+    @instrumented()
+    async def toggle_cart(self):
         """Toggle cart sidebar"""
-        self.show_cart()
+        await self.show_cart()
     
-    def show_cart(self):
+    @instrumented()
+    async def show_cart(self):
         """Show cart in a dialog"""
-        cart_items = cart_service.get_cart_items()
+        # Lines, products and total in one query
+        cart = await self.cart_service.get_cart_view()
         
         with ui.dialog() as dialog, ui.card().classes('w-full max-w-2xl'):
             ui.label('Shopping Cart').classes('text-2xl font-bold mb-4')
             
-            if not cart_items:
+            if not cart.lines:
                 ui.label('Your cart is empty').classes('text-gray-500 text-center py-8')
             else:
                 # Cart items
                 with ui.column().classes('w-full gap-4 max-h-96 overflow-y-auto'):
-                    for item in cart_items:
-                        product = product_service.get_product(item.product_id)
-                        if product:
-                            with ui.row().classes('w-full items-center gap-4 p-4 border rounded-lg'):
-                                ui.image(product.image_url or 'https://via.placeholder.com/80x60').classes('w-20 h-15 object-cover rounded')
-                                
-                                with ui.column().classes('flex-1'):
-                                    ui.label(product.name).classes('font-semibold')
-                                    ui.label(f'Size: {item.size}, Color: {item.color}').classes('text-sm text-gray-500')
-                                    ui.label(f'${product.price:.2f} x {item.quantity}').classes('font-medium')
-                                
-                                ui.button(
-                                    icon='delete',
-                                    on_click=lambda item_id=item.id: self.remove_from_cart(item_id, dialog)
-                                ).classes('bg-red-500 text-white hover:bg-red-600')
+                    for item, product, _ in cart.lines:
+                        with ui.row().classes('w-full items-center gap-4 p-4 border rounded-lg'):
+                            ui.image(product.image_url or 'https://via.placeholder.com/80x60').classes('w-20 h-15 object-cover rounded')
+                            
+                            with ui.column().classes('flex-1'):
+                                ui.label(product.name).classes('font-semibold')
+                                ui.label(f'Size: {item.size}, Color: {item.color}').classes('text-sm text-gray-500')
+                                ui.label(f'${product.price:.2f} x {item.quantity}').classes('font-medium')
+                            
+                            ui.button(
+                                icon='delete',
+                                on_click=lambda item_id=item.id: self.remove_from_cart(item_id, dialog)
+                            ).classes('bg-red-500 text-white hover:bg-red-600')
                 
                 # Cart total
-                total = cart_service.get_cart_total()
                 ui.separator()
                 with ui.row().classes('w-full justify-between items-center py-4'):
                     ui.label('Total:').classes('text-xl font-bold')
-                    ui.label(f'${total:.2f}').classes('text-xl font-bold')
+                    ui.label(f'${cart.total:.2f}').classes('text-xl font-bold')
                 
-                # Checkout button
+                # Checkout button; repeated clicks reuse the key and get the same order
+                checkout_key = str(uuid.uuid4())
                 ui.button(
                     'Proceed to Checkout',
-                    on_click=lambda: self.checkout(dialog)
+                    on_click=lambda: self.checkout(dialog, checkout_key)
                 ).classes('w-full bg-black text-white py-3 text-lg hover:bg-gray-800')
             
             ui.button('Close', on_click=dialog.close).classes('w-full bg-gray-300 text-black py-2 mt-4 hover:bg-gray-400')
         
         dialog.open()
     
-    def remove_from_cart(self, item_id: int, dialog):
+    @instrumented()
+    async def remove_from_cart(self, item_id: int, dialog):
         """Remove item from cart"""
         try:
-            cart_service.remove_item(item_id)
-            self.update_cart_badge()
+            await self.cart_service.remove_item(item_id)
+            await self.update_cart_badge()
             ui.notify('Item removed from cart', type='positive')
             dialog.close()
             # Reopen cart to show updated items
-            self.show_cart()
+            await self.show_cart()
         except Exception as e:
             ui.notify(f'Error removing item: {str(e)}', type='negative')
             logger.error(f"Error removing from cart: {e}")
     
-    def checkout(self, dialog):
+    @instrumented()
+    async def checkout(self, dialog, idempotency_key: Optional[str] = None):
         """Handle checkout process"""
         try:
-            total = cart_service.get_cart_total()
-            cart_service.clear_cart()
-            self.update_cart_badge()
+            order = await self.checkout_service.checkout(idempotency_key)
+            if order is None:
+                ui.notify('Checkout failed, please try again', type='negative')
+                return
+            await self.update_cart_badge()
             dialog.close()
             
             # Show success message
             with ui.dialog() as success_dialog, ui.card().classes('w-full max-w-md text-center'):
                 ui.icon('check_circle', size='4rem').classes('text-green-500 mx-auto mb-4')
                 ui.label('Order Successful!').classes('text-2xl font-bold mb-2')
-                ui.label(f'Total: ${total:.2f}').classes('text-lg mb-4')
+                ui.label(f'Order #{order.id}').classes('text-gray-600')
+                ui.label(f'Total: ${order.total:.2f}').classes('text-lg mb-4')
                 ui.label('Thank you for your purchase!').classes('text-gray-600 mb-4')
                 ui.button('Continue Shopping', on_click=success_dialog.close).classes('bg-black text-white px-6 py-2')
             
@@ -367,49 +399,82 @@ class AdidasStore:
             ui.notify(f'Checkout error: {str(e)}', type='negative')
             logger.error(f"Checkout error: {e}")
     
-    def filter_by_category(self, category: Optional[str]):
+    @instrumented()
+    async def filter_by_category(self, category: Optional[str]):
         """Filter products by category"""
         self.current_category = category
-        self.load_products()
+        await self.load_products()
     
-    def search_products(self, query: str):
+    @instrumented()
+    async def search_products(self, query: str):
         """Search products"""
         self.search_query = query
-        self.load_products()
+        await self.load_products()
     
-    def load_products(self):
-        """Load and display products"""
+    @instrumented()
+    async def load_products(self, append: bool = False):
+        """Load and display products, one page at a time"""
         try:
-            # Get filtered products
+            # Get the next page of filtered products
+            cursor = self.next_cursor if append else None
+            page_size = settings.CATALOG_PAGE_SIZE
             if self.search_query:
-                products = product_service.search_products(self.search_query)
+                products = await product_service.search_products(self.search_query, limit=page_size, cursor=cursor)
             elif self.current_category:
-                products = product_service.get_products_by_category(self.current_category)
+                products = await product_service.get_products_by_category(self.current_category, limit=page_size, cursor=cursor)
             else:
-                products = product_service.get_all_products()
+                products = await product_service.get_all_products(limit=page_size, cursor=cursor)
+            self.next_cursor = products.next_cursor
             
-            # Clear and rebuild products container
+            # Clear and rebuild products container, or append to it
             if self.products_container:
-                self.products_container.clear()
+                if append:
+                    if self.load_more_button:
+                        self.load_more_button.delete()
+                else:
+                    self.products_container.clear()
+                self.load_more_button = None
                 
                 with self.products_container:
-                    if not products:
+                    if not products and not append:
                         ui.label('No products found').classes('text-gray-500 text-center py-8 text-xl')
                     else:
                         with ui.row().classes('w-full gap-6 flex-wrap justify-center'):
                             for product in products:
                                 self.create_product_card(product)
+                    
+                    if self.next_cursor:
+                        self.load_more_button = ui.button(
+                            'Load More',
+                            on_click=lambda: self.load_products(append=True)
+                        ).classes('mx-auto bg-black text-white px-8 py-3 hover:bg-gray-800')
         
         except Exception as e:
             logger.error(f"Error loading products: {e}")
             ui.notify('Error loading products', type='negative')
 
-# Global store instance
-store = AdidasStore()
+# Initialize database and sample data
+AdidasStore.initialize_database()
+
+app.on_startup(change_feed.start)
+app.on_shutdown(change_feed.stop)
+# Post-checkout jobs; unfinished ones are picked up again after a restart
+app.on_startup(job_workers.start)
+app.on_shutdown(job_workers.stop)
+app.on_startup(cart_sweeper.start)
+app.on_shutdown(cart_sweeper.stop)
+# Write buffered cart changes before the database goes away
+if get_cart_buffer() is not None:
+    app.on_shutdown(get_cart_buffer().stop)
+app.on_shutdown(dispose_async_engine)
 
 @ui.page('/')
-def index():
+@timed(RENDER)
+async def index():
     """Main store page"""
+    # Page state is per client; the cart follows the browser across tabs and reloads
+    store = AdidasStore(AsyncCartService(CartService(app.storage.browser['id']), product_service))
+    
     ui.add_head_html('''
         <style>
             .nicegui-content { padding: 0 !important; }
@@ -418,7 +483,7 @@ def index():
     ''')
     
     # Header
-    store.create_header()
+    await store.create_header()
     
     # Category navigation
     store.create_category_nav()
@@ -440,7 +505,7 @@ def index():
             store.products_container = ui.row().classes('w-full gap-6 flex-wrap justify-center')
             
             # Load initial products
-            store.load_products()
+            await store.load_products()
 
 if __name__ in {"__main__", "__mp_main__"}:
     # This will be called by main.py, so we don't need to run here
@@ -2,7 +2,7 @@
 """Product models for the Adidas shoe store"""
 
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Float, Integer, Text, JSON, DateTime, func
+from sqlalchemy import DDL, String, Float, Integer, Text, JSON, DateTime, ForeignKey, Index, UniqueConstraint, event, func
 from datetime import datetime
 from typing import List, Optional
 from app.core.database import Base
@@ -16,12 +16,18 @@ class Category(Base):
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
     
-    # Relationships
-    products: Mapped[List["Product"]] = relationship(back_populates="category_obj")
+    # Relationships; products refer to their category by name, there is no foreign key
+    products: Mapped[List["Product"]] = relationship(
+        primaryjoin="Category.name == foreign(Product.category)", viewonly=True, back_populates="category_obj"
+    )
 
 class Product(Base):
     """Product model for shoes"""
     __tablename__ = "products"
+    __table_args__ = (
+        # Keyset pagination of category listings walks (category, name, id)
+        Index("ix_products_category_name_id", "category", "name", "id"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(200), index=True)
@@ -35,16 +41,64 @@ class Product(Base):
     image_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
+    # Bumped by every ORM update (updated_at has one-second resolution on SQLite); API ETags use it
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
     
-    # Foreign key relationship (optional, for normalized categories)
-    category_obj: Mapped[Optional[Category]] = relationship(back_populates="products")
+    __mapper_args__ = {"version_id_col": version}
+    
+    # Normalized category, joined on the category name (read-only)
+    category_obj: Mapped[Optional[Category]] = relationship(
+        primaryjoin="foreign(Product.category) == Category.name", viewonly=True, back_populates="products"
+    )
     
     def __repr__(self) -> str:
         return f"<Product(id={self.id}, name='{self.name}', price={self.price})>"
 
+class ProductVariant(Base):
+    """Stock for one size/color combination of a product"""
+    __tablename__ = "product_variants"
+    __table_args__ = (
+        # Point lookups by (product, size, color) when adding to cart
+        UniqueConstraint("product_id", "size", "color", name="uq_product_variants_product_size_color"),
+        # Cross-catalog availability queries, e.g. "size 10 in Core Black"
+        Index("ix_product_variants_size_color_stock", "size", "color", "stock"),
+    )
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id", ondelete="CASCADE"))
+    size: Mapped[str] = mapped_column(String(10), default="")
+    color: Mapped[str] = mapped_column(String(50), default="")
+    stock: Mapped[int] = mapped_column(Integer, default=0)
+    
+    def __repr__(self) -> str:
+        return f"<ProductVariant(product_id={self.product_id}, size='{self.size}', color='{self.color}', stock={self.stock})>"
+
+class StockReservation(Base):
+    """Time-limited hold on variant stock for a shopper's session"""
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        UniqueConstraint("session_id", "product_id", "size", "color", name="uq_stock_reservations_session_variant"),
+    )
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    session_id: Mapped[str] = mapped_column(String(100), index=True)
+    product_id: Mapped[int] = mapped_column(Integer)
+    size: Mapped[str] = mapped_column(String(10), default="")
+    color: Mapped[str] = mapped_column(String(50), default="")
+    quantity: Mapped[int] = mapped_column(Integer)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    
+    def __repr__(self) -> str:
+        return f"<StockReservation(session_id='{self.session_id}', product_id={self.product_id}, quantity={self.quantity})>"
+
 class CartItem(Base):
     """Shopping cart item model"""
     __tablename__ = "cart_items"
+    __table_args__ = (
+        # The abandoned-cart sweeper walks lines by (updated_at, session_id)
+        Index("ix_cart_items_updated_at_session_id", "updated_at", "session_id"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     product_id: Mapped[int] = mapped_column(Integer, index=True)
@@ -53,6 +107,8 @@ class CartItem(Base):
     color: Mapped[str] = mapped_column(String(50))
     session_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    # Last time the line was written; a cart is idle when all of its lines are
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
     
     def __repr__(self) -> str:
         return f"<CartItem(id={self.id}, product_id={self.product_id}, quantity={self.quantity})>"
@@ -66,9 +122,76 @@ class Order(Base):
     status: Mapped[str] = mapped_column(String(50), default="pending")
     items: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON string of order items
     customer_email: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    session_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True, index=True)
+    # Client-supplied key; a retried checkout finds the order instead of placing another
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(100), nullable=True, unique=True, index=True)
+    total_quantity: Mapped[int] = mapped_column(Integer, default=0)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
     
     def __repr__(self) -> str:
         return f"<Order(id={self.id}, total={self.total}, status='{self.status}')>"
+
+class OrderLine(Base):
+    """One line of an order, priced when the order was placed"""
+    __tablename__ = "order_lines"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    order_id: Mapped[int] = mapped_column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), index=True)
+    product_id: Mapped[int] = mapped_column(Integer)
+    size: Mapped[str] = mapped_column(String(10), default="")
+    color: Mapped[str] = mapped_column(String(50), default="")
+    quantity: Mapped[int] = mapped_column(Integer)
+    unit_price: Mapped[float] = mapped_column(Float)
+    subtotal: Mapped[float] = mapped_column(Float)
+    
+    def __repr__(self) -> str:
+        return f"<OrderLine(order_id={self.order_id}, product_id={self.product_id}, quantity={self.quantity})>"
+
+class Job(Base):
+    """Background job, claimed by one worker at a time until it succeeds or dies"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the oldest due jobs: (status, available_at)
+        Index("ix_jobs_status_available_at", "status", "available_at"),
+    )
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(100))
+    payload: Mapped[dict] = mapped_column(JSON)
+    status: Mapped[str] = mapped_column(String(20), default="queued")  # queued, running or dead
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer)
+    # When a queued job is due, or when a running job's claim lapses
+    available_at: Mapped[datetime] = mapped_column(DateTime)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    
+    def __repr__(self) -> str:
+        return f"<Job(id={self.id}, kind='{self.kind}', status='{self.status}', attempts={self.attempts})>"
+
+class CatalogVersion(Base):
+    """Single-row counter bumped by every catalog write, in the writer's transaction"""
+    __tablename__ = "catalog_version"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+
+# Seed the counter row so writers only ever UPDATE it
+event.listen(
+    CatalogVersion.__table__, "after_create",
+    DDL("INSERT INTO catalog_version (id, version) VALUES (1, 0)")
+)
+
+class CatalogChange(Base):
+    """Append-only log of catalog writes, one row per catalog version"""
+    __tablename__ = "catalog_changes"
+    
+    version: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    kind: Mapped[str] = mapped_column(String(20))  # create, update, delete, stock or bulk
+    tags: Mapped[List[str]] = mapped_column(JSON)  # Cache tags the write invalidates
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), index=True)
+    
+    def __repr__(self) -> str:
+        return f"<CatalogChange(version={self.version}, kind='{self.kind}')>"
 ```
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""Lightweight read models for catalog listings, carts and orders.
+
+Listing and search paths select plain columns and wrap each ``Row`` in a
+``ProductView`` tuple instead of building ORM ``Product`` instances. Views
+carry no session, identity-map entry or instance state, cannot trigger lazy
+loads, and are cheap to keep alive in UI callbacks.
+"""
+
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from app.models.product import Product
+
+
+class ProductView(NamedTuple):
+    """Immutable snapshot of a product row"""
+
+    id: int
+    name: str
+    brand: str
+    price: float
+    description: Optional[str]
+    category: str
+    sizes: Tuple[str, ...]
+    colors: Tuple[str, ...]
+    stock: int
+    image_url: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    version: int
+
+    @classmethod
+    def from_row(cls, row) -> "ProductView":
+        """Build a view from a row selected with ``PRODUCT_VIEW_COLUMNS``"""
+        (product_id, name, brand, price, description, category,
+         sizes, colors, stock, image_url, created_at, updated_at, version) = row
+        return cls(product_id, name, brand, price, description, category,
+                   tuple(sizes or ()), tuple(colors or ()), stock, image_url, created_at, updated_at, version)
+
+    @classmethod
+    def from_product(cls, product: Product) -> "ProductView":
+        """Snapshot an ORM instance, e.g. one returned by a write"""
+        return cls.from_row(tuple(getattr(product, field) for field in cls._fields))
+
+
+# Columns to select for ProductView.from_row, in field order
+PRODUCT_VIEW_COLUMNS: List = [getattr(Product, field) for field in ProductView._fields]
+
+
+class CartLine(NamedTuple):
+    """Immutable snapshot of one cart line"""
+
+    id: int
+    product_id: int
+    size: str
+    color: str
+    quantity: int
+
+
+class CartLineView(NamedTuple):
+    """A cart line joined to its product, priced"""
+
+    line: CartLine
+    product: ProductView
+    subtotal: float
+
+
+class CartView(NamedTuple):
+    """A whole cart as read by one joined query, with totals computed in SQL"""
+
+    lines: Tuple[CartLineView, ...] = ()
+    total: float = 0.0
+    total_quantity: int = 0
+
+    @property
+    def item_count(self) -> int:
+        return len(self.lines)
+
+    @classmethod
+    def from_rows(cls, rows) -> "CartView":
+        """Build a view from the rows of ``cart_view_statement``"""
+        rows = list(rows)
+        if not rows:
+            return cls()
+        width = len(CartLine._fields)
+        lines = tuple(
+            CartLineView(CartLine(*row[:width]), ProductView.from_row(row[width:-3]), row[-3])
+            for row in rows
+        )
+        return cls(lines, rows[0][-2], rows[0][-1])
+
+
+class OrderView(NamedTuple):
+    """Immutable snapshot of a placed order"""
+
+    id: int
+    status: str
+    total: float
+    total_quantity: int
+    # True when a retried checkout returned the order its first attempt placed
+    replayed: bool = False
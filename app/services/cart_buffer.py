@@ -0,0 +1,314 @@
+"""Write-behind buffering of cart changes.
+
+With ``CART_WRITE_BEHIND_ENABLED``, CartService applies add, quantity and
+remove operations to an in-memory copy of the cart and returns without
+writing. The buffer keeps only the latest state of each changed cart, so
+a burst of +/- clicks on one cart becomes a single write.
+
+A flusher thread writes the changed carts every
+``CART_WRITE_BEHIND_INTERVAL_SECONDS``, up to ``CART_WRITE_BEHIND_MAX_BATCH``
+carts per transaction. For each cart it holds or releases stock by the
+net difference from the stored cart, then brings the stored lines in line.
+If a cart's stock can no longer be held, the batch is rolled back and
+retried without that cart. The rejected cart reverts to its stored state.
+
+Checkout flushes its own cart first. ``stop`` flushes everything and runs
+on app shutdown and at interpreter exit, so only a process that is killed
+outright loses changes, and at most one interval's worth.
+
+New lines get negative provisional ids until their first flush;
+``resolve`` maps those ids to the stored ones afterwards.
+"""
+
+import atexit
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.database import get_db_session
+from app.core.logging import get_logger
+from app.core.metrics import MetricFamily, registry
+from app.models.views import CartLine
+from app.services.cart_store import CartStore, get_cart_store
+from app.services.product_service import catalog_cache
+from app.services.reservation_service import ReservationService
+
+logger = get_logger(__name__)
+
+# (product_id, size, color)
+VariantKey = Tuple[int, str, str]
+
+# Provisional ids remembered after their first flush
+MAX_ALIASES = 100_000
+
+cart_buffer_operations = registry.counter(
+    "cart_write_behind_operations_total", "Cart changes applied in memory by the write-behind buffer"
+)
+cart_buffer_batch_carts = registry.histogram(
+    "cart_write_behind_batch_carts", "Carts written per write-behind flush transaction",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+cart_buffer_flush_seconds = registry.histogram(
+    "cart_write_behind_flush_seconds", "Duration of write-behind flush transactions"
+)
+cart_buffer_rejected = registry.counter(
+    "cart_write_behind_rejected_total", "Buffered carts reverted because their stock could not be held"
+)
+
+
+class CartRejected(Exception):
+    """A buffered cart's stock could not be held"""
+
+    def __init__(self, session_id: str, reason: str):
+        super().__init__(f"Cart {session_id} rejected: {reason}")
+        self.session_id = session_id
+
+
+def _key(line: CartLine) -> VariantKey:
+    return (line.product_id, line.size, line.color)
+
+
+class CartWriteBuffer:
+    """In-memory cart changes, coalesced per cart and written in batches"""
+
+    def __init__(
+        self,
+        store: Optional[CartStore] = None,
+        reservations: Optional[ReservationService] = None,
+        interval: Optional[float] = None,
+        max_batch: Optional[int] = None
+    ):
+        self.store = store or get_cart_store()
+        self.reservations = reservations or ReservationService()
+        self.interval = settings.CART_WRITE_BEHIND_INTERVAL_SECONDS if interval is None else interval
+        self.max_batch = settings.CART_WRITE_BEHIND_MAX_BATCH if max_batch is None else max_batch
+        self._carts: Dict[str, Tuple[CartLine, ...]] = {}
+        self._aliases: "OrderedDict[int, int]" = OrderedDict()
+        self._provisional_ids = itertools.count(-1, -1)
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._exit_hook = False
+
+    def __len__(self) -> int:
+        return len(self._carts)
+
+    def get(self, session_id: str) -> Optional[List[CartLine]]:
+        """Return the cart if it has unwritten changes, otherwise None"""
+        lines = self._carts.get(session_id)
+        return None if lines is None else list(lines)
+
+    def resolve(self, line_id: int) -> int:
+        """Map a provisional line id to its stored id once written"""
+        return self._aliases.get(line_id, line_id)
+
+    def _current(self, session_id: str) -> List[CartLine]:
+        lines = self._carts.get(session_id)
+        return list(lines) if lines is not None else self.store.load(session_id)
+
+    def _stage(self, session_id: str, lines: List[CartLine]) -> None:
+        self._carts[session_id] = tuple(lines)
+        cart_buffer_operations.inc()
+        if self._thread is None:
+            self.start()
+
+    def add(self, session_id: str, product_id: int, size: str, color: str, quantity: int) -> CartLine:
+        """Add ``quantity`` to the matching line, creating it if needed; returns the line"""
+        with self._lock:
+            lines = self._current(session_id)
+            for index, line in enumerate(lines):
+                if _key(line) == (product_id, size, color):
+                    lines[index] = line = line._replace(quantity=line.quantity + quantity)
+                    break
+            else:
+                line = CartLine(next(self._provisional_ids), product_id, size, color, quantity)
+                lines.append(line)
+            self._stage(session_id, lines)
+            return line
+
+    def set_quantity(self, session_id: str, line_id: int, quantity: int) -> Optional[CartLine]:
+        """Set a line's quantity, zero or less removing it; returns the line as it was, or None"""
+        line_id = self.resolve(line_id)
+        with self._lock:
+            lines = self._current(session_id)
+            for index, line in enumerate(lines):
+                if line.id == line_id:
+                    if quantity <= 0:
+                        del lines[index]
+                    else:
+                        lines[index] = line._replace(quantity=quantity)
+                    self._stage(session_id, lines)
+                    return line
+            return None
+
+    def _write_cart(self, db, session_id: str, lines: Iterable[CartLine]) -> Tuple[List[CartLine], Set[int]]:
+        """Make the stored cart match ``lines`` inside the caller's transaction.
+
+        Returns the stored lines and the ids of products whose stock moved.
+        """
+        stored = {_key(line): line for line in self.store.load(session_id, db)}
+        wanted: Dict[VariantKey, int] = {}
+        for line in lines:
+            wanted[_key(line)] = wanted.get(_key(line), 0) + line.quantity
+
+        take, give = [], []
+        for key in stored.keys() | wanted.keys():
+            delta = wanted.get(key, 0) - (stored[key].quantity if key in stored else 0)
+            if delta > 0:
+                take.append((*key, delta))
+            elif delta < 0:
+                give.append((*key, -delta))
+        try:
+            self.reservations.hold(db, session_id, take)
+        except ValueError as e:
+            raise CartRejected(session_id, str(e)) from e
+        self.reservations.release(db, session_id, give)
+
+        written = []
+        for key, line in stored.items():
+            quantity = wanted.get(key, 0)
+            if quantity != line.quantity:
+                self.store.set_quantity(db, session_id, line.id, quantity)
+            if quantity > 0:
+                written.append(line._replace(quantity=quantity))
+        for key, quantity in wanted.items():
+            if key not in stored:
+                written.append(self.store.add(db, session_id, *key, quantity))
+        return sorted(written, key=lambda line: line.id), {key[0] for key in take + give}
+
+    def _write_batch(self, batch: Dict[str, Tuple[CartLine, ...]]) -> Tuple[Dict[str, List[CartLine]], Set[str]]:
+        """Write carts in one transaction, retrying without any that are rejected"""
+        rejected: Set[str] = set()
+        while True:
+            pending = {session_id: lines for session_id, lines in batch.items() if session_id not in rejected}
+            if not pending:
+                return {}, rejected
+            written: Dict[str, List[CartLine]] = {}
+            product_ids: Set[int] = set()
+            try:
+                with get_db_session() as db:
+                    for session_id, lines in pending.items():
+                        written[session_id], touched = self._write_cart(db, session_id, lines)
+                        product_ids |= touched
+                    db.commit()
+            except CartRejected as e:
+                logger.warning(f"Reverting buffered cart: {e}")
+                rejected.add(e.session_id)
+                # Stored carts rolled back with the transaction; drop the cached copies
+                for session_id in pending:
+                    self.store.evict(session_id)
+                continue
+            except Exception:
+                for session_id in pending:
+                    self.store.evict(session_id)
+                raise
+            if product_ids:
+                catalog_cache.invalidate_tags(*(f"product:{product_id}" for product_id in product_ids))
+            return written, rejected
+
+    def flush(self, session_ids: Optional[Iterable[str]] = None) -> int:
+        """Write buffered carts (all, or just ``session_ids``); returns carts written"""
+        total = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    candidates = list(self._carts) if session_ids is None else [
+                        session_id for session_id in session_ids if session_id in self._carts
+                    ]
+                    batch = {session_id: self._carts[session_id] for session_id in candidates[:self.max_batch]}
+                if not batch:
+                    return total
+
+                started = time.perf_counter()
+                written, rejected = self._write_batch(batch)
+                cart_buffer_flush_seconds.observe(time.perf_counter() - started)
+                cart_buffer_batch_carts.observe(len(written))
+                if rejected:
+                    cart_buffer_rejected.inc(len(rejected))
+                total += len(written)
+
+                with self._lock:
+                    for session_id, snapshot in batch.items():
+                        stored = written.get(session_id)
+                        if stored is not None:
+                            self._alias(snapshot, stored)
+                        current = self._carts.get(session_id)
+                        if current is snapshot:
+                            del self._carts[session_id]
+                        elif current is not None and stored is not None:
+                            # Changed again mid-flush: keep the newer state, with stored ids
+                            self._carts[session_id] = tuple(line._replace(id=self.resolve(line.id)) for line in current)
+                        # A rejected cart changed since is retried by the next flush, then reverted
+                if len(batch) < self.max_batch and session_ids is None:
+                    return total
+
+    def _alias(self, snapshot: Iterable[CartLine], stored: List[CartLine]) -> None:
+        ids = {_key(line): line.id for line in stored}
+        for line in snapshot:
+            if line.id < 0 and _key(line) in ids:
+                self._aliases[line.id] = ids[_key(line)]
+        while len(self._aliases) > MAX_ALIASES:
+            self._aliases.popitem(last=False)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing buffered carts: {e}")
+
+    def start(self) -> None:
+        """Start the flusher thread; called on the first buffered change"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cart-write-behind", daemon=True)
+            self._thread.start()
+            if not self._exit_hook:
+                atexit.register(self.stop)
+                self._exit_hook = True
+        logger.info(f"Cart write-behind flusher started ({self.interval}s interval)")
+
+    def stop(self) -> None:
+        """Stop the flusher and write everything still buffered"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            written = self.flush()
+            if written:
+                logger.info(f"Flushed {written} buffered carts on shutdown")
+        except Exception as e:
+            logger.error(f"Error flushing buffered carts on shutdown: {e}")
+
+
+_cart_buffer: Optional[CartWriteBuffer] = None
+_cart_buffer_lock = threading.Lock()
+
+
+def get_cart_buffer() -> Optional[CartWriteBuffer]:
+    """Get the process-wide write-behind buffer, or None if write-behind is off"""
+    global _cart_buffer
+    if not settings.CART_WRITE_BEHIND_ENABLED:
+        return None
+    if _cart_buffer is None:
+        with _cart_buffer_lock:
+            if _cart_buffer is None:
+                _cart_buffer = CartWriteBuffer()
+    return _cart_buffer
+
+
+def _cart_buffer_metrics() -> List[MetricFamily]:
+    """Buffered cart count, read at scrape time"""
+    if _cart_buffer is None:
+        return []
+    return [("cart_write_behind_dirty_carts", "gauge", "Carts with changes not yet written",
+             [({}, len(_cart_buffer))])]
+
+registry.register_collector(_cart_buffer_metrics)
@@ -1,108 +1,212 @@
 ```python
 """Shopping cart service"""
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 from sqlalchemy.orm import Session
-from sqlalchemy import select, delete
-from app.core.database import get_db_session
-from app.models.product import CartItem, Product
-from app.services.product_service import ProductService
+from sqlalchemy import Integer, String, bindparam, func, select, union_all
+from app.core.database import get_async_db_session, get_db_session
+from app.models.product import Product
+from app.models.views import PRODUCT_VIEW_COLUMNS, CartLine, CartView
+from app.services.cart_buffer import CartWriteBuffer, get_cart_buffer
+from app.services.cart_store import CartStore, get_cart_store
+from app.services.product_service import AsyncProductService, ProductService
+from app.services.reservation_service import ReservationService
 from app.core.logging import get_logger
+from functools import lru_cache
+import asyncio
 import uuid
 
 logger = get_logger(__name__)
 
+# Types of the CartLine fields, bound as parameters by cart_view_statement
+CART_LINE_TYPES = (Integer, Integer, String, String, Integer)
+
+@lru_cache(maxsize=64)
+def cart_view_statement(line_count: int):
+    """One query pricing a cart of ``line_count`` lines against the products table.
+    
+    The lines are bound as parameters of a CTE, so a cart held in memory is
+    never re-read from its store; the statement depends only on the line
+    count, so it is built and compiled once per cart size. Each row carries
+    the line, the product columns and the line subtotal, and window sums add
+    the cart total and quantity to every row. Lines whose product is gone
+    drop out.
+    """
+    rows = [
+        select(*(
+            bindparam(f"{field}_{index}", type_=type_).label(field)
+            for field, type_ in zip(CartLine._fields, CART_LINE_TYPES)
+        ))
+        for index in range(line_count)
+    ]
+    cart_lines = (union_all(*rows) if line_count > 1 else rows[0]).cte("cart_lines")
+    subtotal = (Product.price * cart_lines.c.quantity).label("subtotal")
+    return (
+        select(
+            *cart_lines.c, *PRODUCT_VIEW_COLUMNS, subtotal,
+            func.sum(subtotal).over().label("total"),
+            func.sum(cart_lines.c.quantity).over().label("total_quantity")
+        )
+        .join_from(cart_lines, Product, Product.id == cart_lines.c.product_id)
+        .order_by(cart_lines.c.id)
+    )
+
+def cart_view_params(lines: List[CartLine]) -> Dict[str, Any]:
+    """Parameters binding ``lines`` to ``cart_view_statement(len(lines))``"""
+    return {f"{field}_{index}": value for index, line in enumerate(lines) for field, value in zip(CartLine._fields, line)}
+
+def summarize(view: CartView) -> Dict[str, Any]:
+    """The ``get_cart_summary`` dict for a cart view"""
+    return {
+        'items': [
+            {'item': line.line, 'product': line.product, 'subtotal': line.subtotal}
+            for line in view.lines
+        ],
+        'total': view.total,
+        'item_count': view.item_count,
+        'total_quantity': view.total_quantity
+    }
+
 class CartService:
-    """Service for managing shopping cart"""
+    """Service for managing one visitor's shopping cart.
+    
+    ``session_id`` identifies the cart, e.g. the NiceGUI browser id; a
+    random one is generated if omitted. Lines live in the shared cart store.
+    With write-behind on, changes go to the shared ``CartWriteBuffer`` and
+    stock is held when it flushes; availability is still checked up front.
+    """
     
-    def __init__(self):
-        self.session_id = str(uuid.uuid4())  # Simple session management
+    def __init__(
+        self,
+        session_id: Optional[str] = None,
+        store: Optional[CartStore] = None,
+        buffer: Optional[CartWriteBuffer] = None
+    ):
+        self.session_id = session_id or str(uuid.uuid4())
+        self.store = store or get_cart_store()
+        # The shared buffer writes to the shared store, so a custom store is never buffered
+        self.buffer = buffer if buffer is not None or store is not None else get_cart_buffer()
         self.product_service = ProductService()
+        self.reservations = ReservationService()
+    
+    def _check_stock(self, product_id: int, size: str, color: str, quantity: int) -> None:
+        """Raise ValueError unless stock covers ``quantity`` on top of what the buffered cart wants but does not hold"""
+        key = (product_id, size, color)
+        quantity += sum(
+            line.quantity for line in self.get_cart_items() if (line.product_id, line.size, line.color) == key
+        ) - sum(
+            line.quantity for line in self.store.load(self.session_id)
+            if (line.product_id, line.size, line.color) == key
+        )
+        if quantity <= 0:
+            return
+        available = self.reservations.inventory.get_variant_stock(product_id, size, color)
+        if available is None or available < quantity:
+            raise ValueError("Insufficient stock")
     
     def add_item(self, product_id: int, quantity: int = 1, size: str = "", color: str = "") -> bool:
-        """Add item to cart"""
+        """Add item to cart, holding the quantity from the size/color variant's stock"""
         try:
-            # Check if product exists and has stock
-            product = self.product_service.get_product(product_id)
-            if not product:
-                raise ValueError("Product not found")
-            
-            if product.stock < quantity:
-                raise ValueError("Insufficient stock")
-            
+            if self.buffer is not None:
+                self._check_stock(product_id, size or "", color or "", quantity)
+                self.buffer.add(self.session_id, product_id, size or "", color or "", quantity)
+                return True
+            self.reservations.maybe_release_expired()
             with get_db_session() as db:
-                # Check if item already exists in cart
-                stmt = select(CartItem).where(
-                    CartItem.product_id == product_id,
-                    CartItem.session_id == self.session_id,
-                    CartItem.size == size,
-                    CartItem.color == color
-                )
-                existing_item = db.execute(stmt).scalar_one_or_none()
-                
-                if existing_item:
-                    # Update quantity
-                    existing_item.quantity += quantity
-                    logger.info(f"Updated cart item quantity: {existing_item.quantity}")
-                else:
-                    # Create new cart item
-                    cart_item = CartItem(
-                        product_id=product_id,
-                        quantity=quantity,
-                        size=size,
-                        color=color,
-                        session_id=self.session_id
-                    )
-                    db.add(cart_item)
-                    logger.info(f"Added new item to cart: product_id={product_id}")
-                
+                self._add_item(db, product_id, quantity, size or "", color or "")
                 db.commit()
-                return True
+            self.product_service.invalidate_products(product_id)
+            return True
                 
         except Exception as e:
+            self.store.evict(self.session_id)
             logger.error(f"Error adding item to cart: {e}")
             raise e
     
+    def _add_item(self, db: Session, product_id: int, quantity: int, size: str, color: str) -> None:
+        """Hold stock and add or bump the cart line inside the caller's transaction"""
+        # Checks and decrements variant stock in one conditional UPDATE
+        self.reservations.hold(db, self.session_id, [(product_id, size, color, quantity)])
+        line = self.store.add(db, self.session_id, product_id, size, color, quantity)
+        logger.info(f"Added item to cart: product_id={product_id}, quantity={line.quantity}")
+    
+    def _line(self, db: Session, item_id: int) -> Optional[CartLine]:
+        """Find one of this cart's lines in the stored cart"""
+        return next((line for line in self.store.load(self.session_id, db) if line.id == item_id), None)
+    
     def remove_item(self, item_id: int) -> bool:
-        """Remove item from cart"""
+        """Remove item from cart and return its stock"""
         try:
+            if self.buffer is not None:
+                return self._buffered_quantity(item_id, 0)
             with get_db_session() as db:
-                cart_item = db.get(CartItem, item_id)
-                if cart_item and cart_item.session_id == self.session_id:
-                    db.delete(cart_item)
-                    db.commit()
-                    logger.info(f"Removed item from cart: {item_id}")
-                    return True
-                return False
+                product_id = self._remove_item(db, item_id)
+                if product_id is None:
+                    return False
+                db.commit()
+            self.product_service.invalidate_products(product_id)
+            logger.info(f"Removed item from cart: {item_id}")
+            return True
         except Exception as e:
+            self.store.evict(self.session_id)
             logger.error(f"Error removing item from cart: {e}")
             return False
     
+    def _remove_item(self, db: Session, item_id: int) -> Optional[int]:
+        """Delete a cart line and release its hold; returns its product id, or None if not ours"""
+        line = self._line(db, item_id)
+        if line is None:
+            return None
+        self.reservations.release(db, self.session_id, [(line.product_id, line.size, line.color, line.quantity)])
+        self.store.set_quantity(db, self.session_id, item_id, 0)
+        return line.product_id
+    
     def update_quantity(self, item_id: int, quantity: int) -> bool:
-        """Update item quantity in cart"""
+        """Update item quantity in cart, adjusting variant stock by the difference"""
         try:
+            if self.buffer is not None:
+                return self._buffered_quantity(item_id, quantity)
             with get_db_session() as db:
-                cart_item = db.get(CartItem, item_id)
-                if cart_item and cart_item.session_id == self.session_id:
-                    if quantity <= 0:
-                        db.delete(cart_item)
-                    else:
-                        cart_item.quantity = quantity
-                    db.commit()
-                    logger.info(f"Updated cart item quantity: {quantity}")
-                    return True
-                return False
+                product_id = self._update_quantity(db, item_id, quantity)
+                if product_id is None:
+                    return False
+                db.commit()
+            self.product_service.invalidate_products(product_id)
+            logger.info(f"Updated cart item quantity: {quantity}")
+            return True
         except Exception as e:
+            self.store.evict(self.session_id)
             logger.error(f"Error updating cart item quantity: {e}")
             return False
     
-    def get_cart_items(self) -> List[CartItem]:
+    def _update_quantity(self, db: Session, item_id: int, quantity: int) -> Optional[int]:
+        """Set a cart line's quantity, holding or releasing the difference; returns its product id"""
+        line = self._line(db, item_id)
+        if line is None:
+            return None
+        delta = max(quantity, 0) - line.quantity
+        if delta > 0:
+            self.reservations.hold(db, self.session_id, [(line.product_id, line.size, line.color, delta)])
+        elif delta < 0:
+            self.reservations.release(db, self.session_id, [(line.product_id, line.size, line.color, -delta)])
+        self.store.set_quantity(db, self.session_id, item_id, quantity)
+        return line.product_id
+    
+    def _buffered_quantity(self, item_id: int, quantity: int) -> bool:
+        """Set a line's quantity in the write-behind buffer; False if the line is not ours"""
+        line_id = self.buffer.resolve(item_id)
+        line = next((line for line in self.get_cart_items() if line.id == line_id), None)
+        if line is None:
+            return False
+        if quantity > line.quantity:
+            self._check_stock(line.product_id, line.size, line.color, quantity - line.quantity)
+        return self.buffer.set_quantity(self.session_id, line_id, quantity) is not None
+    
+    def get_cart_items(self) -> List[CartLine]:
         """Get all items in cart"""
         try:
-            with get_db_session() as db:
-                stmt = select(CartItem).where(CartItem.session_id == self.session_id)
-                result = db.execute(stmt)
-                return result.scalars().all()
+            lines = self.buffer.get(self.session_id) if self.buffer is not None else None
+            return lines if lines is not None else self.store.load(self.session_id)
         except Exception as e:
             logger.error(f"Error getting cart items: {e}")
             return []
@@ -118,62 +222,181 @@ class CartService:
     
     def get_cart_total(self) -> float:
         """Get total price of items in cart"""
+        return self.get_cart_view().total
+    
+    def get_cart_view(self) -> CartView:
+        """Get the cart's lines with their products and totals in one query"""
         try:
-            cart_items = self.get_cart_items()
-            total = 0.0
-            
-            for item in cart_items:
-                product = self.product_service.get_product(item.product_id)
-                if product:
-                    total += product.price * item.quantity
-            
-            return total
+            lines = self.get_cart_items()
+            if not lines:
+                return CartView()
+            with get_db_session(readonly=True) as db:
+                return CartView.from_rows(db.execute(cart_view_statement(len(lines)), cart_view_params(lines)))
         except Exception as e:
-            logger.error(f"Error calculating cart total: {e}")
-            return 0.0
+            logger.error(f"Error getting cart view: {e}")
+            return CartView()
     
-    def clear_cart(self) -> bool:
-        """Clear all items from cart"""
+    def clear_cart(self, release_stock: bool = True) -> bool:
+        """Clear all items from cart.
+        
+        Stock held for the items goes back to their variants, unless
+        ``release_stock`` is False: the items were purchased, so the holds
+        are consumed instead (re-taking stock for any hold that expired).
+        """
         try:
+            if self.buffer is not None:
+                self.buffer.flush([self.session_id])
             with get_db_session() as db:
-                stmt = delete(CartItem).where(CartItem.session_id == self.session_id)
-                db.execute(stmt)
+                product_ids = self._clear_cart(db, release_stock)
                 db.commit()
-                logger.info("Cleared cart")
-                return True
+            self.product_service.invalidate_products(*product_ids)
+            logger.info("Cleared cart")
+            return True
         except Exception as e:
+            self.store.evict(self.session_id)
             logger.error(f"Error clearing cart: {e}")
             return False
     
+    def _clear_cart(self, db: Session, release_stock: bool) -> Set[int]:
+        """Empty the cart inside the caller's transaction; returns the affected product ids"""
+        lines = [
+            (line.product_id, line.size, line.color, line.quantity)
+            for line in self.store.load(self.session_id, db)
+        ]
+        if release_stock:
+            self.reservations.release_session(db, self.session_id)
+        else:
+            self.reservations.consume(db, self.session_id, lines)
+        self.store.clear(db, self.session_id)
+        return {line[0] for line in lines}
+    
     def get_cart_summary(self) -> Dict[str, Any]:
         """Get cart summary with items and totals"""
+        return summarize(self.get_cart_view())
+
+class AsyncCartService:
+    """Asyncio variant of CartService for the NiceGUI event loop.
+    
+    Runs the same cart and stock-hold logic as the wrapped CartService, but
+    on the async engine: ``AsyncSession.run_sync`` drives the session-level
+    helpers over the async connection, so no query blocks the loop. Cart
+    reads come from the cart store's memory cache; only a cold cart is
+    loaded, in a worker thread.
+    """
+    
+    def __init__(self, cart: Optional[CartService] = None, product_service: Optional[AsyncProductService] = None):
+        self.cart = cart or CartService()
+        self.product_service = product_service or AsyncProductService(self.cart.product_service)
+    
+    @property
+    def session_id(self) -> str:
+        return self.cart.session_id
+    
+    async def add_item(self, product_id: int, quantity: int = 1, size: str = "", color: str = "") -> bool:
+        """Add item to cart, holding the quantity from the size/color variant's stock"""
         try:
-            cart_items = self.get_cart_items()
-            items_with_products = []
-            
-            for item in cart_items:
-                product = self.product_service.get_product(item.product_id)
-                if product:
-                    items_with_products.append({
-                        'item': item,
-                        'product': product,
-                        'subtotal': product.price * item.quantity
-                    })
-            
-            total = sum(item['subtotal'] for item in items_with_products)
-            
-            return {
-                'items': items_with_products,
-                'total': total,
-                'item_count': len(cart_items),
-                'total_quantity': sum(item.quantity for item in cart_items)
-            }
+            if self.cart.buffer is not None:
+                # Only a stock read; the change itself stays in memory
+                return await asyncio.to_thread(self.cart.add_item, product_id, quantity, size, color)
+            # The throttled sweep opens its own sync sessions; keep it off the loop
+            await asyncio.to_thread(self.cart.reservations.maybe_release_expired)
+            async with get_async_db_session() as db:
+                await db.run_sync(self.cart._add_item, product_id, quantity, size or "", color or "")
+                await db.commit()
+            self.product_service.invalidate_products(product_id)
+            return True
         except Exception as e:
-            logger.error(f"Error getting cart summary: {e}")
-            return {
-                'items': [],
-                'total': 0.0,
-                'item_count': 0,
-                'total_quantity': 0
-            }
+            self.cart.store.evict(self.session_id)
+            logger.error(f"Error adding item to cart: {e}")
+            raise e
+    
+    async def remove_item(self, item_id: int) -> bool:
+        """Remove item from cart and return its stock"""
+        try:
+            if self.cart.buffer is not None:
+                return await asyncio.to_thread(self.cart.remove_item, item_id)
+            async with get_async_db_session() as db:
+                product_id = await db.run_sync(self.cart._remove_item, item_id)
+                if product_id is None:
+                    return False
+                await db.commit()
+            self.product_service.invalidate_products(product_id)
+            logger.info(f"Removed item from cart: {item_id}")
+            return True
+        except Exception as e:
+            self.cart.store.evict(self.session_id)
+            logger.error(f"Error removing item from cart: {e}")
+            return False
+    
+    async def update_quantity(self, item_id: int, quantity: int) -> bool:
+        """Update item quantity in cart, adjusting variant stock by the difference"""
+        try:
+            if self.cart.buffer is not None:
+                return await asyncio.to_thread(self.cart.update_quantity, item_id, quantity)
+            async with get_async_db_session() as db:
+                product_id = await db.run_sync(self.cart._update_quantity, item_id, quantity)
+                if product_id is None:
+                    return False
+                await db.commit()
+            self.product_service.invalidate_products(product_id)
+            logger.info(f"Updated cart item quantity: {quantity}")
+            return True
+        except Exception as e:
+            self.cart.store.evict(self.session_id)
+            logger.error(f"Error updating cart item quantity: {e}")
+            return False
+    
+    async def get_cart_items(self) -> List[CartLine]:
+        """Get all items in cart, from memory unless the cart has to be loaded"""
+        try:
+            lines = self.cart.buffer.get(self.session_id) if self.cart.buffer is not None else None
+            if lines is None:
+                lines = self.cart.store.cached(self.session_id)
+            if lines is None:
+                lines = await asyncio.to_thread(self.cart.store.load, self.session_id)
+            return lines
+        except Exception as e:
+            logger.error(f"Error getting cart items: {e}")
+            return []
+    
+    async def get_item_count(self) -> int:
+        """Get total number of items in cart"""
+        cart_items = await self.get_cart_items()
+        return sum(item.quantity for item in cart_items)
+    
+    async def get_cart_total(self) -> float:
+        """Get total price of items in cart"""
+        return (await self.get_cart_view()).total
+    
+    async def clear_cart(self, release_stock: bool = True) -> bool:
+        """Clear all items from cart; see ``CartService.clear_cart``"""
+        try:
+            if self.cart.buffer is not None:
+                await asyncio.to_thread(self.cart.buffer.flush, [self.session_id])
+            async with get_async_db_session() as db:
+                product_ids = await db.run_sync(self.cart._clear_cart, release_stock)
+                await db.commit()
+            self.product_service.invalidate_products(*product_ids)
+            logger.info("Cleared cart")
+            return True
+        except Exception as e:
+            self.cart.store.evict(self.session_id)
+            logger.error(f"Error clearing cart: {e}")
+            return False
+    
+    async def get_cart_view(self) -> CartView:
+        """Get the cart's lines with their products and totals in one query"""
+        try:
+            lines = await self.get_cart_items()
+            if not lines:
+                return CartView()
+            async with get_async_db_session(readonly=True) as db:
+                return CartView.from_rows(await db.execute(cart_view_statement(len(lines)), cart_view_params(lines)))
+        except Exception as e:
+            logger.error(f"Error getting cart view: {e}")
+            return CartView()
+    
+    async def get_cart_summary(self) -> Dict[str, Any]:
+        """Get cart summary with items and totals"""
+        return summarize(await self.get_cart_view())
 ```
\ No newline at end of file
@@ -0,0 +1,274 @@
+"""Storage for visitors' cart lines, behind CartService.
+
+``SQLCartStore`` keeps carts in the ``cart_items`` table and writes inside
+the caller's transaction, so a cart line and its stock hold commit
+together. ``RedisCartStore`` keeps each cart in one Redis hash, on any
+server speaking the Redis protocol. Idle carts expire there on their own.
+
+``CachedCartStore`` wraps either backend with an in-process LRU of carts
+and writes through it. A cart is read from the backend once, and every
+later read is served from memory until the entry expires. Reads made
+inside a write transaction (``load`` with ``db``) always go to the backend,
+so removals, quantity changes and checkout act on the stored cart even if
+another worker changed it.
+"""
+
+import json
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import get_db_session
+from app.core.logging import get_logger
+from app.core.metrics import MetricFamily, registry
+from app.models.product import CartItem
+from app.models.views import CartLine
+from app.services.product_service import MISSING, LRUCache
+
+logger = get_logger(__name__)
+
+
+class CartStore(ABC):
+    """Interface for cart line storage, keyed by session id.
+
+    Write methods take the caller's session; backends outside the database
+    ignore it and write immediately.
+    """
+
+    @abstractmethod
+    def load(self, session_id: str, db: Optional[Session] = None) -> List[CartLine]:
+        """Return the cart's lines in the order they were added"""
+
+    def cached(self, session_id: str) -> Optional[List[CartLine]]:
+        """Return the cart if it can be read without I/O, otherwise None"""
+        return None
+
+    @abstractmethod
+    def add(self, db: Session, session_id: str, product_id: int, size: str, color: str, quantity: int) -> CartLine:
+        """Add ``quantity`` to the matching line, creating it if needed; returns the line"""
+
+    @abstractmethod
+    def set_quantity(self, db: Session, session_id: str, line_id: int, quantity: int) -> None:
+        """Set a line's quantity; zero or less deletes it"""
+
+    @abstractmethod
+    def clear(self, db: Session, session_id: str) -> None:
+        """Delete every line of the cart"""
+
+    def evict(self, session_id: str) -> None:
+        """Forget any copy of the cart held in memory, e.g. after a failed write"""
+
+
+class SQLCartStore(CartStore):
+    """Carts as rows of the ``cart_items`` table"""
+
+    @staticmethod
+    def _load(db: Session, session_id: str) -> List[CartLine]:
+        stmt = (
+            select(CartItem.id, CartItem.product_id, CartItem.size, CartItem.color, CartItem.quantity)
+            .where(CartItem.session_id == session_id)
+            .order_by(CartItem.id)
+        )
+        return [CartLine(*row) for row in db.execute(stmt)]
+
+    def load(self, session_id: str, db: Optional[Session] = None) -> List[CartLine]:
+        if db is not None:
+            return self._load(db, session_id)
+        with get_db_session() as session:
+            return self._load(session, session_id)
+
+    def add(self, db: Session, session_id: str, product_id: int, size: str, color: str, quantity: int) -> CartLine:
+        stmt = select(CartItem).where(
+            CartItem.session_id == session_id,
+            CartItem.product_id == product_id,
+            CartItem.size == size,
+            CartItem.color == color
+        )
+        item = db.execute(stmt).scalar_one_or_none()
+        if item:
+            item.quantity += quantity
+        else:
+            item = CartItem(product_id=product_id, quantity=quantity, size=size, color=color, session_id=session_id)
+            db.add(item)
+        db.flush()
+        return CartLine(item.id, item.product_id, item.size, item.color, item.quantity)
+
+    def set_quantity(self, db: Session, session_id: str, line_id: int, quantity: int) -> None:
+        item = db.get(CartItem, line_id)
+        if not item or item.session_id != session_id:
+            return
+        if quantity <= 0:
+            db.delete(item)
+        else:
+            item.quantity = quantity
+        db.flush()
+
+    def clear(self, db: Session, session_id: str) -> None:
+        db.execute(delete(CartItem).where(CartItem.session_id == session_id))
+
+
+class RedisCartStore(CartStore):
+    """Carts as Redis hashes: ``cart:<session id>`` maps line ids to JSON lines.
+
+    Needs the optional ``redis`` package. Line ids come from one shared
+    counter, so they are unique across carts like ``cart_items`` ids.
+    """
+
+    LINE_IDS_KEY = "cart:line_ids"
+
+    def __init__(self, url: Optional[str] = None, ttl: Optional[float] = None):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CART_STORE_BACKEND=redis needs the redis package: pip install redis") from e
+        self.client = redis.Redis.from_url(url or settings.CART_STORE_REDIS_URL)
+        self.ttl = int(settings.CART_STORE_REDIS_TTL_SECONDS if ttl is None else ttl)
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"cart:{session_id}"
+
+    def load(self, session_id: str, db: Optional[Session] = None) -> List[CartLine]:
+        raw = self.client.hgetall(self._key(session_id))
+        lines = [CartLine(int(line_id), *json.loads(value)) for line_id, value in raw.items()]
+        return sorted(lines, key=lambda line: line.id)
+
+    def _write(self, session_id: str, line: CartLine) -> None:
+        key = self._key(session_id)
+        pipe = self.client.pipeline()
+        pipe.hset(key, str(line.id), json.dumps([line.product_id, line.size, line.color, line.quantity]))
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def add(self, db: Session, session_id: str, product_id: int, size: str, color: str, quantity: int) -> CartLine:
+        for line in self.load(session_id):
+            if (line.product_id, line.size, line.color) == (product_id, size, color):
+                line = line._replace(quantity=line.quantity + quantity)
+                break
+        else:
+            line = CartLine(self.client.incr(self.LINE_IDS_KEY), product_id, size, color, quantity)
+        self._write(session_id, line)
+        return line
+
+    def set_quantity(self, db: Session, session_id: str, line_id: int, quantity: int) -> None:
+        if quantity <= 0:
+            self.client.hdel(self._key(session_id), str(line_id))
+            return
+        for line in self.load(session_id):
+            if line.id == line_id:
+                self._write(session_id, line._replace(quantity=quantity))
+                return
+
+    def clear(self, db: Session, session_id: str) -> None:
+        self.client.delete(self._key(session_id))
+
+
+class CachedCartStore(CartStore):
+    """Write-through in-memory cache of whole carts in front of another store"""
+
+    def __init__(self, backend: CartStore, max_carts: Optional[int] = None, ttl: Optional[float] = None):
+        self.backend = backend
+        self._carts = LRUCache(
+            max_entries=settings.CART_CACHE_MAX_CARTS if max_carts is None else max_carts,
+            ttl=settings.CART_CACHE_TTL_SECONDS if ttl is None else ttl,
+        )
+
+    @staticmethod
+    def _tag(session_id: str) -> str:
+        return f"cart:{session_id}"
+
+    def _put(self, session_id: str, lines: List[CartLine]) -> None:
+        self._carts.set(session_id, tuple(lines), [self._tag(session_id)])
+
+    def load(self, session_id: str, db: Optional[Session] = None) -> List[CartLine]:
+        if db is None:
+            lines = self.cached(session_id)
+            if lines is not None:
+                return lines
+        lines = self.backend.load(session_id, db)
+        self._put(session_id, lines)
+        return lines
+
+    def cached(self, session_id: str) -> Optional[List[CartLine]]:
+        lines = self._carts.get(session_id)
+        return None if lines is MISSING else list(lines)
+
+    def add(self, db: Session, session_id: str, product_id: int, size: str, color: str, quantity: int) -> CartLine:
+        line = self.backend.add(db, session_id, product_id, size, color, quantity)
+        lines = self.cached(session_id)
+        if lines is not None:
+            if any(other.id == line.id for other in lines):
+                lines = [line if other.id == line.id else other for other in lines]
+            else:
+                lines.append(line)
+            self._put(session_id, lines)
+        return line
+
+    def set_quantity(self, db: Session, session_id: str, line_id: int, quantity: int) -> None:
+        self.backend.set_quantity(db, session_id, line_id, quantity)
+        lines = self.cached(session_id)
+        if lines is not None:
+            if quantity <= 0:
+                self._put(session_id, [line for line in lines if line.id != line_id])
+            else:
+                self._put(session_id, [line._replace(quantity=quantity) if line.id == line_id else line
+                                       for line in lines])
+
+    def clear(self, db: Session, session_id: str) -> None:
+        self.backend.clear(db, session_id)
+        self._put(session_id, [])
+
+    def evict(self, session_id: str) -> None:
+        self._carts.invalidate_tags(self._tag(session_id))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters of the cart cache"""
+        return self._carts.stats()
+
+
+def create_cart_store() -> CartStore:
+    """Build the cart store configured in settings"""
+    backend_name = settings.CART_STORE_BACKEND.lower()
+    if backend_name == "sql":
+        backend: CartStore = SQLCartStore()
+    elif backend_name == "redis":
+        backend = RedisCartStore()
+    else:
+        raise ValueError(f"Unknown CART_STORE_BACKEND: {settings.CART_STORE_BACKEND!r}")
+    if settings.CART_CACHE_MAX_CARTS <= 0:
+        return backend
+    return CachedCartStore(backend)
+
+
+_cart_store: Optional[CartStore] = None
+_cart_store_lock = threading.Lock()
+
+
+def get_cart_store() -> CartStore:
+    """Get the process-wide cart store shared by every CartService"""
+    global _cart_store
+    if _cart_store is None:
+        with _cart_store_lock:
+            if _cart_store is None:
+                _cart_store = create_cart_store()
+                logger.info(f"Using {type(_cart_store).__name__} for carts")
+    return _cart_store
+
+
+def _cart_cache_metrics() -> List[MetricFamily]:
+    """Cart cache counters, read at scrape time"""
+    if not isinstance(_cart_store, CachedCartStore):
+        return []
+    stats = _cart_store.stats()
+    return [
+        ("cart_cache_hit_ratio", "gauge", "Share of cart reads served from memory", [({}, stats["hit_ratio"])]),
+        ("cart_cache_entries", "gauge", "Carts held in memory", [({}, stats["size"])]),
+        ("cart_cache_hits_total", "counter", "Cart reads served from memory", [({}, stats["hits"])]),
+        ("cart_cache_misses_total", "counter", "Cart reads that went to the cart store", [({}, stats["misses"])]),
+    ]
+
+registry.register_collector(_cart_cache_metrics)
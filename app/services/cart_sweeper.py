@@ -0,0 +1,141 @@
+"""Deletion of abandoned carts from ``cart_items``.
+
+Every cart line records when it was last written (``updated_at``, which
+starts out as the creation time). A cart is abandoned once none of its
+lines changed for ``CART_IDLE_TTL_SECONDS``. ``CartSweeper`` deletes such
+carts and returns any stock they still hold, every
+``CART_SWEEP_INTERVAL_SECONDS``.
+
+A sweep walks old lines in ``(updated_at, session_id)`` order on their
+covering index, ``CART_SWEEP_BATCH_SIZE`` lines at a time, and deletes each
+batch's carts in its own short transaction, so other writers wait on the
+SQLite write lock for one batch at most. A cart that also has a recent
+line is skipped at delete time, and the walk keeps moving past it.
+Carts kept in Redis expire there on their own and have no rows to sweep.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, exists, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import get_db_session
+from app.core.logging import get_logger
+from app.core.metrics import registry
+from app.models.product import CartItem
+from app.services.cart_store import get_cart_store
+from app.services.reservation_service import ReservationService
+
+logger = get_logger(__name__)
+
+cart_sweep_rows = registry.counter("cart_sweep_rows_deleted_total", "Cart lines deleted by the abandoned-cart sweeper")
+cart_sweep_carts = registry.counter("cart_sweep_carts_deleted_total", "Abandoned carts deleted by the sweeper")
+cart_sweep_seconds = registry.histogram("cart_sweep_seconds", "Duration of abandoned-cart sweeps")
+
+
+class CartSweeper:
+    """Deletes carts idle for longer than a TTL, in small batches"""
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        reservations: Optional[ReservationService] = None
+    ):
+        self.ttl = settings.CART_IDLE_TTL_SECONDS if ttl is None else ttl
+        self.interval = settings.CART_SWEEP_INTERVAL_SECONDS if interval is None else interval
+        self.batch_size = settings.CART_SWEEP_BATCH_SIZE if batch_size is None else batch_size
+        self.reservations = reservations or ReservationService()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _delete_carts(self, db: Session, session_ids: List[str], cutoff: datetime) -> List[str]:
+        """Delete the carts among ``session_ids`` that are still idle; returns the deleted lines' sessions"""
+        items = CartItem.__table__
+        recent = items.alias("recent")
+        deleted = db.execute(
+            delete(items)
+            .where(
+                items.c.session_id.in_(session_ids),
+                ~exists().where(recent.c.session_id == items.c.session_id, recent.c.updated_at >= cutoff)
+            )
+            .returning(items.c.session_id)
+        ).scalars().all()
+        if deleted:
+            self.reservations.release_sessions(db, set(deleted))
+        return deleted
+
+    def sweep(self) -> int:
+        """Delete every cart idle for longer than the TTL; returns carts deleted"""
+        if self.ttl <= 0:
+            return 0
+        items = CartItem.__table__
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        position = None
+        carts = 0
+        started = time.perf_counter()
+        try:
+            while True:
+                stmt = (
+                    select(items.c.updated_at, items.c.session_id)
+                    .where(items.c.updated_at < cutoff, items.c.session_id.is_not(None))
+                    .order_by(items.c.updated_at, items.c.session_id)
+                    .limit(self.batch_size)
+                )
+                if position is not None:
+                    stmt = stmt.where(tuple_(items.c.updated_at, items.c.session_id) > tuple_(*position))
+                with get_db_session() as db:
+                    rows = db.execute(stmt).all()
+                    if not rows:
+                        break
+                    deleted = self._delete_carts(db, list({session_id for _, session_id in rows}), cutoff)
+                    db.commit()
+                position = tuple(rows[-1])
+
+                swept = set(deleted)
+                store = get_cart_store()
+                for session_id in swept:
+                    store.evict(session_id)
+                cart_sweep_rows.inc(len(deleted))
+                cart_sweep_carts.inc(len(swept))
+                carts += len(swept)
+                if len(rows) < self.batch_size:
+                    break
+                # Let waiting writers take the lock between batches
+                time.sleep(0)
+            if carts:
+                logger.info(f"Deleted {carts} abandoned carts")
+            return carts
+        except Exception as e:
+            logger.error(f"Error sweeping abandoned carts: {e}")
+            return carts
+        finally:
+            cart_sweep_seconds.observe(time.perf_counter() - started)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sweep()
+
+    def start(self) -> None:
+        """Start sweeping in a daemon thread; does nothing with ``CART_IDLE_TTL_SECONDS=0``"""
+        if self.ttl <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cart-sweeper", daemon=True)
+        self._thread.start()
+        logger.info(f"Abandoned-cart sweeper started ({self.ttl}s idle TTL)")
+
+    def stop(self) -> None:
+        """Stop sweeping"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+cart_sweeper = CartSweeper()
@@ -0,0 +1,250 @@
+"""Catalog change log for invalidating caches across worker processes.
+
+Every catalog write calls ``record_change`` inside its own transaction. It
+bumps the single-row ``catalog_version`` counter and appends the write's
+cache tags to ``catalog_changes`` under the new version. The counter row
+is locked until commit, so versions are contiguous and commit in order,
+and a rolled-back write leaves no trace.
+
+Each worker runs a ``ChangeFeed``. It polls the counter (one primary-key
+read) every ``CATALOG_CHANGES_POLL_INTERVAL_SECONDS``. When the counter
+has moved, it reads the new rows with ``changes_since`` and hands them to
+subscribers, which drop exactly the affected cache entries. A worker that
+fell behind the retained log gets a single ``reset`` change instead and
+flushes everything.
+
+Stock moves with every cart hold and release. Logging each of those would
+add a log row per cart click and make every cart write wait on the
+counter row, so they go through ``record_stock_change`` instead: the
+products are collected in the worker once the transaction commits and the
+feed logs them as one change per poll. The writing worker drops its own
+cache entries right away; other workers show stock up to about two poll
+intervals old (two seconds by default), and catalog edits up to one.
+Displayed stock is advisory: adding to cart and checkout always check
+stock in the database.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import get_db_session
+from app.core.logging import get_logger
+from app.core.metrics import registry
+from app.models.product import CatalogChange, CatalogVersion
+
+logger = get_logger(__name__)
+
+# Tag meaning "everything", for writes too broad to enumerate
+ALL = "*"
+
+catalog_changes_applied = registry.counter(
+    "catalog_changes_applied_total", "Catalog changes from the change log applied by this worker", ["kind"]
+)
+
+
+class ChangeRecord(NamedTuple):
+    """One logged catalog write"""
+
+    version: int
+    kind: str
+    tags: Tuple[str, ...]
+
+
+def record_change(db: Session, kind: str, tags: Iterable[str]) -> Optional[int]:
+    """Log a catalog write inside the caller's transaction; returns its version"""
+    if not settings.CATALOG_CHANGES_ENABLED:
+        return None
+    versions = CatalogVersion.__table__
+    bump = update(versions).where(versions.c.id == 1).values(version=versions.c.version + 1)
+    if db.bind.dialect.update_returning:
+        version = db.execute(bump.returning(versions.c.version)).scalar_one()
+    else:
+        db.execute(bump)
+        version = db.execute(select(versions.c.version).where(versions.c.id == 1)).scalar_one()
+    db.execute(insert(CatalogChange.__table__), {"version": version, "kind": kind, "tags": sorted(set(tags))})
+    return version
+
+
+# Products whose stock changed in committed transactions, not yet logged
+_pending_stock: Set[int] = set()
+_pending_stock_lock = threading.Lock()
+
+
+def _queue_stock_changes(session: Session) -> None:
+    product_ids = session.info.pop("stock_changes", None)
+    if product_ids:
+        with _pending_stock_lock:
+            _pending_stock.update(product_ids)
+
+
+def record_stock_change(db: Session, product_ids: Iterable[int]) -> None:
+    """Log stock changes to ``product_ids`` once the caller's transaction commits, coalesced"""
+    if not settings.CATALOG_CHANGES_ENABLED:
+        return
+    if not event.contains(db, "after_commit", _queue_stock_changes):
+        event.listen(db, "after_commit", _queue_stock_changes)
+    db.info.setdefault("stock_changes", set()).update(product_ids)
+
+
+def flush_stock_changes() -> Optional[int]:
+    """Log the stock changes queued by ``record_stock_change`` as one change; returns its version"""
+    with _pending_stock_lock:
+        if not _pending_stock:
+            return None
+        product_ids = sorted(_pending_stock)
+        _pending_stock.clear()
+    try:
+        with get_db_session() as db:
+            version = record_change(db, "stock", [f"product:{product_id}" for product_id in product_ids])
+            db.commit()
+        return version
+    except Exception as e:
+        with _pending_stock_lock:
+            _pending_stock.update(product_ids)
+        logger.error(f"Error logging stock changes: {e}")
+        return None
+
+
+def current_version(db: Optional[Session] = None) -> int:
+    """The latest committed catalog version"""
+    stmt = select(CatalogVersion.version).where(CatalogVersion.id == 1)
+    if db is not None:
+        return db.execute(stmt).scalar() or 0
+    with get_db_session() as session:
+        return session.execute(stmt).scalar() or 0
+
+
+def changes_since(version: int, limit: int = 1000, db: Optional[Session] = None) -> List[ChangeRecord]:
+    """Changes after ``version``, oldest first, at most ``limit``"""
+    stmt = (
+        select(CatalogChange.version, CatalogChange.kind, CatalogChange.tags)
+        .where(CatalogChange.version > version)
+        .order_by(CatalogChange.version)
+        .limit(limit)
+    )
+    if db is not None:
+        return [ChangeRecord(row_version, kind, tuple(tags or ())) for row_version, kind, tags in db.execute(stmt)]
+    with get_db_session() as session:
+        return changes_since(version, limit, session)
+
+
+def prune_changes(older_than: Optional[float] = None, batch_size: int = 5000) -> int:
+    """Delete log rows older than ``older_than`` seconds, in batches; returns rows deleted"""
+    seconds = settings.CATALOG_CHANGES_RETENTION_SECONDS if older_than is None else older_than
+    cutoff = datetime.utcnow() - timedelta(seconds=seconds)
+    deleted = 0
+    try:
+        while True:
+            with get_db_session() as db:
+                # Never prune the newest row, so the log always shows where it ends
+                newest = select(CatalogChange.version).order_by(CatalogChange.version.desc()).limit(1).scalar_subquery()
+                expired = (
+                    select(CatalogChange.version)
+                    .where(CatalogChange.created_at < cutoff, CatalogChange.version < newest)
+                    .order_by(CatalogChange.version)
+                    .limit(batch_size)
+                    .scalar_subquery()
+                )
+                count = db.execute(delete(CatalogChange).where(CatalogChange.version.in_(expired))).rowcount
+                db.commit()
+            deleted += count
+            if count < batch_size:
+                break
+        if deleted:
+            logger.info(f"Pruned {deleted} catalog change log rows")
+        return deleted
+    except Exception as e:
+        logger.error(f"Error pruning catalog change log: {e}")
+        return deleted
+
+
+class ChangeFeed:
+    """Polls the change log and hands new changes to subscribers"""
+
+    # Prune at most this often, from whichever worker gets there first
+    PRUNE_INTERVAL_SECONDS = 60.0
+
+    def __init__(self, interval: Optional[float] = None, batch_size: int = 1000):
+        self.interval = settings.CATALOG_CHANGES_POLL_INTERVAL_SECONDS if interval is None else interval
+        self.batch_size = batch_size
+        self.version: Optional[int] = None
+        self._subscribers: List[Callable[[List[ChangeRecord]], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_prune = time.monotonic()
+
+    def subscribe(self, callback: Callable[[List[ChangeRecord]], None]) -> None:
+        """Call ``callback`` with each batch of new changes, oldest first"""
+        self._subscribers.append(callback)
+
+    def _publish(self, changes: List[ChangeRecord]) -> None:
+        for callback in self._subscribers:
+            try:
+                callback(changes)
+            except Exception as e:
+                logger.error(f"Catalog change subscriber {getattr(callback, '__name__', callback)} failed: {e}")
+        for change in changes:
+            catalog_changes_applied.inc(kind=change.kind)
+
+    def poll(self) -> int:
+        """Publish changes committed since the last poll; returns how many"""
+        with self._lock:
+            with get_db_session() as db:
+                latest = current_version(db)
+                if self.version is None or latest < self.version:
+                    # First poll starts from now; a lower version means the database was replaced
+                    reset = self.version is not None
+                    self.version = latest
+                    if reset:
+                        self._publish([ChangeRecord(latest, "reset", (ALL,))])
+                    return int(reset)
+
+                published = 0
+                while self.version < latest:
+                    changes = changes_since(self.version, self.batch_size, db)
+                    if not changes or changes[0].version != self.version + 1:
+                        # Our position was pruned from the log: flush everything
+                        changes = [ChangeRecord(latest, "reset", (ALL,))]
+                    self._publish(changes)
+                    published += len(changes)
+                    self.version = changes[-1].version
+                return published
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            flush_stock_changes()
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Error polling catalog change log: {e}")
+            if time.monotonic() - self._last_prune >= self.PRUNE_INTERVAL_SECONDS:
+                self._last_prune = time.monotonic()
+                prune_changes()
+
+    def start(self) -> None:
+        """Start polling in a daemon thread"""
+        if not settings.CATALOG_CHANGES_ENABLED or (self._thread and self._thread.is_alive()):
+            return
+        try:
+            self.poll()
+        except Exception as e:
+            logger.error(f"Error reading catalog version: {e}")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-change-feed", daemon=True)
+        self._thread.start()
+        logger.info(f"Catalog change feed started at version {self.version}")
+
+    def stop(self) -> None:
+        """Stop polling, logging any stock changes still queued"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        flush_stock_changes()
@@ -0,0 +1,127 @@
+"""Streaming catalog import from CSV or JSONL files.
+
+Rows are read lazily and handed to ``ProductService.bulk_create_products``,
+which inserts them in fixed-size chunks, so memory stays bounded no matter
+how large the file is.
+
+Usage:
+    python -m app.services.catalog_import products.csv [--format csv|jsonl] [--chunk-size 1000]
+
+CSV columns match the ``Product`` fields; ``sizes`` and ``colors`` may be a
+JSON array or a ``|``-separated list.
+"""
+
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+IMPORT_FORMATS = ("csv", "jsonl")
+REQUIRED_FIELDS = ("name", "price", "category")
+DEFAULT_BRAND = "Adidas"
+
+
+def detect_format(path: Union[str, Path]) -> str:
+    """Guess the import format from the file extension"""
+    suffix = Path(path).suffix.lower().lstrip(".")
+    if suffix in ("jsonl", "ndjson"):
+        return "jsonl"
+    if suffix == "csv":
+        return "csv"
+    raise ValueError(f"Cannot detect import format of {path}; pass one of {IMPORT_FORMATS}")
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None or value == "":
+        return []
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    value = str(value).strip()
+    if value.startswith("["):
+        return [str(item) for item in json.loads(value)]
+    return [item.strip() for item in value.split("|") if item.strip()]
+
+
+def normalize_row(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Coerce a raw CSV/JSON record into ``Product`` column values.
+
+    Every row gets the same keys so chunks can be inserted with one
+    executemany call. Raises ValueError for rows missing required fields.
+    """
+    missing = [field for field in REQUIRED_FIELDS if raw.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"missing required fields: {', '.join(missing)}")
+    return {
+        "name": str(raw["name"]).strip(),
+        "brand": str(raw.get("brand") or DEFAULT_BRAND).strip(),
+        "price": float(raw["price"]),
+        "description": raw.get("description") or None,
+        "category": str(raw["category"]).strip(),
+        "sizes": _as_list(raw.get("sizes")),
+        "colors": _as_list(raw.get("colors")),
+        "stock": int(raw.get("stock") or 0),
+        "image_url": raw.get("image_url") or None,
+    }
+
+
+def iter_catalog_rows(path: Union[str, Path], fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream raw records from a CSV or JSONL file one at a time"""
+    fmt = fmt or detect_format(path)
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    with open(path, newline="", encoding="utf-8") as handle:
+        if fmt == "csv":
+            yield from csv.DictReader(handle)
+        else:
+            for line_number, line in enumerate(handle, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Skipping malformed JSON on line {line_number}: {e}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Bulk import products from CSV or JSONL")
+    parser.add_argument("path", help="Path to a .csv or .jsonl catalog file")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default=None,
+                        help="File format (detected from the extension by default)")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Rows per insert transaction (default: CATALOG_IMPORT_CHUNK_SIZE)")
+    args = parser.parse_args(argv)
+
+    from app.core.database import create_tables
+    from app.services.product_service import ProductService
+
+    create_tables()
+
+    def report(stats: Dict[str, Any]) -> None:
+        print(f"  {stats['rows']:>10,} rows  {stats['rows_per_sec']:>10,.0f} rows/sec", flush=True)
+
+    try:
+        stats = ProductService().bulk_import(
+            args.path, fmt=args.format, chunk_size=args.chunk_size, on_chunk=report
+        )
+    except (OSError, ValueError) as e:
+        print(f"Import failed: {e}", file=sys.stderr)
+        return 1
+
+    print(
+        f"Imported {stats['rows']:,} products ({stats['skipped']:,} skipped) "
+        f"in {stats['seconds']:.2f}s - {stats['rows_per_sec']:,.0f} rows/sec"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
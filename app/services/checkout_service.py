@@ -0,0 +1,206 @@
+"""Checkout: turn a cart into an order in one transaction.
+
+Placing an order prices the cart with the same joined query as the cart
+view, inserts the order and all of its lines (one executemany), converts
+the cart's stock holds into a sale and empties the cart, then commits
+once, along with the jobs for the order's follow-up work (confirmation
+email, inventory sync, analytics), which the job workers run afterwards.
+Stock was held line by line as items were added; at checkout only
+lines whose hold lapsed take stock again, all in one conditional batch
+statement, so a short line rolls the whole order back.
+
+An optional idempotency key makes retries safe. The key is unique on
+``orders``: a retry after a commit finds the order it placed, and a
+concurrent duplicate fails on the key before its transaction commits, so
+stock is never taken twice.
+"""
+
+import asyncio
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.database import get_async_db_session, get_db_session
+from app.core.logging import get_logger
+from app.core.metrics import registry
+from app.models.product import Order, OrderLine
+from app.models.views import CartLine, CartView, OrderView
+from app.services.cart_service import AsyncCartService, CartService, cart_view_params, cart_view_statement
+from app.services.jobs import job_workers
+from app.services.order_jobs import enqueue_order_jobs
+
+logger = get_logger(__name__)
+
+checkouts = registry.counter(
+    "checkouts_total", "Checkout attempts by outcome (placed, replayed, rejected, failed)", ("outcome",)
+)
+
+
+def _order_view(order: Order, replayed: bool = False) -> OrderView:
+    return OrderView(order.id, order.status, order.total, order.total_quantity, replayed)
+
+
+class CheckoutService:
+    """Service placing orders for one visitor's cart"""
+
+    def __init__(self, cart: Optional[CartService] = None):
+        self.cart = cart or CartService()
+
+    @property
+    def session_id(self) -> str:
+        return self.cart.session_id
+
+    def checkout(self, idempotency_key: Optional[str] = None, customer_email: Optional[str] = None) -> Optional[OrderView]:
+        """Place an order for the cart and empty it.
+
+        Returns the order, or the one already placed with ``idempotency_key``.
+        Raises ValueError if the cart is empty or stock is short; returns None
+        on other errors.
+        """
+        try:
+            if self.cart.buffer is not None:
+                self.cart.buffer.flush([self.session_id])
+            existing = self.find_order(idempotency_key)
+            if existing is not None:
+                checkouts.inc(outcome="replayed")
+                return existing
+            with get_db_session() as db:
+                order, product_ids = self._place_order(db, idempotency_key, customer_email)
+                db.commit()
+            if order.replayed:
+                checkouts.inc(outcome="replayed")
+                return order
+        except IntegrityError:
+            # A concurrent attempt with the same key committed first
+            self.cart.store.evict(self.session_id)
+            checkouts.inc(outcome="replayed")
+            return self.find_order(idempotency_key)
+        except ValueError as e:
+            self.cart.store.evict(self.session_id)
+            checkouts.inc(outcome="rejected")
+            logger.warning(f"Checkout rejected: {e}")
+            raise
+        except Exception as e:
+            self.cart.store.evict(self.session_id)
+            checkouts.inc(outcome="failed")
+            logger.error(f"Error placing order: {e}")
+            return None
+        self.cart.product_service.invalidate_products(*product_ids)
+        job_workers.wake()
+        checkouts.inc(outcome="placed")
+        logger.info(f"Placed order {order.id}")
+        return order
+
+    def find_order(self, idempotency_key: Optional[str]) -> Optional[OrderView]:
+        """Get the order placed with ``idempotency_key``, if any"""
+        if not idempotency_key:
+            return None
+        # On the primary: a replica may not have the order a moment ago's attempt placed
+        with get_db_session() as db:
+            return self._find_order(db, idempotency_key)
+
+    @staticmethod
+    def _find_order(db: Session, idempotency_key: Optional[str]) -> Optional[OrderView]:
+        if not idempotency_key:
+            return None
+        order = db.execute(select(Order).where(Order.idempotency_key == idempotency_key)).scalar_one_or_none()
+        return _order_view(order, replayed=True) if order else None
+
+    def _place_order(
+        self, db: Session, idempotency_key: Optional[str], customer_email: Optional[str]
+    ) -> Tuple[OrderView, Set[int]]:
+        """Write the order inside the caller's transaction; returns it and the affected product ids.
+
+        If the cart was already checked out with ``idempotency_key``, returns
+        that order (marked replayed) and writes nothing.
+        """
+        lines: List[CartLine] = self.cart.store.load(self.session_id, db)
+        if not lines:
+            # A concurrent attempt with the same key may have emptied the cart
+            existing = self._find_order(db, idempotency_key)
+            if existing is not None:
+                return existing, set()
+            raise ValueError("Cart is empty")
+        cart = CartView.from_rows(db.execute(cart_view_statement(len(lines)), cart_view_params(lines)))
+        if cart.item_count != len(lines):
+            raise ValueError("Some items in the cart are no longer available")
+
+        # The order row goes first: a duplicate key fails here, before any stock moves
+        order = Order(
+            total=cart.total,
+            total_quantity=cart.total_quantity,
+            session_id=self.session_id,
+            idempotency_key=idempotency_key or None,
+            customer_email=customer_email
+        )
+        db.add(order)
+        db.flush()
+        db.execute(insert(OrderLine.__table__), [
+            {"order_id": order.id, "product_id": line.product_id, "size": line.size, "color": line.color,
+             "quantity": line.quantity, "unit_price": product.price, "subtotal": subtotal}
+            for line, product, subtotal in cart.lines
+        ])
+        enqueue_order_jobs(db, order.id)
+
+        self.cart.reservations.consume(
+            db, self.session_id, [(line.product_id, line.size, line.color, line.quantity) for line in lines]
+        )
+        self.cart.store.clear(db, self.session_id)
+        return _order_view(order), {line.product_id for line in lines}
+
+
+class AsyncCheckoutService:
+    """Asyncio variant of CheckoutService, running the same transaction on the async engine"""
+
+    def __init__(self, cart: Optional[AsyncCartService] = None):
+        self.cart = cart or AsyncCartService()
+        self.checkout_service = CheckoutService(self.cart.cart)
+
+    @property
+    def session_id(self) -> str:
+        return self.cart.session_id
+
+    async def checkout(self, idempotency_key: Optional[str] = None, customer_email: Optional[str] = None) -> Optional[OrderView]:
+        """Place an order for the cart and empty it; see ``CheckoutService.checkout``"""
+        service = self.checkout_service
+        try:
+            if service.cart.buffer is not None:
+                await asyncio.to_thread(service.cart.buffer.flush, [self.session_id])
+            existing = await self.find_order(idempotency_key)
+            if existing is not None:
+                checkouts.inc(outcome="replayed")
+                return existing
+            async with get_async_db_session() as db:
+                order, product_ids = await db.run_sync(service._place_order, idempotency_key, customer_email)
+                await db.commit()
+            if order.replayed:
+                checkouts.inc(outcome="replayed")
+                return order
+        except IntegrityError:
+            service.cart.store.evict(self.session_id)
+            checkouts.inc(outcome="replayed")
+            return await self.find_order(idempotency_key)
+        except ValueError as e:
+            service.cart.store.evict(self.session_id)
+            checkouts.inc(outcome="rejected")
+            logger.warning(f"Checkout rejected: {e}")
+            raise
+        except Exception as e:
+            service.cart.store.evict(self.session_id)
+            checkouts.inc(outcome="failed")
+            logger.error(f"Error placing order: {e}")
+            return None
+        self.cart.product_service.invalidate_products(*product_ids)
+        job_workers.wake()
+        checkouts.inc(outcome="placed")
+        logger.info(f"Placed order {order.id}")
+        return order
+
+    async def find_order(self, idempotency_key: Optional[str]) -> Optional[OrderView]:
+        """Get the order placed with ``idempotency_key``, if any"""
+        if not idempotency_key:
+            return None
+        async with get_async_db_session() as db:
+            return await db.run_sync(CheckoutService._find_order, idempotency_key)
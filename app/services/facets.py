@@ -0,0 +1,222 @@
+"""Faceted filtering over the product catalog.
+
+``FacetIndex`` keeps, for every facet value (a size, a color, a category,
+a price band), a bitset of the product ids carrying it. Python ints serve
+as bitsets: bit ``n`` is set when product ``n`` has the value. A filter
+combination is a handful of ORs and ANDs over those ints, and the count for
+every remaining facet value is one AND plus a popcount.
+
+Values within one facet are ORed, facets are ANDed. Counts are
+"disjunctive": the counts shown for a facet ignore that facet's own
+selection, so picking "Core Black" still shows how many products the
+other colors would add.
+"""
+
+import heapq
+import threading
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.core.database import engine as default_engine
+from app.core.logging import get_logger
+from app.models.product import Product
+
+logger = get_logger(__name__)
+
+FACETS: Tuple[str, ...] = ("category", "size", "color", "price_band")
+
+# (label, lower bound inclusive, upper bound exclusive)
+PRICE_BANDS: Tuple[Tuple[str, float, Optional[float]], ...] = (
+    ("under-50", 0.0, 50.0),
+    ("50-100", 50.0, 100.0),
+    ("100-150", 100.0, 150.0),
+    ("150-200", 150.0, 200.0),
+    ("200-plus", 200.0, None),
+)
+
+# Bit offsets set in each byte value, for fast bitset -> id expansion
+_BYTE_BITS: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)
+)
+
+
+def price_band(price: Optional[float]) -> str:
+    """Return the price band label for a price"""
+    price = price or 0.0
+    for label, low, high in PRICE_BANDS:
+        if price >= low and (high is None or price < high):
+            return label
+    return PRICE_BANDS[0][0]
+
+
+def popcount(bits: int) -> int:
+    """Number of set bits"""
+    return bits.bit_count() if hasattr(bits, "bit_count") else bin(bits).count("1")
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Yield the positions of set bits in ascending order"""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for index, byte in enumerate(data):
+        if byte:
+            base = index * 8
+            for bit in _BYTE_BITS[byte]:
+                yield base + bit
+
+
+class FacetResult:
+    """Matching products and per-facet value counts for one filter combination"""
+
+    __slots__ = ("bits", "total", "counts")
+
+    def __init__(self, bits: int, counts: Dict[str, Dict[str, int]]):
+        self.bits = bits
+        self.total = popcount(bits)
+        self.counts = counts
+
+    @property
+    def product_ids(self) -> List[int]:
+        return list(iter_bits(self.bits))
+
+
+class FacetIndex:
+    """In-process facet postings, kept current by ProductService writes"""
+
+    def __init__(self, bind: Engine):
+        self.engine = bind
+        self._postings: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        self._values: Dict[int, Dict[str, Tuple[str, ...]]] = {}
+        self._sort_keys: Dict[int, Tuple[str, int]] = {}
+        self._universe = 0
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _facet_values(category: str, sizes: Iterable[str], colors: Iterable[str],
+                      price: Optional[float]) -> Dict[str, Tuple[str, ...]]:
+        return {
+            "category": (category,) if category else (),
+            "size": tuple(dict.fromkeys(str(size) for size in sizes or ())),
+            "color": tuple(dict.fromkeys(str(color) for color in colors or ())),
+            "price_band": (price_band(price),),
+        }
+
+    def _add(self, product_id: int, name: str, values: Dict[str, Tuple[str, ...]]) -> None:
+        bit = 1 << product_id
+        for facet, facet_values in values.items():
+            postings = self._postings[facet]
+            for value in facet_values:
+                postings[value] = postings.get(value, 0) | bit
+        self._values[product_id] = values
+        self._sort_keys[product_id] = (name, product_id)
+        self._universe |= bit
+
+    def _remove(self, product_id: int) -> None:
+        values = self._values.pop(product_id, None)
+        if values is None:
+            return
+        mask = ~(1 << product_id)
+        for facet, facet_values in values.items():
+            postings = self._postings[facet]
+            for value in facet_values:
+                remaining = postings.get(value, 0) & mask
+                if remaining:
+                    postings[value] = remaining
+                else:
+                    postings.pop(value, None)
+        self._sort_keys.pop(product_id, None)
+        self._universe &= mask
+
+    def rebuild(self) -> None:
+        """Reload all postings from the products table"""
+        stmt = select(Product.id, Product.name, Product.category, Product.sizes, Product.colors, Product.price)
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+        with self._lock:
+            self._postings = {facet: {} for facet in FACETS}
+            self._values = {}
+            self._sort_keys = {}
+            self._universe = 0
+            for product_id, name, category, sizes, colors, price in rows:
+                self._add(product_id, name, self._facet_values(category, sizes, colors, price))
+            self._loaded = True
+        logger.info(f"Built facet index for {len(rows)} products")
+
+    def invalidate(self) -> None:
+        """Drop all postings; they are reloaded on the next query"""
+        with self._lock:
+            self._loaded = False
+
+    def index_product(self, product: Product) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            self._remove(product.id)
+            self._add(product.id, product.name,
+                      self._facet_values(product.category, product.sizes, product.colors, product.price))
+
+    def remove_product(self, product_id: int) -> None:
+        with self._lock:
+            if self._loaded:
+                self._remove(product_id)
+
+    def query(self, filters: Optional[Mapping[str, Iterable[str]]] = None) -> FacetResult:
+        """Match products against ``{facet: [values]}`` and count every facet value"""
+        if not self._loaded:
+            self.rebuild()
+        with self._lock:
+            selected: Dict[str, int] = {}
+            for facet, values in (filters or {}).items():
+                if facet not in self._postings:
+                    raise ValueError(f"Unknown facet: {facet}")
+                values = list(values)
+                if not values:
+                    continue
+                bits = 0
+                for value in values:
+                    bits |= self._postings[facet].get(str(value), 0)
+                selected[facet] = bits
+
+            matched = self._universe
+            for bits in selected.values():
+                matched &= bits
+
+            counts: Dict[str, Dict[str, int]] = {}
+            for facet, postings in self._postings.items():
+                base = self._universe
+                for other, bits in selected.items():
+                    if other != facet:
+                        base &= bits
+                facet_counts = {}
+                for value, bits in postings.items():
+                    count = popcount(base & bits)
+                    if count:
+                        facet_counts[value] = count
+                counts[facet] = facet_counts
+            return FacetResult(matched, counts)
+
+    def page(self, result: FacetResult, limit: Optional[int],
+             after: Optional[Tuple[str, int]] = None) -> List[int]:
+        """Return matching ids ordered by ``(name, id)``, starting after a keyset position"""
+        with self._lock:
+            keys = (self._sort_keys[pid] for pid in iter_bits(result.bits) if pid in self._sort_keys)
+            if after is not None:
+                keys = (key for key in keys if key > after)
+            ordered = heapq.nsmallest(limit, keys) if limit is not None else sorted(keys)
+        return [product_id for _, product_id in ordered]
+
+
+_facet_index: Optional[FacetIndex] = None
+_facet_index_lock = threading.Lock()
+
+
+def get_facet_index() -> FacetIndex:
+    """Get the process-wide facet index for the default engine"""
+    global _facet_index
+    if _facet_index is None:
+        with _facet_index_lock:
+            if _facet_index is None:
+                _facet_index = FacetIndex(default_engine)
+    return _facet_index
@@ -0,0 +1,292 @@
+"""Variant-level inventory: per size/color stock for products"""
+
+from itertools import product as combinations
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, case, delete, exists, func, insert, select, update
+from app.core.database import get_db_session
+from app.models.product import Product, ProductVariant
+from app.services.catalog_changes import record_stock_change
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# (product_id, size, color, quantity)
+StockLine = Tuple[int, str, str, int]
+
+def merge_lines(lines: Iterable[StockLine]) -> Dict[Tuple[int, str, str], int]:
+    """Sum quantities per variant so each variant is touched once per batch"""
+    totals: Dict[Tuple[int, str, str], int] = {}
+    for product_id, size, color, quantity in lines:
+        if quantity > 0:
+            key = (product_id, size or "", color or "")
+            totals[key] = totals.get(key, 0) + quantity
+    return totals
+
+def split_stock(total: int, parts: int) -> List[int]:
+    """Spread a stock count as evenly as possible over ``parts`` variants"""
+    if parts <= 0:
+        return []
+    base, remainder = divmod(max(total or 0, 0), parts)
+    return [base + 1 if index < remainder else base for index in range(parts)]
+
+def variant_rows(product_id: int, sizes: Sequence[str], colors: Sequence[str], stock: int) -> List[Dict]:
+    """Expand a product's JSON sizes/colors into variant rows.
+
+    Products without sizes or colors get a single variant with an empty
+    value for the missing dimension, matching the cart's defaults.
+    """
+    keys = list(combinations(list(dict.fromkeys(sizes or [""])), list(dict.fromkeys(colors or [""]))))
+    return [
+        {"product_id": product_id, "size": size, "color": color, "stock": quantity}
+        for (size, color), quantity in zip(keys, split_stock(stock, len(keys)))
+    ]
+
+class InventoryService:
+    """Service for variant stock lookups and adjustments"""
+
+    def create_variants(self, db: Session, product: Product) -> int:
+        """Create variants for a new product inside the caller's transaction"""
+        rows = variant_rows(product.id, product.sizes, product.colors, product.stock)
+        if rows:
+            db.execute(insert(ProductVariant.__table__), rows)
+        return len(rows)
+
+    def sync_variants(self, db: Session, product: Product) -> None:
+        """Add variants for new size/color options and drop removed ones.
+
+        New combinations start with no stock; existing stock is untouched and
+        the product total is recomputed from what remains.
+        """
+        wanted = {(row["size"], row["color"]) for row in variant_rows(product.id, product.sizes, product.colors, 0)}
+        stmt = select(ProductVariant.size, ProductVariant.color).where(ProductVariant.product_id == product.id)
+        existing = {(size, color) for size, color in db.execute(stmt)}
+
+        for size, color in existing - wanted:
+            db.execute(delete(ProductVariant).where(
+                ProductVariant.product_id == product.id,
+                ProductVariant.size == size,
+                ProductVariant.color == color
+            ))
+        missing = [
+            {"product_id": product.id, "size": size, "color": color, "stock": 0}
+            for size, color in wanted - existing
+        ]
+        if missing:
+            db.execute(insert(ProductVariant.__table__), missing)
+        if missing or existing - wanted:
+            total = (
+                select(func.coalesce(func.sum(ProductVariant.stock), 0))
+                .where(ProductVariant.product_id == product.id)
+                .scalar_subquery()
+            )
+            db.execute(update(Product).where(Product.id == product.id).values(stock=total))
+
+    def delete_variants(self, db: Session, product_id: int) -> None:
+        """Delete a product's variants inside the caller's transaction"""
+        db.execute(delete(ProductVariant).where(ProductVariant.product_id == product_id))
+
+    def migrate_variants_from_json(self, chunk_size: int = 1000) -> int:
+        """Create variants for every product that has none yet.
+
+        Stock is split across the product's size x color combinations. Runs
+        in chunks of products keyed by id, one transaction per chunk, and is
+        safe to re-run.
+        """
+        created = 0
+        last_id = 0
+        try:
+            while True:
+                with get_db_session() as db:
+                    stmt = (
+                        select(Product.id, Product.sizes, Product.colors, Product.stock)
+                        .where(Product.id > last_id)
+                        .where(~exists().where(ProductVariant.product_id == Product.id))
+                        .order_by(Product.id)
+                        .limit(chunk_size)
+                    )
+                    products = db.execute(stmt).all()
+                    if not products:
+                        break
+
+                    rows = []
+                    for product_id, sizes, colors, stock in products:
+                        rows.extend(variant_rows(product_id, sizes, colors, stock))
+                    if rows:
+                        db.execute(insert(ProductVariant.__table__), rows)
+                    db.commit()
+                    created += len(rows)
+                    last_id = products[-1][0]
+
+            if created:
+                logger.info(f"Migrated {created} product variants from JSON sizes/colors")
+            return created
+        except Exception as e:
+            logger.error(f"Error migrating product variants: {e}")
+            raise
+
+    def get_variants(self, product_id: int) -> List[ProductVariant]:
+        """Get all variants of a product"""
+        try:
+            with get_db_session() as db:
+                stmt = select(ProductVariant).where(ProductVariant.product_id == product_id).order_by(ProductVariant.id)
+                return list(db.execute(stmt).scalars().all())
+        except Exception as e:
+            logger.error(f"Error getting variants for product {product_id}: {e}")
+            return []
+
+    def get_variant_stock(self, product_id: int, size: str, color: str) -> Optional[int]:
+        """Get stock for one variant, or None if the variant does not exist"""
+        try:
+            with get_db_session() as db:
+                stmt = select(ProductVariant.stock).where(
+                    ProductVariant.product_id == product_id,
+                    ProductVariant.size == size,
+                    ProductVariant.color == color
+                )
+                return db.execute(stmt).scalar_one_or_none()
+        except Exception as e:
+            logger.error(f"Error getting stock for product {product_id} ({size}, {color}): {e}")
+            return None
+
+    def take_stock(self, db: Session, product_id: int, size: str, color: str, quantity: int) -> None:
+        """Decrement one variant's stock inside the caller's transaction"""
+        self.take_stock_batch(db, [(product_id, size, color, quantity)])
+
+    def return_stock(self, db: Session, product_id: int, size: str, color: str, quantity: int) -> None:
+        """Put stock back on one variant inside the caller's transaction"""
+        self.return_stock_batch(db, [(product_id, size, color, quantity)])
+
+    def take_stock_batch(self, db: Session, lines: Iterable[StockLine]) -> None:
+        """Decrement stock for many variants inside the caller's transaction.
+
+        One executemany of ``UPDATE ... SET stock = stock - n WHERE stock >= n``
+        checks and decrements every line, so concurrent buyers cannot
+        oversell and no row is read first. If any line is short the total
+        rowcount falls short and ValueError is raised; the caller's session
+        rolls the whole batch back.
+        """
+        totals = merge_lines(lines)
+        if not totals:
+            return
+        params = [
+            {"p_id": product_id, "p_size": size, "p_color": color, "p_qty": quantity}
+            for (product_id, size, color), quantity in totals.items()
+        ]
+        variants = ProductVariant.__table__
+        stmt = (
+            update(variants)
+            .where(
+                variants.c.product_id == bindparam("p_id"),
+                variants.c.size == bindparam("p_size"),
+                variants.c.color == bindparam("p_color"),
+                variants.c.stock >= bindparam("p_qty")
+            )
+            .values(stock=variants.c.stock - bindparam("p_qty"))
+        )
+        if db.bind.dialect.supports_sane_multi_rowcount:
+            updated = db.execute(stmt, params).rowcount
+        else:
+            updated = sum(db.execute(stmt, row).rowcount for row in params)
+
+        if updated != len(params):
+            if len(params) == 1:
+                row = params[0]
+                if not self._variant_exists(db, row["p_id"], row["p_size"], row["p_color"]):
+                    raise ValueError("Selected size/color is not available")
+                raise ValueError("Insufficient stock")
+            raise ValueError("Insufficient stock for one or more items")
+        self._adjust_product_totals(db, totals, -1)
+
+    def return_stock_batch(self, db: Session, lines: Iterable[StockLine]) -> None:
+        """Put stock back on many variants inside the caller's transaction"""
+        totals = merge_lines(lines)
+        if not totals:
+            return
+        params = [
+            {"p_id": product_id, "p_size": size, "p_color": color, "p_qty": quantity}
+            for (product_id, size, color), quantity in totals.items()
+        ]
+        variants = ProductVariant.__table__
+        db.execute(
+            update(variants)
+            .where(
+                variants.c.product_id == bindparam("p_id"),
+                variants.c.size == bindparam("p_size"),
+                variants.c.color == bindparam("p_color")
+            )
+            .values(stock=variants.c.stock + bindparam("p_qty")),
+            params
+        )
+        self._adjust_product_totals(db, totals, 1)
+
+    def adjust_stock(
+        self, db: Session, product_id: int, quantity: int, size: Optional[str] = None, color: Optional[str] = None
+    ) -> bool:
+        """Add stock to a product's variants, or remove it if ``quantity`` is negative.
+
+        Only variants matching ``size``/``color`` are touched when given.
+        Added stock is split evenly over them; removed stock comes off them
+        in order and no variant goes below zero. Each variant is updated
+        relative to its current value, so concurrent checkouts are not
+        overwritten, and the product total is recomputed from its variants.
+        Returns False if no variant matches.
+        """
+        stmt = select(ProductVariant.id, ProductVariant.stock).where(ProductVariant.product_id == product_id)
+        if size is not None:
+            stmt = stmt.where(ProductVariant.size == size)
+        if color is not None:
+            stmt = stmt.where(ProductVariant.color == color)
+        rows = db.execute(stmt.order_by(ProductVariant.id)).all()
+        if not rows:
+            return False
+
+        if quantity >= 0:
+            deltas = split_stock(quantity, len(rows))
+        else:
+            deltas, remaining = [], -quantity
+            for _, stock in rows:
+                taken = min(max(stock, 0), remaining)
+                deltas.append(-taken)
+                remaining -= taken
+        params = [{"v_id": variant_id, "v_delta": delta} for (variant_id, _), delta in zip(rows, deltas) if delta]
+        if params:
+            variants = ProductVariant.__table__
+            new_stock = variants.c.stock + bindparam("v_delta")
+            db.execute(
+                update(variants)
+                .where(variants.c.id == bindparam("v_id"))
+                .values(stock=case((new_stock < 0, 0), else_=new_stock)),
+                params
+            )
+        total = (
+            select(func.coalesce(func.sum(ProductVariant.stock), 0))
+            .where(ProductVariant.product_id == product_id)
+            .scalar_subquery()
+        )
+        db.execute(update(Product).where(Product.id == product_id).values(stock=total))
+        return True
+
+    @staticmethod
+    def _variant_exists(db: Session, product_id: int, size: str, color: str) -> bool:
+        stmt = select(ProductVariant.id).where(
+            ProductVariant.product_id == product_id,
+            ProductVariant.size == size,
+            ProductVariant.color == color
+        )
+        return db.execute(stmt).first() is not None
+
+    @staticmethod
+    def _adjust_product_totals(db: Session, totals: Dict[Tuple[int, str, str], int], sign: int) -> None:
+        # Product.stock stays the denormalised sum of its variants for listings
+        per_product: Dict[int, int] = {}
+        for (product_id, _, _), quantity in totals.items():
+            per_product[product_id] = per_product.get(product_id, 0) + sign * quantity
+        products = Product.__table__
+        db.execute(
+            update(products)
+            .where(products.c.id == bindparam("p_id"))
+            .values(stock=products.c.stock + bindparam("p_delta")),
+            [{"p_id": product_id, "p_delta": delta} for product_id, delta in per_product.items()]
+        )
+        record_stock_change(db, per_product)
@@ -0,0 +1,301 @@
+"""Durable background jobs: a queue in the ``jobs`` table and a worker pool.
+
+``enqueue`` adds a job inside the caller's transaction, so a job exists
+exactly when the write that asked for it commits (checkout enqueues its
+follow-up work with the order). Handlers are plain module-level functions
+taking the JSON payload, registered by kind with ``@job_handler``.
+
+Delivery is at least once. A worker claims due jobs in one ``UPDATE ...
+RETURNING``, which marks them running until ``JOB_VISIBILITY_TIMEOUT_SECONDS``
+from now; a job whose worker dies is claimed again once that lapses, so
+handlers must tolerate running twice. A finished job is deleted. A failed
+one is queued again after an exponential, jittered backoff computed by
+tenacity, until ``JOB_MAX_ATTEMPTS`` runs, and is then kept as ``dead``
+with its last error.
+
+``JobWorkerPool`` runs handlers on ``JOB_WORKERS`` threads, or processes
+with ``JOB_WORKER_MODE=process`` (handlers are then imported by reference
+in each worker, and anything they record in memory stays there). One
+dispatcher thread claims only as many jobs as there are idle workers.
+"""
+
+import threading
+import time
+import traceback
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from tenacity import (
+    RetryCallState, Retrying, retry_if_exception_type, stop_after_attempt, wait_exponential, wait_random_exponential
+)
+
+from app.core.config import settings
+from app.core.database import get_db_session
+from app.core.logging import get_logger
+from app.core.metrics import MetricFamily, registry
+from app.models.product import Job
+
+logger = get_logger(__name__)
+
+Handler = Callable[[Dict[str, Any]], None]
+
+jobs_processed = registry.counter(
+    "jobs_processed_total", "Background job runs by outcome (done, retry, dead)", ("kind", "outcome")
+)
+job_duration = registry.histogram("job_duration_seconds", "Background job run time", ("kind",))
+
+_handlers: Dict[str, Handler] = {}
+
+
+def job_handler(kind: str) -> Callable[[Handler], Handler]:
+    """Register a module-level function as the handler for ``kind`` jobs"""
+    def register(handler: Handler) -> Handler:
+        _handlers[kind] = handler
+        return handler
+    return register
+
+
+class ClaimedJob(NamedTuple):
+    """A job claimed by this process, with the run number it was claimed for"""
+
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempt: int
+    max_attempts: int
+
+
+# SQLite reports "database is locked" when a writer waits too long; retry those briefly
+_db_retry = Retrying(
+    retry=retry_if_exception_type(OperationalError),
+    wait=wait_exponential(multiplier=0.05, max=1.0),
+    stop=stop_after_attempt(5),
+    reraise=True
+)
+
+
+class JobQueue:
+    """The ``jobs`` table: enqueue, claim, acknowledge and fail jobs"""
+
+    def __init__(
+        self,
+        visibility_timeout: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        backoff: Optional[float] = None,
+        backoff_max: Optional[float] = None
+    ):
+        self.visibility_timeout = (
+            settings.JOB_VISIBILITY_TIMEOUT_SECONDS if visibility_timeout is None else visibility_timeout
+        )
+        self.max_attempts = settings.JOB_MAX_ATTEMPTS if max_attempts is None else max_attempts
+        self._backoff = wait_random_exponential(
+            multiplier=settings.JOB_RETRY_BACKOFF_SECONDS if backoff is None else backoff,
+            max=settings.JOB_RETRY_BACKOFF_MAX_SECONDS if backoff_max is None else backoff_max
+        )
+
+    def enqueue(self, db: Session, kind: str, payload: Dict[str, Any], delay: float = 0.0) -> None:
+        """Add a job inside the caller's transaction"""
+        db.execute(insert(Job.__table__), {
+            "kind": kind, "payload": payload, "status": "queued", "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "available_at": datetime.utcnow() + timedelta(seconds=delay)
+        })
+
+    def retry_delay(self, attempt: int) -> float:
+        """Seconds to wait before running a job again after its ``attempt``-th failed run"""
+        state = RetryCallState(retry_object=None, fn=None, args=(), kwargs={})
+        state.attempt_number = attempt
+        return self._backoff(state)
+
+    def claim(self, limit: int) -> List[ClaimedJob]:
+        """Claim up to ``limit`` due jobs, including running jobs whose claim lapsed"""
+        if limit <= 0:
+            return []
+        jobs = Job.__table__
+        now = datetime.utcnow()
+        due = (
+            select(jobs.c.id)
+            .where(jobs.c.status.in_(("queued", "running")), jobs.c.available_at <= now)
+            .order_by(jobs.c.available_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(jobs)
+            .where(jobs.c.id.in_(due))
+            .values(
+                status="running",
+                attempts=jobs.c.attempts + 1,
+                available_at=now + timedelta(seconds=self.visibility_timeout)
+            )
+            .returning(jobs.c.id, jobs.c.kind, jobs.c.payload, jobs.c.attempts, jobs.c.max_attempts)
+        )
+        for attempt in _db_retry:
+            with attempt, get_db_session() as db:
+                rows = db.execute(stmt).all()
+                db.commit()
+        return sorted((ClaimedJob(*row) for row in rows), key=lambda job: job.id)
+
+    def ack(self, job: ClaimedJob) -> None:
+        """Delete a job that ran successfully"""
+        for attempt in _db_retry:
+            with attempt, get_db_session() as db:
+                db.execute(delete(Job.__table__).where(Job.__table__.c.id == job.id))
+                db.commit()
+
+    def fail(self, job: ClaimedJob, error: str) -> str:
+        """Queue a failed job again after a backoff, or mark it dead; returns the outcome"""
+        jobs = Job.__table__
+        if job.attempt >= job.max_attempts:
+            outcome, values = "dead", {"status": "dead"}
+        else:
+            outcome = "retry"
+            values = {"status": "queued",
+                      "available_at": datetime.utcnow() + timedelta(seconds=self.retry_delay(job.attempt))}
+        # A claim that lapsed and was taken again belongs to the newer run
+        stmt = update(jobs).where(jobs.c.id == job.id, jobs.c.attempts == job.attempt).values(
+            last_error=error[-4000:], **values
+        )
+        for attempt in _db_retry:
+            with attempt, get_db_session() as db:
+                db.execute(stmt)
+                db.commit()
+        return outcome
+
+    def depth(self) -> Dict[str, int]:
+        """Count jobs per state: ready, delayed, running and dead"""
+        jobs = Job.__table__
+        now = datetime.utcnow()
+        state = case(
+            (jobs.c.status == "dead", "dead"),
+            (jobs.c.available_at > now, case((jobs.c.status == "running", "running"), else_="delayed")),
+            else_="ready"
+        )
+        counts = dict.fromkeys(("ready", "delayed", "running", "dead"), 0)
+        with get_db_session(readonly=True) as db:
+            for name, count in db.execute(select(state, func.count()).group_by(state)):
+                counts[name] = count
+        return counts
+
+
+class JobWorkerPool:
+    """Claims due jobs and runs them on a thread or process pool"""
+
+    def __init__(
+        self,
+        queue: Optional[JobQueue] = None,
+        workers: Optional[int] = None,
+        mode: Optional[str] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.queue = queue or JobQueue()
+        self.workers = settings.JOB_WORKERS if workers is None else workers
+        self.mode = (mode or settings.JOB_WORKER_MODE).lower()
+        self.poll_interval = settings.JOB_POLL_INTERVAL_SECONDS if poll_interval is None else poll_interval
+        self._executor: Optional[Executor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._idle = threading.Semaphore(0)
+
+    def _create_executor(self) -> Executor:
+        if self.mode == "thread":
+            return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job-worker")
+        if self.mode == "process":
+            # Spawned, not forked: this process has threads and open connections
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+        raise ValueError(f"Unknown JOB_WORKER_MODE: {self.mode!r}")
+
+    def wake(self) -> None:
+        """Look for due jobs now rather than at the next poll, e.g. right after enqueueing"""
+        self._wake.set()
+
+    def _finished(self, job: ClaimedJob, started: float, future: Future) -> None:
+        try:
+            error = future.exception()
+            job_duration.observe(time.perf_counter() - started, kind=job.kind)
+            if error is None:
+                self.queue.ack(job)
+                jobs_processed.inc(kind=job.kind, outcome="done")
+                return
+            message = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+            outcome = self.queue.fail(job, message)
+            jobs_processed.inc(kind=job.kind, outcome=outcome)
+            log = logger.error if outcome == "dead" else logger.warning
+            log(f"Job {job.id} ({job.kind}) failed on run {job.attempt}/{job.max_attempts}: {error}")
+        except Exception as e:
+            # The claim lapses and the job runs again
+            logger.error(f"Error finishing job {job.id}: {e}")
+        finally:
+            self._idle.release()
+            self._wake.set()
+
+    def _run(self) -> None:
+        idle = self.workers
+        while not self._stop.is_set():
+            while self._idle.acquire(blocking=False):
+                idle += 1
+            try:
+                jobs = self.queue.claim(idle)
+            except Exception as e:
+                logger.error(f"Error claiming jobs: {e}")
+                jobs = []
+            for job in jobs:
+                idle -= 1
+                started = time.perf_counter()
+                handler = _handlers.get(job.kind)
+                if handler is None:
+                    future: Future = Future()
+                    future.set_exception(LookupError(f"No handler for job kind {job.kind!r}"))
+                else:
+                    # Process workers unpickle the handler by reference, importing its module
+                    future = self._executor.submit(handler, job.payload)
+                future.add_done_callback(partial(self._finished, job, started))
+            if not jobs or not idle:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def start(self) -> None:
+        """Start the dispatcher and workers; does nothing with ``JOB_WORKERS=0``"""
+        if self.workers <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._executor = self._create_executor()
+        self._thread = threading.Thread(target=self._run, name="job-dispatcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Started {self.workers} job workers ({self.mode})")
+
+    def stop(self) -> None:
+        """Stop claiming jobs and wait for running ones; unfinished claims lapse and rerun"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+job_queue = JobQueue()
+job_workers = JobWorkerPool(job_queue)
+
+
+def _job_queue_metrics() -> List[MetricFamily]:
+    """Queue depth per state, counted at scrape time"""
+    try:
+        depth = job_queue.depth()
+    except Exception as e:
+        logger.error(f"Error counting jobs: {e}")
+        return []
+    return [("job_queue_depth", "gauge", "Background jobs per state (ready, delayed, running, dead)",
+             [({"state": state}, count) for state, count in depth.items()])]
+
+registry.register_collector(_job_queue_metrics)
@@ -0,0 +1,126 @@
+"""Follow-up work for placed orders, run as background jobs.
+
+Checkout enqueues one job of each ``ORDER_JOBS`` kind in the order's own
+transaction, so none of this runs while the shopper waits. Jobs are
+delivered at least once: the email and analytics may repeat after a
+worker dies mid-run, and the inventory sync is idempotent.
+"""
+
+import smtplib
+from email.message import EmailMessage
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import get_db_session
+from app.core.logging import get_logger
+from app.core.metrics import registry
+from app.models.product import Order, OrderLine, Product, ProductVariant
+from app.services.catalog_changes import record_change
+from app.services.jobs import job_handler, job_queue
+
+logger = get_logger(__name__)
+
+ORDER_JOBS = ("order.confirmation_email", "order.inventory_sync", "order.analytics")
+
+orders_placed = registry.counter("orders_placed_total", "Orders placed, counted by the analytics job")
+order_revenue = registry.counter("order_revenue_total", "Revenue of placed orders")
+order_units_sold = registry.counter("order_units_sold_total", "Units sold per product category", ("category",))
+
+
+def enqueue_order_jobs(db: Session, order_id: int) -> None:
+    """Enqueue the follow-up jobs of a new order inside the caller's transaction"""
+    for kind in ORDER_JOBS:
+        job_queue.enqueue(db, kind, {"order_id": order_id})
+
+
+@job_handler("order.confirmation_email")
+def send_confirmation_email(payload) -> None:
+    """Email the order summary to the customer, if they gave an address"""
+    # The primary, not a replica: the order committed just before the job
+    with get_db_session() as db:
+        order = db.get(Order, payload["order_id"])
+        if order is None or not order.customer_email:
+            return
+        lines = db.execute(
+            select(Product.name, OrderLine.size, OrderLine.color, OrderLine.quantity, OrderLine.subtotal)
+            .join_from(OrderLine, Product, Product.id == OrderLine.product_id, isouter=True)
+            .where(OrderLine.order_id == order.id)
+            .order_by(OrderLine.id)
+        ).all()
+        order_id, total, recipient = order.id, order.total, order.customer_email
+
+    body = "\n".join(
+        [f"Thank you for your order #{order_id}!", ""]
+        + [f"{quantity} x {name or 'Item'} (size {size}, {color}): ${subtotal:.2f}"
+           for name, size, color, quantity, subtotal in lines]
+        + ["", f"Total: ${total:.2f}"]
+    )
+    message = EmailMessage()
+    message["Subject"] = f"Your {settings.APP_NAME} order #{order_id}"
+    message["From"] = settings.ORDER_EMAIL_SENDER
+    message["To"] = recipient
+    message.set_content(body)
+
+    if not settings.SMTP_HOST:
+        logger.info(f"SMTP_HOST not set; confirmation for order {order_id} to {recipient}:\n{body}")
+        return
+    with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=30) as smtp:
+        smtp.send_message(message)
+    logger.info(f"Sent confirmation for order {order_id}")
+
+
+@job_handler("order.inventory_sync")
+def sync_inventory(payload) -> None:
+    """Reconcile the ordered products' stock totals with their variants and report sold-out variants"""
+    products = Product.__table__
+    variants = ProductVariant.__table__
+    with get_db_session() as db:
+        product_ids = db.execute(
+            select(OrderLine.product_id).where(OrderLine.order_id == payload["order_id"]).distinct()
+        ).scalars().all()
+        if not product_ids:
+            return
+        total = (
+            select(func.coalesce(func.sum(variants.c.stock), 0))
+            .where(variants.c.product_id == products.c.id)
+            .scalar_subquery()
+        )
+        drifted = db.execute(
+            update(products)
+            .where(products.c.id.in_(product_ids), products.c.stock != total)
+            .values(stock=total)
+            .returning(products.c.id)
+        ).scalars().all()
+        if drifted:
+            record_change(db, "stock", [f"product:{product_id}" for product_id in drifted])
+        sold_out = db.execute(
+            select(variants.c.product_id, variants.c.size, variants.c.color)
+            .where(variants.c.product_id.in_(product_ids), variants.c.stock <= 0)
+        ).all()
+        db.commit()
+
+    if drifted:
+        logger.warning(f"Corrected stock totals of products {sorted(drifted)}")
+    for product_id, size, color in sold_out:
+        logger.info(f"Sold out: product {product_id} ({size}, {color})")
+
+
+@job_handler("order.analytics")
+def record_order_analytics(payload) -> None:
+    """Count the order, its revenue and the units sold per category"""
+    with get_db_session() as db:
+        total = db.execute(select(Order.total).where(Order.id == payload["order_id"])).scalar_one_or_none()
+        if total is None:
+            return
+        units = db.execute(
+            select(func.coalesce(Product.category, "unknown"), func.sum(OrderLine.quantity))
+            .join_from(OrderLine, Product, Product.id == OrderLine.product_id, isouter=True)
+            .where(OrderLine.order_id == payload["order_id"])
+            .group_by(Product.category)
+        ).all()
+    orders_placed.inc()
+    order_revenue.inc(total)
+    for category, quantity in units:
+        order_units_sold.inc(quantity, category=category)
@@ -1,70 +1,489 @@
 ```python
 """Product service for managing shoe inventory"""
 
-from typing import List, Optional, Dict, Any
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+import asyncio
+import base64
+import json
+import threading
+import time
 from sqlalchemy.orm import Session
-from sqlalchemy import select, or_
-from app.core.database import get_db_session
+from sqlalchemy import insert, select, tuple_, update
+from app.core.database import get_async_db_session, get_db_session, replica_router
+from app.core.config import settings
+from app.core.metrics import MetricFamily, registry
+from app.core import server_timing
 from app.models.product import Product, Category
+from app.models.views import PRODUCT_VIEW_COLUMNS, ProductView
+from app.services.catalog_changes import ALL, ChangeFeed, ChangeRecord, changes_since, current_version, record_change
+from app.services.catalog_import import iter_catalog_rows, normalize_row
+from app.services.facets import FacetIndex, FacetResult, get_facet_index
+from app.services.inventory_service import InventoryService
+from app.services.search_index import SearchIndex, get_search_index
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
-class ProductService:
-    """Service for managing products"""
+# Sentinel returned by CatalogCache.get on a miss (None is a cacheable value)
+MISSING = object()
+
+class CatalogCache(ABC):
+    """Interface for the read-through cache used by ProductService.
+    
+    Entries carry tags (e.g. ``product:42``, ``category:Running``) so writes
+    can invalidate exactly the entries they affect.
+    """
+    
+    @abstractmethod
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value or ``MISSING``"""
+    
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = ()) -> None:
+        """Store a value under ``key`` with invalidation tags"""
+    
+    @abstractmethod
+    def invalidate_tags(self, *tags: str) -> int:
+        """Drop every entry carrying any of ``tags``; returns entries dropped"""
+    
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every entry"""
+    
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Return counters for sizing the cache"""
+
+class NullCache(CatalogCache):
+    """Cache that stores nothing, for disabling caching"""
     
     def __init__(self):
+        self.misses = 0
+    
+    def get(self, key: Hashable) -> Any:
+        self.misses += 1
+        return MISSING
+    
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = ()) -> None:
         pass
     
-    def get_all_products(self) -> List[Product]:
-        """Get all products"""
+    def invalidate_tags(self, *tags: str) -> int:
+        return 0
+    
+    def clear(self) -> None:
+        pass
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": False, "size": 0, "hits": 0, "misses": self.misses, "hit_ratio": 0.0}
+
+class LRUCache(CatalogCache):
+    """Bounded in-memory cache with LRU eviction and a per-entry TTL"""
+    
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _drop(self, key: Hashable) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+    
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = ()) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def invalidate_tags(self, *tags: str) -> int:
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys.update(self._tags.get(tag, ()))
+            for key in keys:
+                self._drop(key)
+            self.invalidations += len(keys)
+            return len(keys)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": True,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+def create_catalog_cache() -> CatalogCache:
+    """Build the catalog cache configured in settings"""
+    if not settings.CATALOG_CACHE_ENABLED:
+        return NullCache()
+    return LRUCache(
+        max_entries=settings.CATALOG_CACHE_MAX_ENTRIES,
+        ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+    )
+
+# Shared by every ProductService so a write through any instance invalidates all readers
+catalog_cache = create_catalog_cache()
+
+def _catalog_cache_metrics() -> List[MetricFamily]:
+    """Catalog cache counters, read at scrape time"""
+    stats = catalog_cache.stats()
+    families: List[MetricFamily] = [
+        ("catalog_cache_hit_ratio", "gauge", "Share of catalog cache lookups served from cache",
+         [({}, stats["hit_ratio"])]),
+        ("catalog_cache_entries", "gauge", "Entries held in the catalog cache", [({}, stats["size"])]),
+    ]
+    for counter in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        if counter in stats:
+            families.append((f"catalog_cache_{counter}_total", "counter", f"Catalog cache {counter}",
+                             [({}, stats[counter])]))
+    return families
+
+registry.register_collector(_catalog_cache_metrics)
+
+class ProductPage(list):
+    """One page of products plus the opaque cursor for the next page.
+    
+    Behaves like the plain list the listing methods used to return;
+    ``next_cursor`` is ``None`` on the last page.
+    """
+    
+    def __init__(self, items: Iterable[Any] = (), next_cursor: Optional[str] = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+def encode_cursor(*values: Any) -> str:
+    """Encode a keyset position as an opaque URL-safe cursor"""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decode a cursor produced by ``encode_cursor``; raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return values
+
+def _page_size(limit: Optional[int]) -> Optional[int]:
+    """Clamp a requested page size; ``None`` means no paging"""
+    if limit is None:
+        return None
+    return max(1, min(limit, settings.CATALOG_MAX_PAGE_SIZE))
+
+def _product_tags(value: Any) -> List[str]:
+    """Tag a cached value with the ids of the products it contains"""
+    if isinstance(value, (Product, ProductView)):
+        return [f"product:{value.id}"]
+    if isinstance(value, list):
+        return [f"product:{item.id}" for item in value if isinstance(item, (Product, ProductView))]
+    return []
+
+def _copy_cached(value: Any) -> Any:
+    """Shallow-copy cached lists so callers cannot mutate the cached entry"""
+    if isinstance(value, ProductPage):
+        return ProductPage(value, next_cursor=value.next_cursor)
+    return list(value) if isinstance(value, list) else value
+
+def _in_order(views: Iterable[ProductView], product_ids: List[int]) -> List[ProductView]:
+    """Reorder fetched views to follow ``product_ids``, skipping missing ids"""
+    by_id = {view.id: view for view in views}
+    return [by_id[product_id] for product_id in product_ids if product_id in by_id]
+
+class ProductService:
+    """Service for managing products"""
+    
+    def __init__(
+        self,
+        search_index: Optional[SearchIndex] = None,
+        cache: Optional[CatalogCache] = None,
+        facet_index: Optional[FacetIndex] = None
+    ):
+        self.search_index = search_index or get_search_index()
+        self.cache = cache if cache is not None else catalog_cache
+        self.facet_index = facet_index or get_facet_index()
+        self.inventory = InventoryService()
+    
+    def _read_through(self, key: Hashable, loader: Callable[[], Any], tags: Iterable[str] = ()) -> Any:
+        """Return a cached value, loading and caching it on a miss"""
+        with server_timing.phase(server_timing.CACHE):
+            value = self.cache.get(key)
+        if value is MISSING:
+            value = loader()
+            with server_timing.phase(server_timing.CACHE):
+                self.cache.set(key, value, [*tags, *_product_tags(value)])
+        return _copy_cached(value)
+    
+    @staticmethod
+    def _page_statement(stmt, limit: Optional[int], cursor: Optional[str]):
+        """Turn a listing query into a keyset page query ordered by ``(name, id)``.
+        
+        The cursor holds the last row's ``(name, id)``, so every page is an
+        index range scan no matter how deep it is. One extra row is fetched
+        to tell whether another page follows.
+        """
+        if cursor:
+            name, product_id = decode_cursor(cursor, 2)
+            stmt = stmt.where(tuple_(Product.name, Product.id) > tuple_(name, product_id))
+        stmt = stmt.order_by(Product.name, Product.id)
+        if limit is not None:
+            stmt = stmt.limit(limit + 1)
+        return stmt
+    
+    @staticmethod
+    def _to_page(rows: Iterable[Any], limit: Optional[int]) -> ProductPage:
+        """Build a ``ProductPage`` of views from rows of a ``_page_statement`` query"""
+        products = [ProductView.from_row(row) for row in rows]
+        next_cursor = None
+        if limit is not None and len(products) > limit:
+            products = products[:limit]
+            next_cursor = encode_cursor(products[-1].name, products[-1].id)
+        return ProductPage(products, next_cursor=next_cursor)
+    
+    def _fetch_page(self, stmt, limit: Optional[int], cursor: Optional[str]) -> ProductPage:
+        """Run a listing query selecting ``PRODUCT_VIEW_COLUMNS`` as one keyset page"""
+        with get_db_session(readonly=True) as db:
+            rows = db.execute(self._page_statement(stmt, limit, cursor)).all()
+        return self._to_page(rows, limit)
+    
+    def _search_hits(self, query: str, limit: int, cursor: Optional[str]) -> Tuple[List[int], Optional[str]]:
+        """Rank one page of product ids for a query and the cursor for the next page"""
+        after = None
+        if cursor:
+            score, product_id = decode_cursor(cursor, 2)
+            after = (float(score), int(product_id))
+        hits = self.search_index.search(query, limit=limit + 1, after=after)
+        next_cursor = None
+        if len(hits) > limit:
+            hits = hits[:limit]
+            next_cursor = encode_cursor(hits[-1][1], hits[-1][0])
+        return [product_id for product_id, _ in hits], next_cursor
+    
+    def _facet_page(
+        self, filters: Optional[Dict[str, Iterable[str]]], limit: Optional[int], cursor: Optional[str]
+    ) -> Tuple[FacetResult, List[int], bool]:
+        """Match filters and pick one ``(name, id)`` page of ids; returns (result, ids, has_more)"""
+        after = None
+        if cursor:
+            name, product_id = decode_cursor(cursor, 2)
+            after = (str(name), int(product_id))
+        result = self.facet_index.query(filters)
+        product_ids = self.facet_index.page(result, None if limit is None else limit + 1, after)
+        has_more = limit is not None and len(product_ids) > limit
+        if has_more:
+            product_ids = product_ids[:limit]
+        return result, product_ids, has_more
+    
+    @staticmethod
+    def _facet_response(result: FacetResult, products: List[ProductView], has_more: bool) -> Dict[str, Any]:
+        next_cursor = None
+        if has_more and products:
+            next_cursor = encode_cursor(products[-1].name, products[-1].id)
+        return {
+            "products": ProductPage(products, next_cursor=next_cursor),
+            "total": result.total,
+            "facets": result.counts,
+        }
+    
+    def invalidate_products(self, *product_ids: int) -> None:
+        """Drop cached entries holding these products, e.g. after a stock change elsewhere"""
+        self.cache.invalidate_tags(*(f"product:{product_id}" for product_id in product_ids))
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters of the catalog cache"""
+        return self.cache.stats()
+    
+    def catalog_version(self) -> int:
+        """Get the latest committed catalog version"""
         try:
-            with get_db_session() as db:
-                stmt = select(Product).order_by(Product.name)
-                result = db.execute(stmt)
-                return result.scalars().all()
+            return current_version()
         except Exception as e:
-            logger.error(f"Error getting all products: {e}")
+            logger.error(f"Error getting catalog version: {e}")
+            return 0
+    
+    def changes_since(self, version: int, limit: int = 1000) -> List[ChangeRecord]:
+        """Get catalog writes committed after ``version``, oldest first"""
+        try:
+            return changes_since(version, limit)
+        except Exception as e:
+            logger.error(f"Error getting catalog changes since {version}: {e}")
             return []
     
+    def apply_changes(self, changes: Iterable[ChangeRecord]) -> None:
+        """Bring the cache and in-process indexes up to date with writes from other workers.
+        
+        Cache entries are dropped by tag. Products touched by anything but a
+        stock change are reloaded into the search and facet indexes; an
+        ``ALL`` tag flushes the cache and reloads the indexes instead.
+        """
+        tags: Set[str] = set()
+        product_ids: Set[int] = set()
+        for change in changes:
+            tags.update(change.tags)
+            if change.kind != "stock":
+                product_ids.update(int(tag[8:]) for tag in change.tags if tag.startswith("product:"))
+        
+        if ALL in tags:
+            self.cache.clear()
+            self.facet_index.invalidate()
+            if not self.search_index.tracks_writes:
+                self.search_index.rebuild()
+            return
+        self.cache.invalidate_tags(*tags)
+        if not product_ids:
+            return
+        
+        with get_db_session() as db:
+            products = db.execute(select(Product).where(Product.id.in_(product_ids))).scalars().all()
+        for product in products:
+            self.search_index.index_product(product)
+            self.facet_index.index_product(product)
+        for product_id in product_ids - {product.id for product in products}:
+            self.search_index.remove_product(product_id)
+            self.facet_index.remove_product(product_id)
+    
+    def get_all_products(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> ProductPage:
+        """Get all products ordered by name, one page at a time when ``limit`` is given"""
+        limit = _page_size(limit)
+        try:
+            return self._read_through(
+                ("all", limit, cursor),
+                lambda: self._fetch_page(select(*PRODUCT_VIEW_COLUMNS), limit, cursor),
+                ["listing:all"]
+            )
+        except Exception as e:
+            logger.error(f"Error getting all products: {e}")
+            return ProductPage()
+    
     def get_product(self, product_id: int) -> Optional[Product]:
         """Get product by ID"""
-        try:
-            with get_db_session() as db:
+        def load() -> Optional[Product]:
+            with get_db_session(readonly=True) as db:
                 return db.get(Product, product_id)
+        
+        try:
+            # Tag misses too, so creating this id later invalidates the negative entry
+            return self._read_through(("product", product_id), load, [f"product:{product_id}"])
         except Exception as e:
             logger.error(f"Error getting product {product_id}: {e}")
             return None
     
-    def get_products_by_category(self, category: str) -> List[Product]:
-        """Get products by category"""
+    def get_products_by_category(
+        self, category: str, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> ProductPage:
+        """Get products by category, one page at a time when ``limit`` is given"""
+        limit = _page_size(limit)
         try:
-            with get_db_session() as db:
-                stmt = select(Product).where(Product.category == category).order_by(Product.name)
-                result = db.execute(stmt)
-                return result.scalars().all()
+            return self._read_through(
+                ("category", category, limit, cursor),
+                lambda: self._fetch_page(
+                    select(*PRODUCT_VIEW_COLUMNS).where(Product.category == category), limit, cursor
+                ),
+                [f"category:{category}"]
+            )
         except Exception as e:
             logger.error(f"Error getting products by category {category}: {e}")
-            return []
+            return ProductPage()
     
-    def search_products(self, query: str) -> List[Product]:
-        """Search products by name, brand, or description"""
+    def search_products(self, query: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> ProductPage:
+        """Search products by name, brand, description or category, best match first.
+        
+        Results are ranked by relevance, so the cursor is a keyset position
+        on ``(score, id)`` rather than ``(name, id)``.
+        """
         try:
-            with get_db_session() as db:
-                search_term = f"%{query.lower()}%"
-                stmt = select(Product).where(
-                    or_(
-                        Product.name.ilike(search_term),
-                        Product.brand.ilike(search_term),
-                        Product.description.ilike(search_term),
-                        Product.category.ilike(search_term)
-                    )
-                ).order_by(Product.name)
-                result = db.execute(stmt)
-                return result.scalars().all()
+            limit = _page_size(limit) or settings.SEARCH_MAX_RESULTS
+            product_ids, next_cursor = self._search_hits(query, limit, cursor)
+            if not product_ids:
+                return ProductPage()
+            
+            with get_db_session(readonly=True) as db:
+                stmt = select(*PRODUCT_VIEW_COLUMNS).where(Product.id.in_(product_ids))
+                views = map(ProductView.from_row, db.execute(stmt))
+                return ProductPage(_in_order(views, product_ids), next_cursor=next_cursor)
         except Exception as e:
             logger.error(f"Error searching products with query '{query}': {e}")
-            return []
+            return ProductPage()
+    
+    def filter_products(
+        self,
+        filters: Optional[Dict[str, Iterable[str]]] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Filter by any combination of facets and count every facet value.
+        
+        ``filters`` maps facet names (category, size, color, price_band) to
+        accepted values, e.g. ``{"size": ["10"], "color": ["Core Black"],
+        "price_band": ["under-50", "50-100", "100-150"]}``. Returns the page
+        of products ordered by ``(name, id)``, the total match count and
+        ``{facet: {value: count}}`` for the remaining choices.
+        """
+        try:
+            result, product_ids, has_more = self._facet_page(filters, _page_size(limit), cursor)
+            
+            products: List[ProductView] = []
+            if product_ids:
+                with get_db_session(readonly=True) as db:
+                    stmt = select(*PRODUCT_VIEW_COLUMNS).where(Product.id.in_(product_ids))
+                    products = _in_order(map(ProductView.from_row, db.execute(stmt)), product_ids)
+            return self._facet_response(result, products, has_more)
+        except Exception as e:
+            logger.error(f"Error filtering products with {filters}: {e}")
+            return {"products": ProductPage(), "total": 0, "facets": {}}
     
     def create_product(self, **kwargs) -> Optional[Product]:
         """Create a new product"""
@@ -72,14 +491,97 @@ class ProductService:
             with get_db_session() as db:
                 product = Product(**kwargs)
                 db.add(product)
+                db.flush()
+                self.inventory.create_variants(db, product)
+                tags = [
+                    f"product:{product.id}", f"category:{product.category}",
+                    "listing:all", "categories", "featured"
+                ]
+                record_change(db, "create", tags)
                 db.commit()
                 db.refresh(product)
+                self.search_index.index_product(product)
+                self.facet_index.index_product(product)
+                replica_router.pin_primary()
+                self.cache.invalidate_tags(*tags)
                 logger.info(f"Created product: {product.name}")
                 return product
         except Exception as e:
             logger.error(f"Error creating product: {e}")
             return None
     
+    def bulk_create_products(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        chunk_size: Optional[int] = None,
+        on_chunk: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Insert products in batches, one executemany and one transaction per chunk.
+        
+        ``rows`` is consumed lazily, so only one chunk is held in memory.
+        Invalid rows are skipped and counted. ``on_chunk`` receives the
+        running stats after every committed chunk.
+        """
+        chunk_size = chunk_size or settings.CATALOG_IMPORT_CHUNK_SIZE
+        stats: Dict[str, Any] = {"rows": 0, "skipped": 0, "chunks": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+        started = time.perf_counter()
+        chunk: List[Dict[str, Any]] = []
+        
+        def flush() -> None:
+            with get_db_session() as db:
+                db.execute(insert(Product.__table__), chunk)
+                # Too many tags to log one by one; every worker flushes instead
+                record_change(db, "bulk", [ALL])
+                db.commit()
+            stats["rows"] += len(chunk)
+            stats["chunks"] += 1
+            stats["seconds"] = time.perf_counter() - started
+            stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+            chunk.clear()
+            if on_chunk:
+                on_chunk(stats)
+        
+        try:
+            for row_number, raw in enumerate(rows, start=1):
+                try:
+                    chunk.append(normalize_row(raw))
+                except (TypeError, ValueError) as e:
+                    stats["skipped"] += 1
+                    logger.warning(f"Skipping product row {row_number}: {e}")
+                    continue
+                if len(chunk) >= chunk_size:
+                    flush()
+            if chunk:
+                flush()
+            if stats["rows"]:
+                self.inventory.migrate_variants_from_json(chunk_size=chunk_size)
+        finally:
+            if stats["rows"]:
+                if not self.search_index.tracks_writes:
+                    self.search_index.rebuild()
+                self.facet_index.invalidate()
+                replica_router.pin_primary()
+                self.cache.clear()
+        
+        stats["seconds"] = time.perf_counter() - started
+        stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+        logger.info(
+            f"Bulk inserted {stats['rows']} products in {stats['chunks']} chunks "
+            f"({stats['skipped']} skipped, {stats['rows_per_sec']:.0f} rows/sec)"
+        )
+        return stats
+    
+    def bulk_import(
+        self,
+        path: str,
+        fmt: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        on_chunk: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Stream a CSV or JSONL catalog file into the products table"""
+        logger.info(f"Importing catalog from {path}")
+        return self.bulk_create_products(iter_catalog_rows(path, fmt), chunk_size=chunk_size, on_chunk=on_chunk)
+    
     def update_product(self, product_id: int, **kwargs) -> Optional[Product]:
         """Update a product"""
         try:
@@ -88,12 +590,29 @@ class ProductService:
                 if not product:
                     return None
                 
+                old_category, old_name = product.category, product.name
                 for key, value in kwargs.items():
                     if hasattr(product, key):
                         setattr(product, key, value)
+                if "sizes" in kwargs or "colors" in kwargs:
+                    self.inventory.sync_variants(db, product)
                 
+                # Listings holding this product carry its tag. A category move changes
+                # which category listings hold it, and a rename moves it to another
+                # (name, id) keyset page of the listings it is in. Search results are
+                # not cached; index_product below re-ranks them.
+                tags = [f"product:{product_id}"]
+                if product.category != old_category:
+                    tags += [f"category:{old_category}", f"category:{product.category}", "categories"]
+                if product.name != old_name:
+                    tags += ["listing:all", f"category:{product.category}"]
+                record_change(db, "update", tags)
                 db.commit()
                 db.refresh(product)
+                self.search_index.index_product(product)
+                self.facet_index.index_product(product)
+                replica_router.pin_primary()
+                self.cache.invalidate_tags(*tags)
                 logger.info(f"Updated product: {product.name}")
                 return product
         except Exception as e:
@@ -108,25 +627,40 @@ class ProductService:
                 if not product:
                     return False
                 
+                self.inventory.delete_variants(db, product_id)
                 db.delete(product)
+                tags = [f"product:{product_id}", "categories"]
+                record_change(db, "delete", tags)
                 db.commit()
+                self.search_index.remove_product(product_id)
+                self.facet_index.remove_product(product_id)
+                replica_router.pin_primary()
+                self.cache.invalidate_tags(*tags)
                 logger.info(f"Deleted product: {product.name}")
                 return True
         except Exception as e:
             logger.error(f"Error deleting product {product_id}: {e}")
             return False
     
-    def update_stock(self, product_id: int, quantity: int) -> bool:
-        """Update product stock"""
+    def update_stock(
+        self, product_id: int, quantity: int, size: Optional[str] = None, color: Optional[str] = None
+    ) -> bool:
+        """Adjust stock by ``quantity``, never going below zero.
+        
+        Stock lives on the variants, which checkout takes from, so the change
+        goes through ``InventoryService.adjust_stock``: added stock is spread
+        over the product's variants (or only those matching ``size``/``color``)
+        and the product total follows their sum.
+        """
         try:
             with get_db_session() as db:
-                product = db.get(Product, product_id)
-                if not product:
+                if not self.inventory.adjust_stock(db, product_id, quantity, size, color):
                     return False
-                
-                product.stock = max(0, product.stock + quantity)
+                record_change(db, "stock", [f"product:{product_id}"])
                 db.commit()
-                logger.info(f"Updated stock for {product.name}: {product.stock}")
+                replica_router.pin_primary()
+                self.cache.invalidate_tags(f"product:{product_id}")
+                logger.info(f"Updated stock for product {product_id} by {quantity}")
                 return True
         except Exception as e:
             logger.error(f"Error updating stock for product {product_id}: {e}")
@@ -134,23 +668,220 @@ class ProductService:
     
     def get_categories(self) -> List[str]:
         """Get all unique categories"""
-        try:
-            with get_db_session() as db:
+        def load() -> List[str]:
+            with get_db_session(readonly=True) as db:
                 stmt = select(Product.category).distinct().order_by(Product.category)
                 result = db.execute(stmt)
                 return [row[0] for row in result.fetchall()]
+        
+        try:
+            return self._read_through(("categories",), load, ["categories"])
         except Exception as e:
             logger.error(f"Error getting categories: {e}")
             return []
     
-    def get_featured_products(self, limit: int = 8) -> List[Product]:
+    def get_featured_products(self, limit: int = 8) -> List[ProductView]:
         """Get featured products (for homepage)"""
+        def load() -> List[ProductView]:
+            with get_db_session(readonly=True) as db:
+                stmt = select(*PRODUCT_VIEW_COLUMNS).order_by(Product.created_at.desc()).limit(limit)
+                return [ProductView.from_row(row) for row in db.execute(stmt)]
+        
         try:
-            with get_db_session() as db:
-                stmt = select(Product).order_by(Product.created_at.desc()).limit(limit)
-                result = db.execute(stmt)
-                return result.scalars().all()
+            return self._read_through(("featured", limit), load, ["featured"])
+        except Exception as e:
+            logger.error(f"Error getting featured products: {e}")
+            return []
+
+def _apply_catalog_changes(changes: List[ChangeRecord]) -> None:
+    ProductService().apply_changes(changes)
+
+# Started with the app; applies other workers' catalog writes to this worker's cache
+change_feed = ChangeFeed()
+change_feed.subscribe(_apply_catalog_changes)
+
+class AsyncProductService:
+    """Asyncio variant of ProductService for the NiceGUI event loop.
+    
+    Reads run on the async engine and share the cache, search index and
+    facet index of the wrapped ProductService, so cache entries and
+    invalidation are common to both. Writes are rare admin operations that
+    also maintain the in-process indexes; they run the sync implementation
+    in a worker thread so the loop is never blocked.
+    """
+    
+    def __init__(self, products: Optional[ProductService] = None):
+        self.products = products or ProductService()
+        self.cache = self.products.cache
+    
+    async def _read_through(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]], tags: Iterable[str] = ()
+    ) -> Any:
+        """Return a cached value, awaiting the loader on a miss"""
+        with server_timing.phase(server_timing.CACHE):
+            value = self.cache.get(key)
+        if value is MISSING:
+            value = await loader()
+            with server_timing.phase(server_timing.CACHE):
+                self.cache.set(key, value, [*tags, *_product_tags(value)])
+        return _copy_cached(value)
+    
+    async def _fetch_page(self, stmt, limit: Optional[int], cursor: Optional[str]) -> ProductPage:
+        async with get_async_db_session(readonly=True) as db:
+            rows = (await db.execute(ProductService._page_statement(stmt, limit, cursor))).all()
+        return ProductService._to_page(rows, limit)
+    
+    async def _fetch_views(self, product_ids: List[int]) -> List[ProductView]:
+        async with get_async_db_session(readonly=True) as db:
+            stmt = select(*PRODUCT_VIEW_COLUMNS).where(Product.id.in_(product_ids))
+            rows = (await db.execute(stmt)).all()
+        return _in_order(map(ProductView.from_row, rows), product_ids)
+    
+    def invalidate_products(self, *product_ids: int) -> None:
+        """Drop cached entries holding these products, e.g. after a stock change elsewhere"""
+        self.products.invalidate_products(*product_ids)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters of the catalog cache"""
+        return self.products.cache_stats()
+    
+    async def changes_since(self, version: int, limit: int = 1000) -> List[ChangeRecord]:
+        """Get catalog writes committed after ``version``, oldest first"""
+        return await asyncio.to_thread(self.products.changes_since, version, limit)
+    
+    async def get_all_products(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> ProductPage:
+        """Get all products ordered by name, one page at a time when ``limit`` is given"""
+        limit = _page_size(limit)
+        try:
+            return await self._read_through(
+                ("all", limit, cursor),
+                lambda: self._fetch_page(select(*PRODUCT_VIEW_COLUMNS), limit, cursor),
+                ["listing:all"]
+            )
+        except Exception as e:
+            logger.error(f"Error getting all products: {e}")
+            return ProductPage()
+    
+    async def get_product(self, product_id: int) -> Optional[Product]:
+        """Get product by ID"""
+        async def load() -> Optional[Product]:
+            async with get_async_db_session(readonly=True) as db:
+                return await db.get(Product, product_id)
+        
+        try:
+            return await self._read_through(("product", product_id), load, [f"product:{product_id}"])
+        except Exception as e:
+            logger.error(f"Error getting product {product_id}: {e}")
+            return None
+    
+    async def get_products_by_category(
+        self, category: str, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> ProductPage:
+        """Get products by category, one page at a time when ``limit`` is given"""
+        limit = _page_size(limit)
+        try:
+            return await self._read_through(
+                ("category", category, limit, cursor),
+                lambda: self._fetch_page(
+                    select(*PRODUCT_VIEW_COLUMNS).where(Product.category == category), limit, cursor
+                ),
+                [f"category:{category}"]
+            )
+        except Exception as e:
+            logger.error(f"Error getting products by category {category}: {e}")
+            return ProductPage()
+    
+    async def search_products(self, query: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> ProductPage:
+        """Search products by name, brand, description or category, best match first"""
+        try:
+            limit = _page_size(limit) or settings.SEARCH_MAX_RESULTS
+            # The search index runs on the sync engine or in memory
+            product_ids, next_cursor = await asyncio.to_thread(self.products._search_hits, query, limit, cursor)
+            if not product_ids:
+                return ProductPage()
+            return ProductPage(await self._fetch_views(product_ids), next_cursor=next_cursor)
+        except Exception as e:
+            logger.error(f"Error searching products with query '{query}': {e}")
+            return ProductPage()
+    
+    async def filter_products(
+        self,
+        filters: Optional[Dict[str, Iterable[str]]] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Filter by any combination of facets and count every facet value"""
+        try:
+            # The first query after an invalidation rebuilds the facet index
+            result, product_ids, has_more = await asyncio.to_thread(
+                self.products._facet_page, filters, _page_size(limit), cursor
+            )
+            products = await self._fetch_views(product_ids) if product_ids else []
+            return ProductService._facet_response(result, products, has_more)
+        except Exception as e:
+            logger.error(f"Error filtering products with {filters}: {e}")
+            return {"products": ProductPage(), "total": 0, "facets": {}}
+    
+    async def get_categories(self) -> List[str]:
+        """Get all unique categories"""
+        async def load() -> List[str]:
+            async with get_async_db_session(readonly=True) as db:
+                stmt = select(Product.category).distinct().order_by(Product.category)
+                return list((await db.execute(stmt)).scalars().all())
+        
+        try:
+            return await self._read_through(("categories",), load, ["categories"])
+        except Exception as e:
+            logger.error(f"Error getting categories: {e}")
+            return []
+    
+    async def get_featured_products(self, limit: int = 8) -> List[ProductView]:
+        """Get featured products (for homepage)"""
+        async def load() -> List[ProductView]:
+            async with get_async_db_session(readonly=True) as db:
+                stmt = select(*PRODUCT_VIEW_COLUMNS).order_by(Product.created_at.desc()).limit(limit)
+                return [ProductView.from_row(row) for row in await db.execute(stmt)]
+        
+        try:
+            return await self._read_through(("featured", limit), load, ["featured"])
         except Exception as e:
             logger.error(f"Error getting featured products: {e}")
             return []
+    
+    async def create_product(self, **kwargs) -> Optional[Product]:
+        """Create a new product"""
+        return await asyncio.to_thread(lambda: self.products.create_product(**kwargs))
+    
+    async def bulk_create_products(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        chunk_size: Optional[int] = None,
+        on_chunk: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Insert products in batches; see ``ProductService.bulk_create_products``"""
+        return await asyncio.to_thread(self.products.bulk_create_products, rows, chunk_size, on_chunk)
+    
+    async def bulk_import(
+        self,
+        path: str,
+        fmt: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        on_chunk: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Stream a CSV or JSONL catalog file into the products table"""
+        return await asyncio.to_thread(self.products.bulk_import, path, fmt, chunk_size, on_chunk)
+    
+    async def update_product(self, product_id: int, **kwargs) -> Optional[Product]:
+        """Update a product"""
+        return await asyncio.to_thread(lambda: self.products.update_product(product_id, **kwargs))
+    
+    async def delete_product(self, product_id: int) -> bool:
+        """Delete a product"""
+        return await asyncio.to_thread(self.products.delete_product, product_id)
+    
+    async def update_stock(
+        self, product_id: int, quantity: int, size: Optional[str] = None, color: Optional[str] = None
+    ) -> bool:
+        """Adjust stock by ``quantity`` across the product's variants, never going below zero"""
+        return await asyncio.to_thread(self.products.update_stock, product_id, quantity, size, color)
 ```
\ No newline at end of file
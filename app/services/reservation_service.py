@@ -0,0 +1,231 @@
+"""Time-limited stock reservations (holds) for carts and checkout.
+
+Adding to cart takes stock from the variant immediately and records a
+hold that expires after ``STOCK_HOLD_TTL_SECONDS``. Expired holds are swept
+in small batches and their stock returned, so abandoned carts do not keep
+inventory locked. Checkout converts a session's holds into a sale, taking
+any stock whose hold already lapsed in the same statement batch.
+
+Every stock change is a conditional ``UPDATE ... WHERE stock >= n``; no
+code path reads stock and writes it back, so there are no lost updates.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import get_db_session
+from app.core.logging import get_logger
+from app.models.product import StockReservation
+from app.services.inventory_service import InventoryService, StockLine, merge_lines
+
+logger = get_logger(__name__)
+
+
+class ReservationService:
+    """Service for holding, releasing and consuming variant stock"""
+
+    _last_sweep = 0.0
+    _sweep_lock = threading.Lock()
+
+    def __init__(self, inventory: Optional[InventoryService] = None):
+        self.inventory = inventory or InventoryService()
+
+    @staticmethod
+    def _expiry(ttl: Optional[float]) -> datetime:
+        seconds = settings.STOCK_HOLD_TTL_SECONDS if ttl is None else ttl
+        return datetime.utcnow() + timedelta(seconds=seconds)
+
+    def hold(self, db: Session, session_id: str, lines: Iterable[StockLine], ttl: Optional[float] = None) -> None:
+        """Take stock for ``lines`` and record holds inside the caller's transaction.
+
+        Raises ValueError if any line is short; nothing is held in that case.
+        """
+        totals = merge_lines(lines)
+        if not totals:
+            return
+        self.inventory.take_stock_batch(db, [(*key, quantity) for key, quantity in totals.items()])
+        self._upsert_holds(db, session_id, totals, self._expiry(ttl))
+
+    def reserve(self, session_id: str, lines: Iterable[StockLine], ttl: Optional[float] = None) -> bool:
+        """Hold stock for many lines in one transaction, all or nothing"""
+        self.maybe_release_expired()
+        with get_db_session() as db:
+            self.hold(db, session_id, lines, ttl)
+            db.commit()
+        return True
+
+    def _upsert_holds(self, db: Session, session_id: str, totals: Dict[Tuple[int, str, str], int],
+                      expires_at: datetime) -> None:
+        holds = StockReservation.__table__
+        rows = [
+            {"session_id": session_id, "product_id": product_id, "size": size, "color": color,
+             "quantity": quantity, "expires_at": expires_at}
+            for (product_id, size, color), quantity in totals.items()
+        ]
+        dialect = db.bind.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            stmt = dialect_insert(holds)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["session_id", "product_id", "size", "color"],
+                set_={"quantity": holds.c.quantity + stmt.excluded.quantity, "expires_at": stmt.excluded.expires_at}
+            )
+            db.execute(stmt, rows)
+            return
+
+        # Portable fallback: bump existing holds, insert the rest
+        for row in rows:
+            updated = db.execute(
+                update(holds)
+                .where(
+                    holds.c.session_id == session_id,
+                    holds.c.product_id == row["product_id"],
+                    holds.c.size == row["size"],
+                    holds.c.color == row["color"]
+                )
+                .values(quantity=holds.c.quantity + row["quantity"], expires_at=expires_at)
+            ).rowcount
+            if not updated:
+                db.execute(insert(holds), row)
+
+    def release(self, db: Session, session_id: str, lines: Iterable[StockLine]) -> None:
+        """Give back up to the given quantities of a session's holds.
+
+        Each hold is shrunk, or deleted if no more than the wanted quantity
+        is left, with ``RETURNING``; only what those statements report is
+        returned to stock. A hold the sweeper (or a concurrent release)
+        already removed reports nothing, so its stock is never returned twice.
+        """
+        totals = merge_lines(lines)
+        if not totals:
+            return
+        holds = StockReservation.__table__
+        returned: List[StockLine] = []
+        for (product_id, size, color), wanted in totals.items():
+            match = (
+                holds.c.session_id == session_id,
+                holds.c.product_id == product_id,
+                holds.c.size == size,
+                holds.c.color == color
+            )
+            if db.execute(
+                update(holds)
+                .where(*match, holds.c.quantity > wanted)
+                .values(quantity=holds.c.quantity - wanted)
+                .returning(holds.c.id)
+            ).first() is not None:
+                returned.append((product_id, size, color, wanted))
+                continue
+            dropped = db.execute(
+                delete(holds).where(*match, holds.c.quantity <= wanted).returning(holds.c.quantity)
+            ).scalar()
+            if dropped:
+                returned.append((product_id, size, color, dropped))
+        self.inventory.return_stock_batch(db, returned)
+
+    def release_session(self, db: Session, session_id: str) -> None:
+        """Return every hold of a session inside the caller's transaction"""
+        self.release_sessions(db, [session_id])
+
+    def release_sessions(self, db: Session, session_ids: Iterable[str]) -> None:
+        """Return every hold of many sessions inside the caller's transaction"""
+        holds = StockReservation.__table__
+        returned = db.execute(
+            delete(holds)
+            .where(holds.c.session_id.in_(list(session_ids)))
+            .returning(holds.c.product_id, holds.c.size, holds.c.color, holds.c.quantity)
+        ).all()
+        self.inventory.return_stock_batch(db, [tuple(row) for row in returned])
+
+    def consume(self, db: Session, session_id: str, lines: Iterable[StockLine]) -> None:
+        """Turn a session's holds into a sale for ``lines`` inside the caller's transaction.
+
+        Held stock is kept, lines whose hold lapsed take fresh stock in one
+        conditional batch (raising ValueError if short), and any surplus
+        hold is returned.
+        """
+        holds = StockReservation.__table__
+        held = merge_lines(tuple(row) for row in db.execute(
+            delete(holds)
+            .where(holds.c.session_id == session_id)
+            .returning(holds.c.product_id, holds.c.size, holds.c.color, holds.c.quantity)
+        ))
+        wanted = merge_lines(lines)
+
+        shortfall = [(*key, quantity - held.get(key, 0)) for key, quantity in wanted.items()]
+        surplus = [(*key, quantity - wanted.get(key, 0)) for key, quantity in held.items()]
+        self.inventory.take_stock_batch(db, shortfall)
+        self.inventory.return_stock_batch(db, surplus)
+
+    def release_expired(self, batch_size: int = 500) -> int:
+        """Return stock for expired holds, in small batches; returns holds released"""
+        holds = StockReservation.__table__
+        released = 0
+        try:
+            while True:
+                with get_db_session() as db:
+                    expired_ids = (
+                        select(holds.c.id)
+                        .where(holds.c.expires_at <= datetime.utcnow())
+                        .limit(batch_size)
+                        .scalar_subquery()
+                    )
+                    # DELETE ... RETURNING yields only rows this transaction removed,
+                    # so concurrent sweepers never return the same hold twice
+                    rows = db.execute(
+                        delete(holds)
+                        .where(holds.c.id.in_(expired_ids))
+                        .returning(holds.c.product_id, holds.c.size, holds.c.color, holds.c.quantity)
+                    ).all()
+                    if not rows:
+                        break
+                    self.inventory.return_stock_batch(db, [tuple(row) for row in rows])
+                    db.commit()
+                    released += len(rows)
+                if len(rows) < batch_size:
+                    break
+            if released:
+                logger.info(f"Released {released} expired stock holds")
+            return released
+        except Exception as e:
+            logger.error(f"Error releasing expired stock holds: {e}")
+            return released
+
+    def maybe_release_expired(self) -> int:
+        """Sweep expired holds at most once per ``STOCK_HOLD_SWEEP_INTERVAL_SECONDS``"""
+        now = time.monotonic()
+        cls = type(self)
+        if now - cls._last_sweep < settings.STOCK_HOLD_SWEEP_INTERVAL_SECONDS:
+            return 0
+        if not cls._sweep_lock.acquire(blocking=False):
+            return 0
+        try:
+            cls._last_sweep = now
+            return self.release_expired()
+        finally:
+            cls._sweep_lock.release()
+
+    def held_quantity(self, session_id: str) -> Dict[Tuple[int, str, str], int]:
+        """Get live (unexpired) held quantities for a session per variant"""
+        try:
+            with get_db_session() as db:
+                stmt = select(
+                    StockReservation.product_id, StockReservation.size,
+                    StockReservation.color, StockReservation.quantity
+                ).where(
+                    StockReservation.session_id == session_id,
+                    StockReservation.expires_at > datetime.utcnow()
+                )
+                return merge_lines(tuple(row) for row in db.execute(stmt))
+        except Exception as e:
+            logger.error(f"Error getting holds for session {session_id}: {e}")
+            return {}
@@ -0,0 +1,336 @@
+"""Full-text search indexes for the product catalog.
+
+Two implementations share the same interface:
+
+- ``SQLiteFTSIndex`` keeps an FTS5 virtual table in sync with ``products``
+  through triggers and ranks matches with ``bm25``.
+- ``InvertedIndex`` is an in-process term -> postings map used on databases
+  without FTS5 (or when the SQLite build lacks it).
+
+Use ``get_search_index()`` to obtain the shared index for the configured engine.
+"""
+
+import math
+import re
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Engine
+
+from app.core.database import engine as default_engine
+from app.core.logging import get_logger
+from app.models.product import Product
+
+logger = get_logger(__name__)
+
+# Indexed columns and their relevance weights (higher weighs more)
+SEARCH_FIELDS: Tuple[str, ...] = ("name", "brand", "description", "category")
+FIELD_WEIGHTS: Dict[str, float] = {
+    "name": 10.0,
+    "brand": 3.0,
+    "description": 1.0,
+    "category": 5.0,
+}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# (product_id, score) pairs, best match first
+SearchHits = List[Tuple[int, float]]
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """Split text into lowercase search terms"""
+    if not value:
+        return []
+    return _TOKEN_RE.findall(value.lower())
+
+
+class SearchIndex(ABC):
+    """Interface shared by catalog search indexes"""
+
+    # True when the database keeps the index current for writes made outside
+    # ProductService (bulk inserts, raw SQL); otherwise callers must rebuild
+    tracks_writes = False
+
+    @abstractmethod
+    def rebuild(self) -> None:
+        """Rebuild the index from the products table"""
+
+    @abstractmethod
+    def index_product(self, product: Product) -> None:
+        """Add or refresh a product in the index"""
+
+    @abstractmethod
+    def remove_product(self, product_id: int) -> None:
+        """Remove a product from the index"""
+
+    @abstractmethod
+    def search(
+        self, query: str, limit: Optional[int] = None, after: Optional[Tuple[float, int]] = None
+    ) -> SearchHits:
+        """Return ``(product_id, score)`` pairs ranked by relevance.
+
+        Every term in ``query`` must match (AND semantics); each term also
+        matches as a prefix, so "ultra" finds "Ultraboost". ``after`` is the
+        ``(score, product_id)`` of the last hit already seen, for keyset paging.
+        """
+
+
+class SQLiteFTSIndex(SearchIndex):
+    """FTS5 external-content index over the ``products`` table.
+
+    Insert/update/delete triggers keep the index current for every writer,
+    including raw SQL and other worker processes, so the write hooks below
+    are no-ops.
+    """
+
+    TABLE = "products_fts"
+    tracks_writes = True
+
+    def __init__(self, bind: Engine):
+        self.engine = bind
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def _ddl(self) -> List[str]:
+        columns = ", ".join(SEARCH_FIELDS)
+        new_values = ", ".join(f"new.{field}" for field in SEARCH_FIELDS)
+        old_values = ", ".join(f"old.{field}" for field in SEARCH_FIELDS)
+        delete_row = (
+            f"INSERT INTO {self.TABLE}({self.TABLE}, rowid, {columns}) "
+            f"VALUES ('delete', old.id, {old_values});"
+        )
+        insert_row = (
+            f"INSERT INTO {self.TABLE}(rowid, {columns}) "
+            f"VALUES (new.id, {new_values});"
+        )
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE} USING fts5("
+            f"{columns}, content='products', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {self.TABLE}_ai AFTER INSERT ON products "
+            f"BEGIN {insert_row} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.TABLE}_ad AFTER DELETE ON products "
+            f"BEGIN {delete_row} END",
+            # Only edits to indexed columns touch the index; stock updates do not.
+            # Recreated so databases with the older every-column trigger pick this up
+            f"DROP TRIGGER IF EXISTS {self.TABLE}_au",
+            f"CREATE TRIGGER {self.TABLE}_au AFTER UPDATE OF {columns} ON products "
+            f"BEGIN {delete_row} {insert_row} END",
+        ]
+
+    def ensure(self) -> None:
+        """Create the FTS table and triggers, populating them on first use"""
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            with self.engine.begin() as conn:
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": self.TABLE},
+                ).first()
+                for statement in self._ddl():
+                    conn.execute(text(statement))
+                if not exists:
+                    conn.execute(text(f"INSERT INTO {self.TABLE}({self.TABLE}) VALUES ('rebuild')"))
+                    logger.info(f"Created full-text index {self.TABLE}")
+            self._ready = True
+
+    def rebuild(self) -> None:
+        self.ensure()
+        with self.engine.begin() as conn:
+            conn.execute(text(f"INSERT INTO {self.TABLE}({self.TABLE}) VALUES ('rebuild')"))
+        logger.info(f"Rebuilt full-text index {self.TABLE}")
+
+    def index_product(self, product: Product) -> None:
+        pass
+
+    def remove_product(self, product_id: int) -> None:
+        pass
+
+    @staticmethod
+    def _match_expression(terms: Iterable[str]) -> str:
+        # Quote every term so FTS5 operators in user input are treated as text
+        return " ".join(f'"{term}"*' for term in terms)
+
+    def search(
+        self, query: str, limit: Optional[int] = None, after: Optional[Tuple[float, int]] = None
+    ) -> SearchHits:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        self.ensure()
+        weights = ", ".join(str(FIELD_WEIGHTS[field]) for field in SEARCH_FIELDS)
+        sql = (
+            f"SELECT rowid, score FROM (SELECT rowid, bm25({self.TABLE}, {weights}) AS score "
+            f"FROM {self.TABLE} WHERE {self.TABLE} MATCH :match)"
+        )
+        params: Dict[str, object] = {"match": self._match_expression(terms)}
+        if after is not None:
+            sql += " WHERE (score, rowid) > (:after_score, :after_id)"
+            params["after_score"] = -after[0]
+            params["after_id"] = after[1]
+        sql += " ORDER BY score, rowid"
+        if limit is not None:
+            sql += " LIMIT :limit"
+            params["limit"] = limit
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(sql), params).all()
+        # bm25() is negative with better matches lower; flip so higher is better
+        return [(row[0], -row[1]) for row in rows]
+
+    @staticmethod
+    def is_supported(bind: Engine) -> bool:
+        """Check whether the SQLite library was compiled with FTS5"""
+        try:
+            with bind.connect() as conn:
+                options = conn.execute(text("PRAGMA compile_options")).scalars().all()
+            return "ENABLE_FTS5" in options
+        except Exception as e:
+            logger.warning(f"Could not detect FTS5 support: {e}")
+            return False
+
+
+class InvertedIndex(SearchIndex):
+    """In-process inverted index with weighted TF-IDF ranking.
+
+    Postings map each term to ``{product_id: weighted term frequency}``. A
+    sorted vocabulary gives prefix expansion in ``O(log V)`` and queries
+    intersect postings starting from the rarest term, so cost tracks the
+    number of matches rather than the catalog size.
+    """
+
+    def __init__(self, bind: Engine):
+        self.engine = bind
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, List[str]] = {}
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        columns = [Product.id] + [getattr(Product, field) for field in SEARCH_FIELDS]
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(*columns)).all()
+        with self._lock:
+            self._postings = {}
+            self._doc_terms = {}
+            for row in rows:
+                self._add(row[0], dict(zip(SEARCH_FIELDS, row[1:])))
+            self._vocabulary_dirty = True
+            self._loaded = True
+        logger.info(f"Built in-process search index for {len(rows)} products")
+
+    def _add(self, product_id: int, fields: Dict[str, Optional[str]]) -> None:
+        weighted: Dict[str, float] = {}
+        for field, value in fields.items():
+            for term in tokenize(value):
+                weighted[term] = weighted.get(term, 0.0) + FIELD_WEIGHTS[field]
+        for term, weight in weighted.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocabulary_dirty = True
+            postings[product_id] = weight
+        self._doc_terms[product_id] = list(weighted)
+
+    def _remove(self, product_id: int) -> None:
+        for term in self._doc_terms.pop(product_id, []):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[term]
+                self._vocabulary_dirty = True
+
+    def index_product(self, product: Product) -> None:
+        with self._lock:
+            if not self._loaded:
+                return  # the first search loads everything, including this product
+            self._remove(product.id)
+            self._add(product.id, {field: getattr(product, field) for field in SEARCH_FIELDS})
+
+    def remove_product(self, product_id: int) -> None:
+        with self._lock:
+            self._remove(product_id)
+
+    def _expand(self, prefix: str) -> List[str]:
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect_left(self._vocabulary, prefix)
+        matches = []
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def search(
+        self, query: str, limit: Optional[int] = None, after: Optional[Tuple[float, int]] = None
+    ) -> SearchHits:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        self._ensure_loaded()
+        with self._lock:
+            total_docs = max(len(self._doc_terms), 1)
+            per_term: List[Dict[int, float]] = []
+            for term in terms:
+                scores: Dict[int, float] = {}
+                for expanded in self._expand(term):
+                    postings = self._postings[expanded]
+                    idf = math.log(1 + total_docs / len(postings))
+                    for product_id, weight in postings.items():
+                        score = weight * idf
+                        if score > scores.get(product_id, 0.0):
+                            scores[product_id] = score
+                if not scores:
+                    return []
+                per_term.append(scores)
+
+        per_term.sort(key=len)
+        candidates = set(per_term[0])
+        for scores in per_term[1:]:
+            candidates.intersection_update(scores)
+            if not candidates:
+                return []
+        hits = [(pid, sum(scores[pid] for scores in per_term)) for pid in candidates]
+        if after is not None:
+            position = (-after[0], after[1])
+            hits = [hit for hit in hits if (-hit[1], hit[0]) > position]
+        hits.sort(key=lambda hit: (-hit[1], hit[0]))
+        return hits[:limit] if limit is not None else hits
+
+
+_search_index: Optional[SearchIndex] = None
+_search_index_lock = threading.Lock()
+
+
+def create_search_index(bind: Engine) -> SearchIndex:
+    """Pick the best index implementation for an engine"""
+    if bind.dialect.name == "sqlite" and SQLiteFTSIndex.is_supported(bind):
+        return SQLiteFTSIndex(bind)
+    return InvertedIndex(bind)
+
+
+def get_search_index() -> SearchIndex:
+    """Get the process-wide search index for the default engine"""
+    global _search_index
+    if _search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                _search_index = create_search_index(default_engine)
+                logger.info(f"Using {type(_search_index).__name__} for product search")
+    return _search_index
@@ -0,0 +1 @@
+"""Performance benchmarks for the store's catalog and cart paths"""
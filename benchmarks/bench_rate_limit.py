@@ -0,0 +1,141 @@
+"""Per-request overhead and memory of the rate limiting middleware.
+
+Drives ``RateLimitMiddleware`` directly over a no-op ASGI app with
+requests spread across many client IPs, for each limiter, and reports
+microseconds per request on top of the bare app and the memory held per
+client key at the end of the run. ``legacy`` is the previous list-of-timestamps-per-IP scheme,
+kept here for comparison.
+
+Usage:
+    python -m benchmarks.bench_rate_limit [--requests 200000] [--clients 10000] [--limit 100]
+        [--limiters none,legacy,sliding_window,token_bucket,sqlite]
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+LIMITERS = ("none", "legacy", "sliding_window", "token_bucket", "sqlite")
+
+
+def _legacy_limiter():
+    from app.core.rate_limit import Decision, RateLimiter
+
+    class LegacyListLimiter(RateLimiter):
+        """Timestamps of every request in the window, per key, filtered on each hit"""
+
+        def __init__(self):
+            self.requests: Dict[str, List[float]] = {}
+
+        def __len__(self) -> int:
+            return len(self.requests)
+
+        def hit(self, key, limit, window, now=None):
+            now = time.time() if now is None else now
+            recent = [stamp for stamp in self.requests.get(key, ()) if now - stamp < window]
+            if len(recent) >= limit:
+                self.requests[key] = recent
+                return Decision(False, 0, window)
+            recent.append(now)
+            self.requests[key] = recent
+            return Decision(True, limit - len(recent), 0.0)
+
+    return LegacyListLimiter()
+
+
+def _limiter(name: str, directory: str):
+    from app.core.rate_limit import SlidingWindowLimiter, SQLiteRateLimiter, TokenBucketLimiter
+
+    if name == "legacy":
+        return _legacy_limiter()
+    if name == "sliding_window":
+        return SlidingWindowLimiter()
+    if name == "token_bucket":
+        return TokenBucketLimiter()
+    if name == "sqlite":
+        return SQLiteRateLimiter(os.path.join(directory, "rate_limits.db"))
+    raise ValueError(f"Unknown limiter {name!r}")
+
+
+async def _noop_app(scope, receive, send):
+    return None
+
+
+async def _drive(app, scopes: List[dict]) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        return None
+
+    started = time.perf_counter()
+    for scope in scopes:
+        await app(scope, receive, send)
+    return time.perf_counter() - started
+
+
+def _measure(name: str, scopes: List[dict], limit: int, directory: str) -> Dict[str, Optional[float]]:
+    from app.core.middleware import RateLimitMiddleware
+
+    if name == "none":
+        gc.collect()
+        return {"seconds": asyncio.run(_drive(_noop_app, scopes)), "keys": 0, "bytes_per_key": None}
+
+    gc.collect()
+    limiter = _limiter(name, directory)
+    seconds = asyncio.run(_drive(RateLimitMiddleware(_noop_app, limit=limit, window=60, limiter=limiter), scopes))
+    keys = len(limiter)
+    if name == "sqlite":
+        return {"seconds": seconds, "keys": keys, "bytes_per_key": None}
+
+    # Memory is measured on a separate run so tracing does not skew the timing
+    gc.collect()
+    tracemalloc.start()
+    limiter = _limiter(name, directory)
+    asyncio.run(_drive(RateLimitMiddleware(_noop_app, limit=limit, window=60, limiter=limiter), scopes))
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": seconds, "keys": keys, "bytes_per_key": held / keys if keys else None}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=100, help="requests per client per minute")
+    parser.add_argument("--limiters", default=",".join(LIMITERS))
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    names = [name.strip() for name in args.limiters.split(",") if name.strip()]
+    # Clients in round-robin order, so every client is seen in the first pass
+    scopes = [
+        {"type": "http", "method": "GET", "path": "/api/v1/products", "headers": [],
+         "client": (f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}", 50000)}
+        for index in (position % args.clients for position in range(args.requests))
+    ]
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-rate-limit-") as directory:
+        for name in names:
+            results[name] = _measure(name, scopes, args.limit, directory)
+
+    baseline = results.get("none", {}).get("seconds")
+    print(f"{args.requests} requests from {args.clients} clients, limit {args.limit}/min\n")
+    print(f"{'limiter':16} {'us/request':>11} {'overhead us':>12} {'keys':>8} {'bytes/key':>10}")
+    for name, result in results.items():
+        per_request = result["seconds"] / args.requests * 1e6
+        overhead = "" if baseline is None else f"{per_request - baseline / args.requests * 1e6:.2f}"
+        per_key = "" if result["bytes_per_key"] is None else f"{result['bytes_per_key']:.0f}"
+        print(f"{name:16} {per_request:11.2f} {overhead:>12} {result['keys']:8} {per_key:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
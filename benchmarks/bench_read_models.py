@@ -0,0 +1,109 @@
+"""Compare ORM ``Product`` instances with ``ProductView`` tuples on listing loads.
+
+Seeds a throwaway SQLite database, then loads the whole catalog both ways
+and reports wall time and memory per load.
+
+Usage:
+    python -m benchmarks.bench_read_models [--products 10000] [--repeat 5]
+"""
+
+import argparse
+import gc
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.common import isolated_database
+
+
+def _seed_rows(count: int):
+    categories = ("Running", "Lifestyle", "Basketball", "Soccer", "Training")
+    for index in range(count):
+        yield {
+            "name": f"Benchmark Shoe {index:07d}",
+            "brand": "Adidas",
+            "price": 40.0 + (index % 200),
+            "description": "Lightweight benchmark shoe with a responsive midsole and knit upper.",
+            "category": categories[index % len(categories)],
+            "sizes": ["7", "8", "9", "10", "11"],
+            "colors": ["Core Black", "Cloud White"],
+            "stock": 50,
+            "image_url": f"https://example.com/shoes/{index}.jpg",
+        }
+
+
+def _measure(load: Callable[[], List], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        items = load()
+        timings.append(time.perf_counter() - started)
+        del items
+
+    # Memory is measured on a separate run so tracing does not skew the timings
+    gc.collect()
+    tracemalloc.start()
+    items = load()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(items)
+    del items
+    return {
+        "count": count,
+        "median_ms": statistics.median(timings) * 1000,
+        "min_ms": min(timings) * 1000,
+        "retained_mb": retained / 1024 / 1024,
+        "peak_mb": peak / 1024 / 1024,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ORM objects vs ProductView read models")
+    parser.add_argument("--products", type=int, default=10_000, help="Catalog size to seed")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed loads per variant")
+    args = parser.parse_args(argv)
+
+    isolated_database("bench-read-models-")
+
+    from sqlalchemy import select
+
+    from app.core.database import create_tables, get_db_session
+    from app.models.product import Product
+    from app.models.views import PRODUCT_VIEW_COLUMNS, ProductView
+    from app.services.product_service import NullCache, ProductService
+
+    create_tables()
+    ProductService(cache=NullCache()).bulk_create_products(_seed_rows(args.products))
+
+    def load_orm() -> List[Product]:
+        with get_db_session() as db:
+            return list(db.execute(select(Product).order_by(Product.name, Product.id)).scalars().all())
+
+    def load_views() -> List[ProductView]:
+        with get_db_session() as db:
+            stmt = select(*PRODUCT_VIEW_COLUMNS).order_by(Product.name, Product.id)
+            return [ProductView.from_row(row) for row in db.execute(stmt)]
+
+    results = {"orm": _measure(load_orm, args.repeat), "view": _measure(load_views, args.repeat)}
+
+    print(f"{'variant':<8}{'rows':>10}{'median ms':>12}{'min ms':>10}{'retained MB':>14}{'peak MB':>10}")
+    for variant, stats in results.items():
+        print(
+            f"{variant:<8}{stats['count']:>10,}{stats['median_ms']:>12.1f}{stats['min_ms']:>10.1f}"
+            f"{stats['retained_mb']:>14.2f}{stats['peak_mb']:>10.2f}"
+        )
+    orm, view = results["orm"], results["view"]
+    per_10k = 10_000 / max(orm["count"], 1)
+    print(
+        f"\nPer 10k products: {(orm['median_ms'] - view['median_ms']) * per_10k:.1f} ms faster, "
+        f"{(orm['retained_mb'] - view['retained_mb']) * per_10k:.2f} MB less retained, "
+        f"{(orm['peak_mb'] - view['peak_mb']) * per_10k:.2f} MB lower peak"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
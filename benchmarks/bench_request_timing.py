@@ -0,0 +1,128 @@
+"""Per-request overhead of the request timing middleware.
+
+Drives a FastAPI app with one small JSON endpoint directly over ASGI and
+reports microseconds per request for: no timing middleware, ``legacy``
+(the previous ``@app.middleware("http")`` function, which runs on
+Starlette's ``BaseHTTPMiddleware``), and ``RequestTimingMiddleware`` with
+Server-Timing off and on.
+
+Usage:
+    python -m benchmarks.bench_request_timing [--requests 20000] [--variants none,legacy,asgi,server_timing]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+VARIANTS = ("none", "legacy", "asgi", "server_timing")
+
+
+def _legacy_middleware(app) -> None:
+    from fastapi import Request
+
+    from app.core import metrics
+    from app.core.query_stats import query_scope
+
+    @app.middleware("http")
+    async def add_process_time_header(request: Request, call_next):
+        start_time = time.time()
+        method = request.method
+        status = 500
+        scope = None
+        metrics.http_requests_in_flight.inc(method=method)
+        try:
+            with query_scope(f"{method} {request.url.path}") as scope:
+                response = await call_next(request)
+            status = response.status_code
+            response.headers["X-Process-Time"] = str(time.time() - start_time)
+            response.headers["X-DB-Query-Count"] = str(scope.count)
+            response.headers["X-DB-Time"] = f"{scope.seconds:.6f}"
+            return response
+        finally:
+            metrics.http_requests_in_flight.dec(method=method)
+            route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+            metrics.http_request_duration_seconds.observe(time.time() - start_time, method=method, route=route)
+            metrics.http_responses_total.inc(method=method, route=route, status=str(status))
+            if scope is not None:
+                metrics.http_request_db_queries.observe(scope.count, method=method, route=route)
+
+
+def _app(variant: str):
+    from fastapi import FastAPI
+
+    from app.core import server_timing
+    from app.core.middleware import RequestTimingMiddleware
+
+    app = FastAPI()
+
+    @app.get("/item")
+    async def item():
+        with server_timing.phase(server_timing.CACHE):
+            value = {"id": 1, "name": "Ultraboost", "price": 180.0}
+        return value
+
+    if variant == "legacy":
+        _legacy_middleware(app)
+    elif variant == "asgi":
+        app.add_middleware(RequestTimingMiddleware, server_timing=False)
+    elif variant == "server_timing":
+        app.add_middleware(RequestTimingMiddleware, server_timing=True)
+    elif variant != "none":
+        raise ValueError(f"Unknown variant {variant!r}")
+    return app
+
+
+async def _drive(app, requests: int) -> float:
+    scope = {
+        "type": "http", "method": "GET", "path": "/item", "raw_path": b"/item", "query_string": b"",
+        "headers": [], "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000), "scheme": "http",
+        "http_version": "1.1", "root_path": "",
+    }
+
+    request = {"type": "http.request", "body": b"", "more_body": False}
+    disconnect = {"type": "http.disconnect"}
+
+    async def send(message):
+        return None
+
+    async def call():
+        messages = [disconnect, request]
+
+        async def receive():
+            return messages.pop() if len(messages) > 1 else messages[0]
+
+        await app(dict(scope), receive, send)
+
+    # Warm up routing and the endpoint's dependency cache
+    for _ in range(100):
+        await call()
+    started = time.perf_counter()
+    for _ in range(requests):
+        await call()
+    return time.perf_counter() - started
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    names = [name.strip() for name in args.variants.split(",") if name.strip()]
+    results = {name: asyncio.run(_drive(_app(name), args.requests)) for name in names}
+
+    baseline = results.get("none")
+    print(f"{args.requests} requests\n")
+    print(f"{'variant':16} {'us/request':>11} {'overhead us':>12}")
+    for name, seconds in results.items():
+        per_request = seconds / args.requests * 1e6
+        overhead = "" if baseline is None else f"{per_request - baseline / args.requests * 1e6:.2f}"
+        print(f"{name:16} {per_request:11.2f} {overhead:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
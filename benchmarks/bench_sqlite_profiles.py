@@ -0,0 +1,165 @@
+"""Compare SQLite pragma profiles under mixed concurrent catalog and cart load.
+
+For each profile a fresh database is seeded, then reader threads page
+through category listings while writer threads take variant stock and add
+cart lines, as the store does on "Add to Cart". Reports throughput, latency
+percentiles and errors per profile; any failure other than a lock error is
+printed, and the script exits non-zero if one occurred or a profile completed
+no reads or writes.
+
+Usage:
+    python -m benchmarks.bench_sqlite_profiles [--profiles default,safe,production]
+        [--products 5000] [--readers 8] [--writers 2] [--seconds 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from benchmarks.common import isolated_database, percentile
+
+
+def _run_profile(profile: str, args) -> Dict[str, float]:
+    from sqlalchemy import create_engine, insert, select
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import Session
+
+    from app.core.database import Base, apply_sqlite_pragmas, sqlite_pragmas
+    from app.models.product import CartItem, Product, ProductVariant
+    from app.models.views import PRODUCT_VIEW_COLUMNS
+    from app.services.inventory_service import InventoryService, variant_rows
+
+    categories = ("Running", "Lifestyle", "Basketball", "Soccer", "Training")
+    sizes, colors = ["8", "9", "10", "11"], ["Core Black", "Cloud White"]
+    path = os.path.join(tempfile.mkdtemp(prefix=f"bench-sqlite-{profile}-"), "bench.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False},
+                           pool_size=args.readers + args.writers)
+    apply_sqlite_pragmas(engine, sqlite_pragmas(profile, overrides=""))
+    Base.metadata.create_all(engine)
+
+    with engine.begin() as conn:
+        conn.execute(insert(Product.__table__), [
+            {"name": f"Benchmark Shoe {index:07d}", "brand": "Adidas", "price": 40.0 + index % 200,
+             "description": "Benchmark shoe", "category": categories[index % len(categories)],
+             "sizes": sizes, "colors": colors, "stock": 10_000_000, "image_url": None}
+            for index in range(args.products)
+        ])
+        rows = []
+        for product_id in range(1, args.products + 1):
+            rows.extend(variant_rows(product_id, sizes, colors, 10_000_000))
+        conn.execute(insert(ProductVariant.__table__), rows)
+
+    inventory = InventoryService()
+    deadline = time.perf_counter() + args.seconds
+    lock = threading.Lock()
+    read_latencies: List[float] = []
+    write_latencies: List[float] = []
+    errors = [0]
+    failures: List[str] = []
+
+    def failed(exc: Exception) -> None:
+        with lock:
+            errors[0] += 1
+            if not isinstance(exc, OperationalError) and len(failures) < 5:
+                failures.append(f"{type(exc).__name__}: {exc}")
+
+    def reader(seed: int) -> None:
+        rng = random.Random(seed)
+        latencies = []
+        while time.perf_counter() < deadline:
+            stmt = (
+                select(*PRODUCT_VIEW_COLUMNS)
+                .where(Product.category == rng.choice(categories))
+                .where(Product.name > f"Benchmark Shoe {rng.randrange(args.products):07d}")
+                .order_by(Product.name, Product.id)
+                .limit(24)
+            )
+            started = time.perf_counter()
+            try:
+                with Session(engine) as db:
+                    db.execute(stmt).all()
+                latencies.append(time.perf_counter() - started)
+            except Exception as exc:
+                failed(exc)
+        with lock:
+            read_latencies.extend(latencies)
+
+    def writer(seed: int) -> None:
+        rng = random.Random(seed)
+        latencies = []
+        while time.perf_counter() < deadline:
+            product_id = rng.randrange(1, args.products + 1)
+            size, color = rng.choice(sizes), rng.choice(colors)
+            started = time.perf_counter()
+            try:
+                with Session(engine) as db:
+                    inventory.take_stock_batch(db, [(product_id, size, color, 1)])
+                    db.execute(insert(CartItem.__table__), {
+                        "product_id": product_id, "quantity": 1, "size": size, "color": color,
+                        "session_id": f"bench-{seed}"
+                    })
+                    db.commit()
+                latencies.append(time.perf_counter() - started)
+            except Exception as exc:
+                failed(exc)
+        with lock:
+            write_latencies.extend(latencies)
+
+    threads = [threading.Thread(target=reader, args=(index,)) for index in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(1000 + index,)) for index in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        "reads_per_sec": len(read_latencies) / args.seconds,
+        "writes_per_sec": len(write_latencies) / args.seconds,
+        "read_p50_ms": percentile(read_latencies, 50) * 1000,
+        "read_p95_ms": percentile(read_latencies, 95) * 1000,
+        "write_p50_ms": percentile(write_latencies, 50) * 1000,
+        "write_p95_ms": percentile(write_latencies, 95) * 1000,
+        "errors": errors[0],
+        "failures": failures,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark SQLite pragma profiles under mixed load")
+    parser.add_argument("--profiles", default="default,safe,production",
+                        help="Comma-separated profiles from SQLITE_PRAGMA_PROFILES")
+    parser.add_argument("--products", type=int, default=5_000, help="Catalog size to seed")
+    parser.add_argument("--readers", type=int, default=8, help="Concurrent listing readers")
+    parser.add_argument("--writers", type=int, default=2, help="Concurrent add-to-cart writers")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Load duration per profile")
+    args = parser.parse_args(argv)
+
+    # Keep the app's default engine away from the real database
+    isolated_database()
+
+    print(f"{'profile':<12}{'reads/s':>10}{'writes/s':>10}{'read p50':>10}{'read p95':>10}"
+          f"{'write p50':>11}{'write p95':>11}{'errors':>8}")
+    status = 0
+    for profile in [name.strip() for name in args.profiles.split(",") if name.strip()]:
+        stats = _run_profile(profile, args)
+        print(
+            f"{profile:<12}{stats['reads_per_sec']:>10,.0f}{stats['writes_per_sec']:>10,.0f}"
+            f"{stats['read_p50_ms']:>10.2f}{stats['read_p95_ms']:>10.2f}"
+            f"{stats['write_p50_ms']:>11.2f}{stats['write_p95_ms']:>11.2f}{stats['errors']:>8}"
+        )
+        for failure in stats["failures"]:
+            print(f"  {profile}: {failure}", file=sys.stderr)
+        if stats["failures"] or not stats["reads_per_sec"] or not stats["writes_per_sec"]:
+            status = 1
+    print("\nLatencies in ms. Errors count every failed operation, including 'database is locked' after the busy timeout.")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
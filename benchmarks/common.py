@@ -0,0 +1,41 @@
+"""Helpers shared by the benchmark scripts"""
+
+import os
+import tempfile
+from typing import Dict, List, Sequence
+
+
+def isolated_database(prefix: str = "bench-") -> str:
+    """Point the app at a fresh temporary SQLite file; call before importing ``app``"""
+    path = os.path.join(tempfile.mkdtemp(prefix=prefix), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("DEBUG", "false")
+    return path
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Linearly interpolated percentile of ``samples``"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    if not seconds:
+        return {"count": 0}
+    millis = [value * 1000 for value in seconds]
+    return {
+        "count": len(millis),
+        "mean_ms": sum(millis) / len(millis),
+        "min_ms": min(millis),
+        "p50_ms": percentile(millis, 50),
+        "p90_ms": percentile(millis, 90),
+        "p95_ms": percentile(millis, 95),
+        "p99_ms": percentile(millis, 99),
+        "max_ms": max(millis),
+    }
@@ -0,0 +1,499 @@
+"""End-to-end load generator: thousands of asyncio virtual users against a live server.
+
+Each virtual user behaves like a browser tab. It loads the home page over
+HTTP, joins the page's NiceGUI socket.io websocket, and then fires the same
+UI events a shopper's clicks would: search, product details and add to
+cart, then cart and checkout. It waits for the server's element updates
+after each event. Latency is measured from sending the request or event to
+the first response or UI update.
+
+By default a server is booted locally (``python main.py``) against a
+temporary SQLite database seeded with ``--products`` synthetic products,
+so no external services are needed. Pass ``--url`` to target a running
+server instead. Reports throughput, latency percentiles and error rates
+per scenario, plus the peak number of open websockets, which is what the
+``fly.toml`` connection limits count.
+
+Thousands of users need as many file descriptors; the soft limit is raised
+to the hard limit automatically, raise the hard limit (``ulimit -Hn``) if
+that is not enough.
+
+Usage:
+    python -m benchmarks.loadtest [--users 500] [--ramp-up 30] [--duration 60]
+        [--scenarios home,socket,search,add_to_cart,checkout] [--think 0.5:2]
+        [--products 10000] [--url http://127.0.0.1:8000] [--output report.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from html import unescape
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from benchmarks.common import isolated_database, summarize
+
+SCENARIOS = ("home", "socket", "search", "add_to_cart", "checkout")
+SOCKET_PATH = "/_nicegui_ws/socket.io/"
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+_CLIENT_ID = re.compile(r"""["']?client_id["']?\s*:\s*["']([0-9A-Za-z-]+)["']""")
+# The page embeds its element tree as parseElements(String.raw`<HTML-escaped JSON>`)
+_ELEMENTS = re.compile(r"parseElements\(String\.raw`(.*?)`\)", re.DOTALL)
+
+
+class ScenarioError(Exception):
+    """A step did not get the response a browser would have seen"""
+
+
+class Recorder:
+    """Latency samples and error counts per scenario"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.open_sockets = 0
+        self.peak_sockets = 0
+        self.started = time.perf_counter()
+
+    def ok(self, scenario: str, seconds: float) -> None:
+        self.latencies[scenario].append(seconds)
+
+    def error(self, scenario: str, reason: str) -> None:
+        self.errors[scenario][reason[:120]] += 1
+
+    def socket_opened(self) -> None:
+        self.open_sockets += 1
+        self.peak_sockets = max(self.peak_sockets, self.open_sockets)
+
+    def socket_closed(self) -> None:
+        self.open_sockets -= 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        scenarios = {}
+        for name in SCENARIOS:
+            done, failed = len(self.latencies[name]), sum(self.errors[name].values())
+            if not done and not failed:
+                continue
+            scenarios[name] = {
+                **summarize(self.latencies[name]),
+                "throughput_per_sec": done / elapsed if elapsed else 0.0,
+                "errors": failed,
+                "error_rate": failed / (done + failed),
+                "error_reasons": dict(self.errors[name].most_common(5)),
+            }
+        return {"elapsed_seconds": elapsed, "peak_websockets": self.peak_sockets, "scenarios": scenarios}
+
+
+class UIClient:
+    """Minimal stand-in for the NiceGUI browser client.
+
+    Keeps the page's element tree in sync from the server's ``update``
+    messages and sends ``event`` messages for element listeners, speaking
+    Engine.IO v4 / Socket.IO v5 over a plain websocket.
+    """
+
+    def __init__(self, base_url: str, html: str, timeout: float):
+        match = _CLIENT_ID.search(html)
+        if not match:
+            raise ScenarioError("page has no NiceGUI client id")
+        self.client_id = match.group(1)
+        self.elements: Dict[str, Dict[str, Any]] = _page_elements(html)
+        self.timeout = timeout
+        parts = urlsplit(base_url)
+        self.socket_url = urlunsplit((
+            "wss" if parts.scheme == "https" else "ws", parts.netloc,
+            parts.path.rstrip("/") + SOCKET_PATH, f"client_id={self.client_id}&EIO=4&transport=websocket", ""
+        ))
+        self.ws = None
+
+    async def connect(self) -> None:
+        """Open the websocket and complete the Socket.IO connect and NiceGUI handshake"""
+        import websockets
+
+        self.ws = await websockets.connect(self.socket_url, open_timeout=self.timeout, max_size=None)
+        opening = await self._recv()
+        if not opening.startswith("0"):
+            raise ScenarioError(f"unexpected Engine.IO open packet {opening[:40]!r}")
+        await self.ws.send("40")
+        await self._until(lambda packet: packet.startswith("40"), "socket.io connect")
+        tab_id = f"loadtest-{random.getrandbits(48):x}"
+        await self.ws.send("421" + json.dumps(["handshake", {"client_id": self.client_id, "tab_id": tab_id}]))
+        ack = await self._until(lambda packet: packet.startswith("431"), "handshake")
+        if json.loads(ack[3:]) != [True]:
+            raise ScenarioError("handshake rejected")
+
+    async def close(self) -> None:
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def _recv(self) -> str:
+        packet = await asyncio.wait_for(self.ws.recv(), self.timeout)
+        if isinstance(packet, bytes):
+            packet = packet.decode()
+        return packet
+
+    async def _until(self, done: Callable[[str], bool], what: str) -> str:
+        """Read packets, answering pings and applying updates, until ``done`` matches one"""
+        deadline = time.perf_counter() + self.timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise ScenarioError(f"timed out waiting for {what}")
+            try:
+                packet = await asyncio.wait_for(self._recv(), remaining)
+            except asyncio.TimeoutError:
+                raise ScenarioError(f"timed out waiting for {what}") from None
+            if packet == "2":
+                await self.ws.send("3")
+                continue
+            if packet.startswith("44") or packet in ("1", "41"):
+                raise ScenarioError(f"server closed the socket during {what}")
+            if packet.startswith("42"):
+                name, *args = json.loads(packet[packet.index("["):])
+                if name == "update" and args:
+                    for element_id, element in args[0].items():
+                        if element is None:
+                            self.elements.pop(str(element_id), None)
+                        else:
+                            self.elements[str(element_id)] = {**element, "id": int(element_id)}
+            if done(packet):
+                return packet
+
+    def find(self, match: Callable[[Dict[str, Any]], bool], event: Optional[str] = "click") -> List[Dict[str, Any]]:
+        """Elements matching ``match`` that have a listener for ``event`` (any element if None)"""
+        return [
+            element for element in self.elements.values()
+            if match(element) and (event is None or any(
+                _event_type(listener, event) for listener in element.get("events") or ()
+            ))
+        ]
+
+    async def send_event(self, element: Dict[str, Any], event: str = "click", args: Any = None) -> None:
+        """Send an element event the way the browser does, without waiting for a reply"""
+        listener = next(item for item in element["events"] if _event_type(item, event))
+        message = {
+            "id": element["id"], "client_id": self.client_id, "listener_id": listener["listener_id"],
+            "args": [None if args is None else json.dumps(args)],
+        }
+        await self.ws.send("42" + json.dumps(["event", message]))
+
+    async def fire(self, element: Dict[str, Any], event: str = "click", args: Any = None,
+                   until: Optional[Callable[["UIClient"], bool]] = None) -> float:
+        """Send an element event and wait for the server's next update (or for ``until``)"""
+        started = time.perf_counter()
+        await self.send_event(element, event, args)
+        await self._until(
+            lambda packet: packet.startswith('42["update"') and (until is None or until(self)),
+            f"UI update after {event} on element {element['id']}"
+        )
+        return time.perf_counter() - started
+
+
+def _event_type(listener: Dict[str, Any], event: str) -> bool:
+    kind = listener.get("type", "")
+    # Value listeners are registered as update:model-value / update:modelValue
+    return kind.startswith("update:") if event == "update" else kind == event
+
+
+def _page_elements(html: str) -> Dict[str, Dict[str, Any]]:
+    match = _ELEMENTS.search(html)
+    if not match:
+        raise ScenarioError("page has no element tree")
+    elements = json.loads(unescape(match.group(1)))
+    # Element dicts are keyed by id but do not carry it
+    return {str(element_id): {**element, "id": int(element_id)} for element_id, element in elements.items()}
+
+
+def _text(text: str) -> Callable[[Dict[str, Any]], bool]:
+    return lambda element: element.get("text") == text or (element.get("props") or {}).get("label") == text
+
+
+def _icon(icon: str) -> Callable[[Dict[str, Any]], bool]:
+    return lambda element: (element.get("props") or {}).get("icon") == icon
+
+
+class VirtualUser:
+    """One shopper repeating the browse-to-checkout journey until the deadline"""
+
+    def __init__(self, index: int, args, http, recorder: Recorder, deadline: float):
+        self.rng = random.Random(f"{args.seed}:{index}")
+        self.args = args
+        self.http = http
+        self.recorder = recorder
+        self.deadline = deadline
+        self.scenarios = set(args.scenarios)
+
+    async def think(self) -> None:
+        low, high = self.args.think
+        await asyncio.sleep(self.rng.uniform(low, high))
+
+    async def run(self) -> None:
+        while time.perf_counter() < self.deadline:
+            try:
+                await self.journey()
+            except ScenarioError:
+                # Recorded by the failing step; start over with a fresh page
+                pass
+            await self.think()
+
+    async def step(self, scenario: str, action, timed: bool = True) -> Any:
+        """Run one action, recording its latency (if ``timed``) or its failure under ``scenario``"""
+        started = time.perf_counter()
+        try:
+            result = await action()
+        except ScenarioError as e:
+            self.recorder.error(scenario, str(e))
+            raise
+        except Exception as e:
+            self.recorder.error(scenario, f"{type(e).__name__}: {e}")
+            raise ScenarioError(str(e)) from e
+        if timed:
+            # UI events report their own event-to-update latency
+            self.recorder.ok(scenario, result if isinstance(result, float) else time.perf_counter() - started)
+        return result
+
+    async def load_page(self) -> str:
+        response = await self.http.get("/")
+        if response.status_code != 200:
+            raise ScenarioError(f"HTTP {response.status_code}")
+        return response.text
+
+    async def open_socket(self, html: str) -> UIClient:
+        ui = UIClient(str(self.http.base_url), html, self.args.timeout)
+        try:
+            await ui.connect()
+        except BaseException:
+            await ui.close()
+            raise
+        return ui
+
+    async def journey(self) -> None:
+        html = await self.step("home", self.load_page)
+        if not self.scenarios - {"home"}:
+            return
+
+        ui = await self.step("socket", lambda: self.open_socket(html))
+        self.recorder.socket_opened()
+        try:
+            await self.interact(ui)
+        finally:
+            self.recorder.socket_closed()
+            await ui.close()
+
+    @staticmethod
+    def require(elements: List[Dict[str, Any]], what: str) -> Dict[str, Any]:
+        if not elements:
+            raise ScenarioError(f"{what} not found")
+        return elements[0]
+
+    async def interact(self, ui: UIClient) -> None:
+        from benchmarks.seed import MODELS
+
+        if "search" in self.scenarios and time.perf_counter() < self.deadline:
+            await self.think()
+
+            async def search() -> float:
+                search_input = self.require(ui.find(
+                    lambda element: (element.get("props") or {}).get("placeholder") == "Search shoes...", "update"
+                ), "search input")
+                search_button = self.require(ui.find(_icon("search")), "search button")
+                cards = {element["id"] for element in ui.find(_text("View Details"))}
+                # The value change needs no reply; the click re-renders the product grid
+                await ui.send_event(search_input, "update", self.rng.choice(MODELS))
+                return await ui.fire(search_button, until=lambda client: bool(
+                    {element["id"] for element in client.find(_text("View Details"))} != cards
+                    or client.find(_text("No products found"), event=None)
+                ))
+
+            await self.step("search", search)
+
+        if "add_to_cart" in self.scenarios and time.perf_counter() < self.deadline:
+            await self.think()
+
+            async def open_details() -> float:
+                cards = ui.find(_text("View Details"))
+                self.require(cards, "product card")
+                return await ui.fire(self.rng.choice(cards), until=lambda client: bool(client.find(_text("Add to Cart"))))
+
+            await self.step("add_to_cart", open_details, timed=False)
+            await self.think()
+            await self.step("add_to_cart", lambda: ui.fire(self.require(ui.find(_text("Add to Cart")), "add button")))
+
+        if "checkout" in self.scenarios and time.perf_counter() < self.deadline:
+            await self.think()
+            await self.step("checkout", lambda: ui.fire(
+                self.require(ui.find(_icon("shopping_cart")), "cart button"),
+                until=lambda client: bool(
+                    client.find(_text("Proceed to Checkout")) or client.find(_text("Your cart is empty"), event=None)
+                )
+            ), timed=False)
+            await self.step("checkout", lambda: ui.fire(
+                self.require(ui.find(_text("Proceed to Checkout")), "checkout button (cart was empty)"),
+                until=lambda client: bool(client.find(_text("Continue Shopping")))
+            ))
+
+
+def _raise_fd_limit(users: int) -> None:
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    # HTTP connection plus websocket per user, and headroom for the server
+    wanted = users * 2 + 256
+    if soft >= wanted:
+        return
+    target = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    if target < wanted:
+        print(f"warning: open file limit {target} is below the ~{wanted} needed for {users} users",
+              file=sys.stderr)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def boot_server(args) -> Tuple[subprocess.Popen, str]:
+    """Start ``main.py`` on a free port against a seeded temporary database"""
+    path = isolated_database("loadtest-")
+    if args.products:
+        from benchmarks.seed import seed_database
+
+        print(f"Seeding {args.products:,} products into {path} ...", file=sys.stderr)
+        seed_database(args.products, 0, seed=args.seed)
+
+    port = _free_port()
+    env = {**os.environ, "HOST": "127.0.0.1", "PORT": str(port), "DEBUG": "false",
+           "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING")}
+    server = subprocess.Popen([sys.executable, "main.py"], cwd=REPO_ROOT, env=env)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def wait_until_ready(http, server: Optional[subprocess.Popen], timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}")
+        try:
+            if (await http.get("/api/health")).status_code < 500:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"server not ready after {timeout:.0f}s")
+
+
+async def run(args, base_url: str, server: Optional[subprocess.Popen]) -> Dict[str, Any]:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.users + 10, max_keepalive_connections=args.users + 10)
+    # One pool for everyone, but a client (cookie jar) per user, like separate browsers
+    transport = httpx.AsyncHTTPTransport(limits=limits)
+    timeout = httpx.Timeout(args.timeout)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as probe:
+            await wait_until_ready(probe, server, args.startup_timeout)
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        deadline = started + args.ramp_up + args.duration
+
+        async def user(index: int) -> None:
+            await asyncio.sleep(args.ramp_up * index / args.users)
+            # Not closed per user: closing a client closes the shared transport
+            http = httpx.AsyncClient(base_url=base_url, transport=transport, timeout=timeout)
+            await VirtualUser(index, args, http, recorder, deadline).run()
+
+        tasks = [asyncio.create_task(user(index)) for index in range(args.users)]
+        await asyncio.sleep(max(0.0, deadline - time.perf_counter()))
+        # Let in-flight steps finish, then cut off stragglers
+        _, pending = await asyncio.wait(tasks, timeout=args.timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return recorder.report(time.perf_counter() - started)
+    finally:
+        await transport.aclose()
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{'scenario':<14}{'ok':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'max ms':>9}{'errors':>8}{'err %':>7}", file=sys.stderr)
+    for name, stats in report["scenarios"].items():
+        print(
+            f"{name:<14}{stats['count']:>8}{stats['throughput_per_sec']:>9.1f}"
+            f"{stats.get('p50_ms', 0):>9.1f}{stats.get('p95_ms', 0):>9.1f}{stats.get('p99_ms', 0):>9.1f}"
+            f"{stats.get('max_ms', 0):>9.1f}{stats['errors']:>8}{stats['error_rate'] * 100:>7.1f}",
+            file=sys.stderr
+        )
+        for reason, count in stats["error_reasons"].items():
+            print(f"{'':<14}{count:>8} x {reason}", file=sys.stderr)
+    print(f"\nPeak open websockets: {report['peak_websockets']} over {report['elapsed_seconds']:.0f}s",
+          file=sys.stderr)
+
+
+def _think_range(value: str) -> Tuple[float, float]:
+    low, _, high = value.partition(":")
+    return float(low), float(high or low)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Drive concurrent virtual shoppers against the store")
+    parser.add_argument("--url", help="Target a running server instead of booting one")
+    parser.add_argument("--users", type=int, default=500, help="Concurrent virtual users")
+    parser.add_argument("--ramp-up", type=float, default=30.0, help="Seconds over which users start")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of full load after ramp-up")
+    parser.add_argument("--scenarios", type=lambda value: [item.strip() for item in value.split(",")],
+                        default=list(SCENARIOS), help=f"Steps of the journey to run, from {','.join(SCENARIOS)}")
+    parser.add_argument("--think", type=_think_range, default=(0.5, 2.0),
+                        help="Pause between steps in seconds, as MIN:MAX")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-step timeout in seconds")
+    parser.add_argument("--products", type=int, default=10_000, help="Catalog size seeded for a booted server")
+    parser.add_argument("--startup-timeout", type=float, default=60.0, help="Seconds to wait for the server")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for data and user behaviour")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    _raise_fd_limit(args.users)
+    server, base_url = (None, args.url.rstrip("/")) if args.url else boot_server(args)
+    try:
+        print(f"Running {args.users} users against {base_url} "
+              f"({args.ramp_up:.0f}s ramp-up, {args.duration:.0f}s load) ...", file=sys.stderr)
+        report = asyncio.run(run(args, base_url, server))
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    report["meta"] = {
+        "url": base_url, "users": args.users, "ramp_up": args.ramp_up, "duration": args.duration,
+        "scenarios": args.scenarios, "think": args.think, "products": None if args.url else args.products,
+    }
+    _print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    # Errors under load are results, not failures; only a run where nothing worked fails
+    return 0 if any(stats["count"] for stats in report["scenarios"].values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Deterministic synthetic catalog and carts for benchmarks.
+
+Products go through ``ProductService.bulk_create_products`` so seeding
+exercises the same import path (chunked inserts, variant migration, search
+index) as production. Carts are written with Core inserts in one
+transaction: each seeded cart has lines, matching stock holds and the
+variant stock those holds took.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+CATEGORIES = ("Running", "Lifestyle", "Basketball", "Soccer", "Training", "Originals")
+MODELS = ("Ultraboost", "Samba", "Gazelle", "Superstar", "Stan Smith", "Forum",
+          "Predator", "Copa", "Adizero", "Terrex", "Campus", "Ozweego")
+EDITIONS = ("Core", "Pro", "Lite", "Prime", "Trail", "Street", "Classic", "Elite", "Vintage", "Edge")
+MATERIALS = ("knit", "suede", "leather", "mesh", "canvas", "primeknit")
+SIZES = ("6", "7", "8", "9", "10", "11", "12", "13")
+COLORS = ("Core Black", "Cloud White", "Solar Red", "Collegiate Navy", "Grey Two", "Pulse Lime")
+
+# Plenty of stock so timed add-to-cart and checkout loops never run out
+PRODUCT_STOCK = 1_000_000
+
+
+def catalog_rows(count: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """Yield ``count`` product rows, the same ones for the same seed"""
+    rng = random.Random(seed)
+    for index in range(count):
+        model = MODELS[index % len(MODELS)]
+        edition = rng.choice(EDITIONS)
+        category = CATEGORIES[index % len(CATEGORIES)]
+        material = rng.choice(MATERIALS)
+        yield {
+            "name": f"{model} {edition} {index:07d}",
+            "brand": "Adidas",
+            "price": round(rng.uniform(40, 260), 2),
+            "description": f"{edition} {model} {category.lower()} shoe with a {material} upper.",
+            "category": category,
+            "sizes": sorted(rng.sample(SIZES, 3), key=SIZES.index),
+            "colors": rng.sample(COLORS, 2),
+            "stock": PRODUCT_STOCK,
+            "image_url": f"https://example.com/shoes/{index}.jpg",
+        }
+
+
+def seed_catalog(count: int, seed: int = 42, chunk_size: int = 10_000) -> Dict[str, Any]:
+    """Bulk insert the synthetic catalog; returns the import stats"""
+    from app.services.product_service import NullCache, ProductService
+
+    return ProductService(cache=NullCache()).bulk_create_products(catalog_rows(count, seed), chunk_size=chunk_size)
+
+
+def cart_session_id(index: int) -> str:
+    """Session id of the ``index``-th seeded cart"""
+    return f"bench-cart-{index:07d}"
+
+
+def seed_carts(carts: int, lines: int = 3, seed: int = 42) -> List[str]:
+    """Create ``carts`` carts of ``lines`` lines each; returns their session ids"""
+    from sqlalchemy import func, insert, select
+
+    from app.core.database import get_db_session
+    from app.models.product import CartItem, ProductVariant, StockReservation
+    from app.services.inventory_service import InventoryService
+
+    if carts <= 0:
+        return []
+    rng = random.Random(seed)
+    inventory = InventoryService()
+    expires_at = datetime.utcnow() + timedelta(days=1)
+    session_ids = [cart_session_id(index) for index in range(carts)]
+    with get_db_session() as db:
+        max_variant = db.execute(select(func.max(ProductVariant.id))).scalar() or 0
+        if not max_variant:
+            return []
+        variant_ids = sorted({rng.randint(1, max_variant) for _ in range(carts * lines)})
+        variants = []
+        # Stay well under SQLite's bound parameter limit
+        for start in range(0, len(variant_ids), 5_000):
+            variants += db.execute(
+                select(ProductVariant.id, ProductVariant.product_id, ProductVariant.size, ProductVariant.color)
+                .where(ProductVariant.id.in_(variant_ids[start:start + 5_000]))
+            ).all()
+        items, holds, taken = [], [], []
+        for session_id in session_ids:
+            for _, product_id, size, color in rng.sample(variants, min(lines, len(variants))):
+                quantity = rng.randint(1, 3)
+                items.append({"product_id": product_id, "quantity": quantity, "size": size,
+                              "color": color, "session_id": session_id})
+                holds.append({"session_id": session_id, "product_id": product_id, "size": size,
+                              "color": color, "quantity": quantity, "expires_at": expires_at})
+                taken.append((product_id, size, color, quantity))
+        inventory.take_stock_batch(db, taken)
+        db.execute(insert(CartItem.__table__), items)
+        db.execute(insert(StockReservation.__table__), holds)
+        db.commit()
+    return session_ids
+
+
+def seed_database(products: int, carts: int, lines: int = 3, seed: int = 42) -> Dict[str, Any]:
+    """Create the schema and seed catalog plus carts; returns timings"""
+    from app.core.database import create_tables
+    import app.models.product  # noqa: F401 - registers the tables
+
+    create_tables()
+    started = time.perf_counter()
+    stats = seed_catalog(products, seed)
+    catalog_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    session_ids = seed_carts(carts, lines, seed)
+    return {
+        "products": stats["rows"],
+        "carts": len(session_ids),
+        "catalog_seconds": round(catalog_seconds, 3),
+        "cart_seconds": round(time.perf_counter() - started, 3),
+    }
@@ -0,0 +1,290 @@
+"""Reproducible latency benchmarks for the hot ProductService/CartService calls.
+
+``run`` seeds a synthetic catalog and carts into a temporary SQLite
+database, times each call over many iterations and reports latency
+percentiles as JSON. ``compare`` diffs two such reports and exits non-zero
+when any call got slower than the threshold, so a performance change can
+be judged against a stored baseline.
+
+Reads bypass the catalog cache unless ``--cache on``, so the numbers
+reflect the database paths. Per-iteration setup (building the cart to
+check out, picking inputs) is excluded from the timings.
+
+Usage:
+    python -m benchmarks.suite run [--scale 10k|100k|1m] [--iterations 200]
+        [--output results.json] [--save-baseline] [--baseline baseline.json]
+    python -m benchmarks.suite compare BASELINE CURRENT [--metric p95_ms] [--threshold 15]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.common import isolated_database, summarize
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+BASELINE_DIR = Path(__file__).parent / "baselines"
+METRICS = ("mean_ms", "p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms")
+
+# A case does its untimed setup with the given RNG and returns the call to time
+Case = Callable[[random.Random], Callable[[], Any]]
+
+
+class Workload:
+    """The benchmarked calls, bound to one seeded database"""
+
+    def __init__(self, session_ids: List[str], cache: bool, seed: int):
+        from sqlalchemy import func, select
+
+        from app.core.database import get_db_session
+        from app.models.product import ProductVariant
+        from app.services.product_service import NullCache, ProductService
+
+        self.products = ProductService() if cache else ProductService(cache=NullCache())
+        self.cache = cache
+        self.session_ids = session_ids
+        rng = random.Random(seed)
+        with get_db_session() as db:
+            max_variant = db.execute(select(func.max(ProductVariant.id))).scalar() or 0
+            sample = sorted({rng.randint(1, max_variant) for _ in range(1_000)})
+            self.variants = db.execute(
+                select(ProductVariant.product_id, ProductVariant.size, ProductVariant.color)
+                .where(ProductVariant.id.in_(sample))
+            ).all()
+
+    def cases(self) -> Dict[str, Case]:
+        return {
+            "search_products": self.search_products,
+            "get_products_by_category": self.get_products_by_category,
+            "get_products_by_category_deep": self.get_products_by_category_deep,
+            "get_featured_products": self.get_featured_products,
+            "add_item": self.add_item,
+            "get_cart_summary": self.get_cart_summary,
+            "checkout": self.checkout,
+        }
+
+    def _cart(self, session_id: Optional[str] = None):
+        from app.services.cart_service import CartService
+        from app.services.cart_store import SQLCartStore
+
+        # With --cache off, cart reads go to cart_items every time too
+        cart = CartService(session_id, store=None if self.cache else SQLCartStore())
+        cart.product_service = self.products
+        return cart
+
+    def search_products(self, rng: random.Random):
+        from benchmarks.seed import EDITIONS, MODELS
+
+        query = rng.choice([rng.choice(MODELS), f"{rng.choice(EDITIONS)} {rng.choice(MODELS)}", "primeknit"])
+        return lambda: self.products.search_products(query, limit=24)
+
+    def get_products_by_category(self, rng: random.Random):
+        from benchmarks.seed import CATEGORIES
+
+        category = rng.choice(CATEGORIES)
+        return lambda: self.products.get_products_by_category(category, limit=24)
+
+    def get_products_by_category_deep(self, rng: random.Random):
+        from app.services.product_service import encode_cursor
+        from benchmarks.seed import CATEGORIES, MODELS
+
+        # A keyset position part-way through the category, as after paging down
+        category = rng.choice(CATEGORIES)
+        cursor = encode_cursor(rng.choice(MODELS), 0)
+        return lambda: self.products.get_products_by_category(category, limit=24, cursor=cursor)
+
+    def get_featured_products(self, rng: random.Random):
+        return lambda: self.products.get_featured_products(limit=8)
+
+    def add_item(self, rng: random.Random):
+        cart = self._cart(rng.choice(self.session_ids) if self.session_ids else None)
+        product_id, size, color = rng.choice(self.variants)
+        return lambda: cart.add_item(product_id, 1, size, color)
+
+    def get_cart_summary(self, rng: random.Random):
+        cart = self._cart(rng.choice(self.session_ids) if self.session_ids else None)
+        return cart.get_cart_summary
+
+    def checkout(self, rng: random.Random):
+        from app.services.checkout_service import CheckoutService
+
+        cart = self._cart()
+        for product_id, size, color in rng.sample(self.variants, min(3, len(self.variants))):
+            cart.add_item(product_id, rng.randint(1, 2), size, color)
+        return CheckoutService(cart).checkout
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).parent, check=True
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> int:
+    products = args.products or SCALES[args.scale]
+    carts = args.carts if args.carts is not None else max(10, products // 100)
+    label = str(products) if args.products else args.scale
+    path = isolated_database("bench-suite-")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    import sqlalchemy
+
+    from app.core.config import settings
+    from benchmarks.seed import cart_session_id, seed_database
+
+    print(f"Seeding {products:,} products and {carts:,} carts into {path} ...", file=sys.stderr)
+    seeded = seed_database(products, carts, seed=args.seed)
+    session_ids = [cart_session_id(index) for index in range(seeded["carts"])]
+
+    workload = Workload(session_ids, args.cache == "on", args.seed)
+    selected = [name.strip() for name in args.cases.split(",")] if args.cases else list(workload.cases())
+    results: Dict[str, Dict[str, float]] = {}
+    for name in selected:
+        case = workload.cases()[name]
+        rng = random.Random(f"{args.seed}:{name}")
+        for _ in range(args.warmup):
+            case(rng)()
+        timings: List[float] = []
+        failures = 0
+        for _ in range(args.iterations):
+            call = case(rng)
+            started = time.perf_counter()
+            try:
+                outcome = call()
+            except Exception:
+                outcome = False
+            timings.append(time.perf_counter() - started)
+            # Services log and return False instead of raising on most failures
+            failures += outcome is False
+        results[name] = {**summarize(timings), "failures": failures}
+        print(f"  {name:<32}p50 {results[name]['p50_ms']:8.3f} ms   p95 {results[name]['p95_ms']:8.3f} ms"
+              f"   p99 {results[name]['p99_ms']:8.3f} ms", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "scale": label,
+            "products": seeded["products"],
+            "carts": seeded["carts"],
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "cache": args.cache,
+            "seeding": seeded,
+            "sqlite_pragma_profile": settings.SQLITE_PRAGMA_PROFILE,
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        target = BASELINE_DIR / f"{label}.json"
+        target.write_text(output + "\n")
+        print(f"Saved baseline {target}", file=sys.stderr)
+    if args.baseline:
+        return _compare(json.loads(Path(args.baseline).read_text()), report,
+                        args.metric, args.threshold, args.min_delta_ms)
+    return 0
+
+
+def _compare(baseline: Dict[str, Any], current: Dict[str, Any], metric: str,
+             threshold: float, min_delta_ms: float) -> int:
+    """Print a per-call diff; returns 1 if anything regressed"""
+    for key in ("products", "iterations", "cache"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"warning: {key} differs (baseline {baseline['meta'].get(key)}, "
+                  f"current {current['meta'].get(key)})", file=sys.stderr)
+
+    regressions = []
+    print(f"{'call':<32}{'baseline':>12}{'current':>12}{'change':>10}  ({metric})", file=sys.stderr)
+    for name, stats in current["results"].items():
+        before = baseline["results"].get(name, {}).get(metric)
+        after = stats.get(metric)
+        if before is None or after is None:
+            print(f"{name:<32}{'-':>12}{after or 0:>12.3f}{'new':>10}", file=sys.stderr)
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        # Sub-threshold absolute deltas on very fast calls are noise
+        regressed = change > threshold and after - before > min_delta_ms
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<32}{before:>12.3f}{after:>12.3f}{change:>+9.1f}%{'  REGRESSION' if regressed else ''}",
+              file=sys.stderr)
+        if stats.get("failures"):
+            print(f"{'':<32}{stats['failures']} failed calls", file=sys.stderr)
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {threshold:g}%: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    print(f"No regressions over {threshold:g}%", file=sys.stderr)
+    return 0
+
+
+def compare(args) -> int:
+    baseline = json.loads(Path(args.baseline).read_text())
+    current = json.loads(Path(args.current).read_text())
+    return _compare(baseline, current, args.metric, args.threshold, args.min_delta_ms)
+
+
+def _add_compare_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--metric", choices=METRICS, default="p95_ms", help="Statistic to compare")
+    parser.add_argument("--threshold", type=float, default=15.0, help="Allowed slowdown in percent")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Ignore slowdowns smaller than this many milliseconds")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the hot product and cart service calls")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Seed a database and time the service calls")
+    run_parser.add_argument("--scale", choices=SCALES, default="10k", help="Catalog size preset")
+    run_parser.add_argument("--products", type=int, help="Exact catalog size, overriding --scale")
+    run_parser.add_argument("--carts", type=int, help="Seeded carts (default: one per 100 products)")
+    run_parser.add_argument("--iterations", type=int, default=200, help="Timed calls per case")
+    run_parser.add_argument("--warmup", type=int, default=10, help="Untimed calls per case")
+    run_parser.add_argument("--cases", help="Comma-separated subset of cases to run")
+    run_parser.add_argument("--cache", choices=("off", "on"), default="off", help="Use the catalog cache")
+    run_parser.add_argument("--seed", type=int, default=42, help="Seed for data and inputs")
+    run_parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    run_parser.add_argument("--save-baseline", action="store_true",
+                            help="Also store the report as benchmarks/baselines/<scale>.json")
+    run_parser.add_argument("--baseline", help="Compare against this report after running")
+    _add_compare_options(run_parser)
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions between two reports")
+    compare_parser.add_argument("baseline", help="Baseline JSON report")
+    compare_parser.add_argument("current", help="Current JSON report")
+    _add_compare_options(compare_parser)
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Shared fixtures: every test runs against a fresh temporary SQLite database"""
+
+import os
+import tempfile
+import uuid
+
+# The engines are created when app.core.database is imported, so point them
+# at a throwaway file before any test module imports the app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='store-tests-'), 'test.db')}"
+os.environ.setdefault("DEBUG", "false")
+
+import pytest
+
+import app.models.product  # noqa: F401  (registers the tables)
+from app.core.database import create_tables, drop_tables
+from app.services.product_service import ProductService, catalog_cache
+
+
+@pytest.fixture(autouse=True)
+def database():
+    """Create every table, and drop them after the test"""
+    create_tables()
+    catalog_cache.clear()
+    yield
+    drop_tables()
+    catalog_cache.clear()
+
+
+@pytest.fixture
+def session_id() -> str:
+    """A cart session no other test has used, so no cached cart carries over"""
+    return f"test-{uuid.uuid4()}"
+
+
+@pytest.fixture
+def make_product():
+    """Create a product with one variant per size/color, its stock split evenly"""
+    products = ProductService()
+
+    def make(stock: int = 10, sizes=("9",), colors=("Core Black",), price: float = 100.0):
+        return products.create_product(
+            name=f"Test Shoe {uuid.uuid4().hex[:8]}", brand="Adidas", price=price, description="Test shoe",
+            category="Running", sizes=list(sizes), colors=list(colors), stock=stock
+        )
+
+    return make
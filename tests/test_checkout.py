@@ -0,0 +1,110 @@
+"""Checkout: idempotent retries, all-or-nothing orders and lapsed stock holds"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.core.database import get_db_session
+from app.models.product import Order, OrderLine, StockReservation
+from app.services.cart_service import CartService
+from app.services.checkout_service import CheckoutService
+from app.services.inventory_service import InventoryService
+from app.services.reservation_service import ReservationService
+
+SIZE, COLOR = "9", "Core Black"
+
+
+def variant_stock(product_id: int) -> int:
+    return InventoryService().get_variant_stock(product_id, SIZE, COLOR)
+
+
+def count(model) -> int:
+    with get_db_session() as db:
+        return db.execute(select(func.count()).select_from(model)).scalar_one()
+
+
+def expire_holds(session_id: str) -> None:
+    with get_db_session() as db:
+        db.execute(
+            update(StockReservation)
+            .where(StockReservation.session_id == session_id)
+            .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+        db.commit()
+
+
+def test_duplicate_idempotency_key_returns_the_same_order(make_product, session_id):
+    product = make_product(stock=10)
+    cart = CartService(session_id)
+    cart.add_item(product.id, 2, SIZE, COLOR)
+    checkout = CheckoutService(cart)
+
+    first = checkout.checkout("order-key-1")
+    retry = checkout.checkout("order-key-1")
+
+    assert first is not None and not first.replayed
+    assert retry.id == first.id
+    assert retry.replayed
+    assert retry.total == first.total
+    assert count(Order) == 1
+    assert count(OrderLine) == 1
+    assert variant_stock(product.id) == 8
+
+
+def test_duplicate_key_from_another_cart_places_nothing(make_product, session_id):
+    product = make_product(stock=10)
+    first_cart = CartService(session_id)
+    first_cart.add_item(product.id, 1, SIZE, COLOR)
+    placed = CheckoutService(first_cart).checkout("order-key-2")
+
+    # A second tab of the same visitor retrying with the key it was given
+    other_cart = CartService(session_id + "-other")
+    other_cart.add_item(product.id, 3, SIZE, COLOR)
+    replayed = CheckoutService(other_cart).checkout("order-key-2")
+
+    assert replayed.id == placed.id
+    assert count(Order) == 1
+    # The other cart keeps its line and its hold
+    assert other_cart.get_item_count() == 3
+    assert variant_stock(product.id) == 6
+
+
+def test_short_line_rolls_back_the_whole_checkout(make_product, session_id):
+    plenty = make_product(stock=10)
+    scarce = make_product(stock=2)
+    cart = CartService(session_id)
+    cart.add_item(plenty.id, 3, SIZE, COLOR)
+    cart.add_item(scarce.id, 2, SIZE, COLOR)
+
+    # The scarce hold lapses and another shopper takes the stock it returned
+    expire_holds(session_id)
+    assert ReservationService().release_expired() == 2
+    CartService(session_id + "-rival").add_item(scarce.id, 2, SIZE, COLOR)
+
+    with pytest.raises(ValueError):
+        CheckoutService(cart).checkout("order-key-3")
+
+    assert count(Order) == 0
+    assert count(OrderLine) == 0
+    assert cart.get_item_count() == 5
+    assert variant_stock(plenty.id) == 10
+    assert variant_stock(scarce.id) == 0
+
+
+def test_lapsed_hold_is_taken_again_at_checkout(make_product, session_id):
+    product = make_product(stock=5)
+    cart = CartService(session_id)
+    cart.add_item(product.id, 2, SIZE, COLOR)
+    assert variant_stock(product.id) == 3
+
+    expire_holds(session_id)
+    assert ReservationService().release_expired() == 1
+    assert variant_stock(product.id) == 5
+
+    order = CheckoutService(cart).checkout("order-key-4")
+
+    assert order is not None and order.total_quantity == 2
+    assert variant_stock(product.id) == 3
+    assert count(StockReservation) == 0
+    assert cart.get_item_count() == 0
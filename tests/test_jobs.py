@@ -0,0 +1,46 @@
+"""Job queue claims: visibility timeout, re-claiming and stale acknowledgements"""
+
+import time
+
+from sqlalchemy import select
+
+from app.core.database import get_db_session
+from app.models.product import Job
+from app.services.jobs import JobQueue
+
+
+def enqueue(queue: JobQueue, kind: str = "test.noop") -> None:
+    with get_db_session() as db:
+        queue.enqueue(db, kind, {"n": 1})
+        db.commit()
+
+
+def test_job_is_reclaimed_after_its_visibility_timeout():
+    queue = JobQueue(visibility_timeout=0.2, max_attempts=3)
+    enqueue(queue)
+
+    first = queue.claim(10)
+    assert [job.attempt for job in first] == [1]
+    # Still within its claim: no other worker may take it
+    assert queue.claim(10) == []
+
+    time.sleep(0.3)
+    second = queue.claim(10)
+    assert [(job.id, job.attempt) for job in second] == [(first[0].id, 2)]
+
+
+def test_lapsed_claim_failing_late_does_not_requeue_the_newer_run():
+    queue = JobQueue(visibility_timeout=0.2, max_attempts=3)
+    enqueue(queue)
+    stale = queue.claim(10)[0]
+    time.sleep(0.3)
+    current = queue.claim(10)[0]
+
+    queue.fail(stale, "worker died")
+
+    with get_db_session() as db:
+        status, attempts, error = db.execute(
+            select(Job.status, Job.attempts, Job.last_error).where(Job.id == current.id)
+        ).one()
+    assert (status, attempts, error) == ("running", 2, None)
+    assert queue.claim(10) == []